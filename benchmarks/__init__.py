@@ -0,0 +1,93 @@
+"""Vanquisher performance benchmarks.
+
+Run them with `python -m benchmarks`; see `python -m benchmarks --help`.
+Results are written as JSON, so that runs on different machines,
+builds or commits can be compared.
+
+Each benchmark returns a list of results, one dictionary per
+measurement, with at least a name, a rate (operations per
+second) and the best time (in seconds) it took to run one
+batch of operations.
+"""
+
+import platform
+import sys
+import time
+import typing
+
+from vanquisher import kernels
+from vanquisher.game.terrain import USE_CFFI_INTERPOLATOR
+from vanquisher.numba import SUPPORTED as NUMBA_SUPPORTED
+from vanquisher.numpy import SUPPORTED as NUMPY_SUPPORTED
+
+Result = typing.Dict[str, typing.Any]
+
+
+def measure(
+    name: str,
+    func: typing.Callable[[], typing.Any],
+    operations: int,
+    repeat: int = 5,
+    **extra: typing.Any,
+) -> Result:
+    """Times a function, which performs a given number of operations per call.
+
+    The function is called once to warm up (which, among other
+    things, gets Numba functions compiled), then repeat more
+    times; the best time is kept, as the least disturbed by
+    whatever else the machine was doing.
+    """
+    func()
+
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    result: Result = {
+        "name": name,
+        "operations": operations,
+        "best_time": best,
+        "rate": operations / best if best > 0.0 else float("inf"),
+    }
+    result.update(extra)
+
+    return result
+
+
+def environment() -> Result:
+    """The interpreter, platform and optional accelerators in use."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "byteorder": sys.byteorder,
+        "numpy": NUMPY_SUPPORTED,
+        "numba": NUMBA_SUPPORTED,
+        "cffi_interpolator": USE_CFFI_INTERPOLATOR,
+        "kernels": kernels.report(),
+    }
+
+
+def run(quick: bool = False) -> Result:
+    """Runs every benchmark, and returns a JSON-serializable report.
+
+    Quick runs use much smaller workloads; they are only good
+    to check that the benchmarks work.
+    """
+    # imported here, as it needs measure from this module
+    from . import terrain
+
+    results: typing.List[Result] = []
+
+    for benchmark in terrain.BENCHMARKS:
+        results.extend(benchmark(quick))
+
+    return {
+        "timestamp": time.time(),
+        "quick": quick,
+        "environment": environment(),
+        "results": results,
+    }
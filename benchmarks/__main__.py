@@ -0,0 +1,42 @@
+"""Runs the benchmarks, and writes their results as JSON."""
+
+import argparse
+import json
+import sys
+
+from . import run
+
+
+def main():
+    """Parses the command line, runs the benchmarks and writes the report."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Runs the Vanquisher benchmarks."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="where to write the JSON results; defaults to the standard output",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="use tiny workloads, only to check that the benchmarks run",
+    )
+
+    args = parser.parse_args()
+    report = run(quick=args.quick)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    for result in report["results"]:
+        sys.stderr.write("{name:<28} {rate:>14,.0f} ops/s\n".format(**result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Terrain benchmarks: generation, sampling and chunk lookups."""
+
+import random
+import typing
+
+from vanquisher.game import terrain
+from vanquisher.game.terrain.generator import TerrainGenerator
+from vanquisher.game.terrain.generator.fractal import FractalTerrainGenerator
+from vanquisher.game.terrain.generator.peak import Peak, PeakTerrainGenerator
+from vanquisher.game.terrain.generator.sine import SineTerrainGenerator
+from vanquisher.game.world import World
+from vanquisher.numpy import SUPPORTED as NUMPY_SUPPORTED
+
+from . import Result, measure
+
+CHUNK_WIDTH = 32
+
+
+class PurePythonTerrainChunk(terrain.TerrainChunk):
+    """A TerrainChunk interpolating single points without CFFI or Numba.
+
+    Only the way __getitem__ interpolates changes, so it can be
+    measured against the compiled versions.
+    """
+
+    _bilinear_interpolate = staticmethod(
+        getattr(
+            terrain.TerrainChunk._bilinear_interpolate,
+            "py_func",
+            terrain.TerrainChunk._bilinear_interpolate,
+        )
+    )
+
+
+def generators() -> typing.Dict[str, TerrainGenerator]:
+    """One generator of every kind, by name."""
+    rng = random.Random(0)
+
+    peaks = [
+        Peak(rng.uniform(-256, 256), rng.uniform(-256, 256), height=rng.uniform(5, 40))
+        for _ in range(64)
+    ]
+
+    found: typing.Dict[str, TerrainGenerator] = {
+        "sine": SineTerrainGenerator(0),
+        "peak": PeakTerrainGenerator(0, 20.0, 0.5, *peaks),
+        "fractal": FractalTerrainGenerator(0),
+    }
+
+    if NUMPY_SUPPORTED:
+        from vanquisher.game.terrain.generator import graph
+
+        detail = FractalTerrainGenerator(1, amplitude=2.0, scale=8.0)
+
+        found["graph"] = graph.Add(
+            graph.DomainWarp(found["fractal"], detail, detail, strength=4.0),
+            graph.Clamp(detail, low=0.0),
+        )
+
+    return found
+
+
+def bench_generation(quick: bool) -> typing.List[Result]:
+    """Chunk generation time, for every generator."""
+    results = []
+    chunks = 2 if quick else 16
+
+    for name, generator in generators().items():
+        # the peak generator is far slower than the rest
+        count = 1 if quick or name == "peak" else chunks
+
+        def generate(generator=generator, count=count):
+            for index in range(count):
+                chunk = terrain.TerrainChunk(CHUNK_WIDTH)
+                chunk.generate(generator, (index * CHUNK_WIDTH, 0))
+
+        results.append(
+            measure(
+                "generate/" + name,
+                generate,
+                count,
+                repeat=1 if quick else 3,
+                chunk_width=CHUNK_WIDTH,
+            )
+        )
+
+    return results
+
+
+def _sample_points(count: int) -> typing.Tuple[typing.List[float], typing.List[float]]:
+    """Random points within a chunk, always the same ones."""
+    rng = random.Random(1)
+
+    xs = [rng.uniform(0.0, CHUNK_WIDTH) for _ in range(count)]
+    ys = [rng.uniform(0.0, CHUNK_WIDTH) for _ in range(count)]
+
+    return xs, ys
+
+
+def bench_sampling(quick: bool) -> typing.List[Result]:
+    """Single point and batched sampling throughput, on every available path."""
+    results = []
+    count = 256 if quick else 16384
+    xs, ys = _sample_points(count)
+    repeat = 1 if quick else 5
+
+    chunk = terrain.TerrainChunk(CHUNK_WIDTH)
+    chunk.generate(SineTerrainGenerator(0))
+
+    pure_chunk = PurePythonTerrainChunk(CHUNK_WIDTH)
+    pure_chunk.generate(SineTerrainGenerator(0))
+
+    single: typing.Dict[str, typing.Callable[[float, float], float]] = {
+        "getitem": lambda x_pos, y_pos: chunk[x_pos, y_pos],
+        "python": pure_chunk._bilinear_python,
+    }
+
+    if terrain.USE_CFFI_INTERPOLATOR:
+        single["cffi"] = chunk._bilinear_cffi
+
+    if terrain.NUMBA_SUPPORTED:
+        single["numba"] = chunk._bilinear_python
+
+    for name, sample in single.items():
+
+        def sample_points(sample=sample):
+            for x_pos, y_pos in zip(xs, ys):
+                sample(x_pos, y_pos)
+
+        results.append(
+            measure("sample/single/" + name, sample_points, count, repeat=repeat)
+        )
+
+    if NUMPY_SUPPORTED:
+        import numpy
+
+        batch_xs: typing.Any = numpy.array(xs)
+        batch_ys: typing.Any = numpy.array(ys)
+
+    else:
+        batch_xs, batch_ys = xs, ys
+
+    for name, sample_many in terrain.SAMPLE_MANY_KERNEL.implementations.items():
+        results.append(
+            measure(
+                "sample/batch/" + name,
+                lambda sample_many=sample_many: sample_many(chunk, batch_xs, batch_ys),
+                count,
+                repeat=repeat,
+            )
+        )
+
+    return results
+
+
+class FlatGenerator(TerrainGenerator):
+    """A flat terrain generator, so chunk lookups are not timing generation."""
+
+    def height_at(self, x_pos: int, y_pos: int) -> float:
+        """Always zero."""
+        return 0.0
+
+
+def bench_chunk_lookup(quick: bool) -> typing.List[Result]:
+    """World.chunk_at_pos lookup rate, over chunks that are already loaded."""
+    count = 256 if quick else 65536
+    span = 4
+
+    my_world = World(None, FlatGenerator(0), chunk_width=CHUNK_WIDTH)
+
+    for chunk_y in range(span):
+        for chunk_x in range(span):
+            my_world.get_chunk((chunk_x, chunk_y))
+
+    rng = random.Random(2)
+    positions = [
+        (rng.uniform(0.0, span * CHUNK_WIDTH), rng.uniform(0.0, span * CHUNK_WIDTH))
+        for _ in range(count)
+    ]
+
+    def lookup():
+        for pos in positions:
+            my_world.chunk_at_pos(pos)
+
+    return [
+        measure(
+            "world/chunk_at_pos",
+            lookup,
+            count,
+            repeat=1 if quick else 5,
+            loaded_chunks=span * span,
+        )
+    ]
+
+
+BENCHMARKS: typing.List[typing.Callable[[bool], typing.List[Result]]] = [
+    bench_generation,
+    bench_sampling,
+    bench_chunk_lookup,
+]
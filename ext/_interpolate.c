@@ -1,45 +1,135 @@
 /**
  * Bilinear interpolation.
+ *
+ * Heightmaps are row-major, with width values per row, either
+ * float32, or int16 quantized heights (the _q functions), which
+ * are dequantized as offset + scale * value. All arithmetic is
+ * done in double precision. Coordinates are clamped to
+ * [0, width - 1.0001].
  */
 
-#include <stdio.h>
+#include "_interpolate.h"
 
-double get(double *vals, int width, int x, int y) {
-    return vals[y * width + x];
-}
+/**
+ * The four corners of the square a point is in, and the point's
+ * position within it.
+ */
+typedef struct {
+    double val_a, val_b, val_c, val_d;
+    double x_alpha, y_alpha;
+} square;
 
-double bilinear(int width, double x, double y, double *vals) {
+/**
+ * Sanitizes coordinates, and finds the index of the lowest corner of
+ * the square they are in.
+ */
+static int find_square(int width, double x, double y, square *sq) {
     double cap_width = (double)(width) - 1.0001;
 
-    // Sanitize coordinates
     x = x < 0.0 ? 0.0 : x;
     x = x >= cap_width ? cap_width : x;
 
     y = y < 0.0 ? 0.0 : y;
     y = y >= cap_width ? cap_width : y;
 
-    // Find corners of square
-    int x_lo = x;
-    int y_lo = y;
-    int x_hi = x_lo + 1;
-    int y_hi = y_lo + 1;
+    int x_lo = (int)x;
+    int y_lo = (int)y;
 
-    // Get values of corners
-    double val_a = get(vals, width, x_lo, y_lo);
-    double val_b = get(vals, width, x_lo, y_hi);
-    double val_c = get(vals, width, x_hi, y_lo);
-    double val_d = get(vals, width, x_hi, y_hi);
+    sq->x_alpha = x - x_lo;
+    sq->y_alpha = y - y_lo;
 
-    // Perform bilinear interpolation using weights
-    double weight_a = (x_hi - x) * (y_hi - y);
-    double weight_b = (x_hi - x) * (y - y_lo);
-    double weight_c = (x - x_lo) * (y_hi - y);
-    double weight_d = (y - y_lo) * (y - y_lo);
+    return y_lo * width + x_lo;
+}
+
+static square float_square(int width, double x, double y, const float *vals) {
+    square sq;
+    int lo = find_square(width, x, y, &sq);
+
+    sq.val_a = vals[lo];
+    sq.val_b = vals[lo + width];
+    sq.val_c = vals[lo + 1];
+    sq.val_d = vals[lo + width + 1];
+
+    return sq;
+}
 
+static square short_square(int width, double x, double y, const short *vals) {
+    square sq;
+    int lo = find_square(width, x, y, &sq);
+
+    sq.val_a = vals[lo];
+    sq.val_b = vals[lo + width];
+    sq.val_c = vals[lo + 1];
+    sq.val_d = vals[lo + width + 1];
+
+    return sq;
+}
+
+static double interpolate(const square *sq) {
     return (
-        weight_a * val_a +
-        weight_b * val_b +
-        weight_c * val_c +
-        weight_d * val_d
+        sq->val_a * (1.0 - sq->x_alpha) * (1.0 - sq->y_alpha) +
+        sq->val_b * (1.0 - sq->x_alpha) * sq->y_alpha +
+        sq->val_c * sq->x_alpha * (1.0 - sq->y_alpha) +
+        sq->val_d * sq->x_alpha * sq->y_alpha
     );
 }
+
+static double slope_x(const square *sq) {
+    return (sq->val_c - sq->val_a) * (1.0 - sq->y_alpha) + (sq->val_d - sq->val_b) * sq->y_alpha;
+}
+
+static double slope_y(const square *sq) {
+    return (sq->val_b - sq->val_a) * (1.0 - sq->x_alpha) + (sq->val_d - sq->val_c) * sq->x_alpha;
+}
+
+double bilinear(int width, double x, double y, const float *vals) {
+    square sq = float_square(width, x, y, vals);
+
+    return interpolate(&sq);
+}
+
+void bilinear_many(int width, const float *vals, int count, const double *xs, const double *ys, double *heights) {
+    for (int i = 0; i < count; i++) {
+        square sq = float_square(width, xs[i], ys[i], vals);
+
+        heights[i] = interpolate(&sq);
+    }
+}
+
+/**
+ * Heights and their analytic partial derivatives along X and Y,
+ * in the same pass.
+ */
+void gradient_many(int width, const float *vals, int count, const double *xs, const double *ys, double *heights, double *grad_x, double *grad_y) {
+    for (int i = 0; i < count; i++) {
+        square sq = float_square(width, xs[i], ys[i], vals);
+
+        heights[i] = interpolate(&sq);
+        grad_x[i] = slope_x(&sq);
+        grad_y[i] = slope_y(&sq);
+    }
+}
+
+double bilinear_q(int width, double x, double y, const short *vals, double offset, double scale) {
+    square sq = short_square(width, x, y, vals);
+
+    return offset + scale * interpolate(&sq);
+}
+
+void bilinear_many_q(int width, const short *vals, double offset, double scale, int count, const double *xs, const double *ys, double *heights) {
+    for (int i = 0; i < count; i++) {
+        square sq = short_square(width, xs[i], ys[i], vals);
+
+        heights[i] = offset + scale * interpolate(&sq);
+    }
+}
+
+void gradient_many_q(int width, const short *vals, double offset, double scale, int count, const double *xs, const double *ys, double *heights, double *grad_x, double *grad_y) {
+    for (int i = 0; i < count; i++) {
+        square sq = short_square(width, xs[i], ys[i], vals);
+
+        heights[i] = offset + scale * interpolate(&sq);
+        grad_x[i] = scale * slope_x(&sq);
+        grad_y[i] = scale * slope_y(&sq);
+    }
+}
@@ -0,0 +1,26 @@
+"""
+Configuration shared by every test.
+"""
+
+import os
+
+import pytest
+
+from vanquisher import kernels
+
+
+@pytest.fixture(autouse=True, scope="session")
+def kernel_cache(tmp_path_factory):
+    """Keeps the kernel choices made while testing out of the user's cache."""
+    previous = os.environ.get(kernels.CACHE_PATH_VARIABLE)
+    path = tmp_path_factory.mktemp("kernels") / "kernels.json"
+
+    os.environ[kernels.CACHE_PATH_VARIABLE] = str(path)
+
+    yield path
+
+    if previous is None:
+        del os.environ[kernels.CACHE_PATH_VARIABLE]
+
+    else:
+        os.environ[kernels.CACHE_PATH_VARIABLE] = previous
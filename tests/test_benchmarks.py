@@ -0,0 +1,29 @@
+"""
+Tests concerning the benchmark suite.
+"""
+
+import json
+
+import benchmarks
+
+
+def test_benchmarks_quick():
+    """
+    Test that a quick benchmark run measures every
+    path it should, and can be written as JSON.
+    """
+
+    report = benchmarks.run(quick=True)
+    names = [result["name"] for result in report["results"]]
+
+    assert "generate/fractal" in names
+    assert "sample/single/python" in names
+    assert "sample/batch/python" in names
+    assert "world/chunk_at_pos" in names
+
+    if report["environment"]["cffi_interpolator"]:
+        assert "sample/single/cffi" in names
+
+    assert all(result["rate"] > 0 for result in report["results"])
+
+    assert json.loads(json.dumps(report)) == report
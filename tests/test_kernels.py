@@ -0,0 +1,159 @@
+"""
+Tests concerning the kernel registry, and running without accelerators.
+"""
+
+import json
+import time
+
+import pytest
+
+from vanquisher import kernels
+from vanquisher.game import terrain
+
+
+def _slow_sum(values):
+    """A sum, made slow."""
+    time.sleep(0.002)
+    return sum(values)
+
+
+def _broken_sum(values):
+    """A sum implementation that fails, like a broken build would."""
+    raise RuntimeError("broken build")
+
+
+def _workload():
+    """A summing workload."""
+    values = list(range(100))
+    return lambda implementation: implementation(values)
+
+
+def test_kernel_autoselect(tmp_path):
+    """
+    Test that autoselect picks the fastest working
+    implementation, and persists the choice.
+    """
+
+    path = str(tmp_path / "kernels.json")
+
+    registry = kernels.KernelRegistry()
+    summer = registry.kernel("sum", _workload)
+
+    summer.register("slow", _slow_sum)
+    summer.register("broken", _broken_sum)
+    summer.register("fast", sum)
+
+    assert summer.backend == "slow"
+    assert summer.function([1, 2]) == 3
+
+    with pytest.warns(RuntimeWarning):
+        assert registry.autoselect(path) == {"sum": "fast"}
+
+    assert summer.function is sum
+    assert "broken" not in summer.implementations
+    assert registry.report()["sum"]["selected_by"] == "benchmark"
+
+    with open(path) as cache_file:
+        assert json.load(cache_file)["kernels"]["sum"]["backend"] == "fast"
+
+    # A fresh start reuses the persisted choice
+    again = kernels.KernelRegistry()
+    summer = again.kernel("sum", _workload)
+
+    summer.register("slow", _slow_sum)
+    summer.register("fast", sum)
+
+    assert again.autoselect(path) == {"sum": "fast"}
+    assert summer.selected_by == "cache"
+
+    with pytest.raises(KeyError):
+        summer.select("gpu")
+
+
+def test_terrain_without_cffi(monkeypatch):
+    """
+    Test that terrain chunks still work with
+    a plain buffer when CFFI is unavailable.
+    """
+
+    monkeypatch.setattr(terrain, "USE_CFFI_INTERPOLATOR", False)
+    monkeypatch.setattr(
+        terrain.SAMPLE_KERNEL,
+        "function",
+        terrain.SAMPLE_KERNEL.implementations["python"],
+    )
+
+    my_terrain = terrain.TerrainChunk(4)
+    my_terrain.load_grid(
+        [[x_pos + 2 * y_pos for x_pos in range(5)] for y_pos in range(5)]
+    )
+
+    assert my_terrain.get(3, 2) == 7.0
+    assert abs(my_terrain[1.5, 2.5] - 6.5) < 1e-6
+
+    # the halo's edge is clamped to, rather than read past
+    assert abs(my_terrain[4.0, 2.0] - 8.0) < 1e-3
+    assert abs(my_terrain[4.0, 4.0] - 12.0) < 1e-3
+    assert len(bytes(my_terrain.heightmap_buffer())) == my_terrain.buffer_size(4)
+
+    shared = bytearray(terrain.TerrainChunk.buffer_size(4))
+    view = terrain.TerrainChunk(4, shared)
+    view[1, 1] = 3.0
+
+    assert bytes(shared) != bytes(len(shared))
+
+
+def test_kernel_implementations_agree():
+    """
+    Test that every registered implementation of the
+    terrain kernels gives the same results.
+    """
+
+    numpy = pytest.importorskip("numpy")
+
+    from vanquisher.game.terrain.generator import fractal
+
+    noise_kernel = fractal.GRADIENT_NOISE_GRID_KERNEL
+    tables = fractal.noise_tables(5)
+    xs = numpy.arange(-20.0, 20.0) * 0.37
+    ys = numpy.arange(-10.0, 10.0) * 0.53
+
+    expected = fractal.gradient_noise_grid(tables, xs, ys)
+
+    for implementation in noise_kernel.implementations.values():
+        assert numpy.allclose(implementation(tables, xs, ys), expected)
+
+    my_terrain = terrain.TerrainChunk(8)
+    my_terrain.generate(fractal.FractalTerrainGenerator(1))
+
+    xs = numpy.linspace(0.0, 8.0, 50)
+    ys = numpy.linspace(8.0, 0.0, 50)
+    expected = [my_terrain[x_pos, y_pos] for x_pos, y_pos in zip(xs, ys)]
+
+    for implementation in terrain.SAMPLE_KERNEL.implementations.values():
+        found = [implementation(my_terrain, *point) for point in zip(xs, ys)]
+        assert numpy.allclose(found, expected, atol=1e-5)
+
+    for implementation in terrain.SAMPLE_MANY_KERNEL.implementations.values():
+        assert numpy.allclose(implementation(my_terrain, xs, ys), expected, atol=1e-5)
+
+
+def test_game_autoselects_kernels(tmp_path, monkeypatch):
+    """
+    Test that starting a game picks and persists the
+    kernel implementations, unless asked not to.
+    """
+
+    from vanquisher.game import Game
+
+    path = tmp_path / "kernels.json"
+    monkeypatch.setenv(kernels.CACHE_PATH_VARIABLE, str(path))
+
+    Game(autoselect_kernels=False)
+
+    assert not path.exists()
+
+    Game()
+
+    with open(str(path)) as cache_file:
+        assert "terrain.sample_many" in json.load(cache_file)["kernels"]
@@ -0,0 +1,124 @@
+"""
+Tests for the fixed timestep game loop.
+"""
+
+import pytest
+
+from vanquisher.game import Game
+from vanquisher.game.loop import GameLoop
+from vanquisher.game.object_type import ObjectType
+
+
+class FakeClock:
+    """A clock that only moves when told to, or when slept on."""
+
+    def __init__(self):
+        """Starts the clock at zero."""
+        self.now = 0.0
+        self.sleeps = 0
+
+    def __call__(self) -> float:
+        """The current time."""
+        return self.now
+
+    def sleep(self, duration: float):
+        """Moves the clock forward."""
+        self.sleeps += 1
+        self.now += duration
+
+
+def test_fixed_timestep():
+    """
+    Test that the game loop ticks at a fixed rate, with
+    bounded catch-up, and interpolates rendering.
+    """
+
+    game = Game()
+    game.object_types.register_type(ObjectType(game.object_types, {"name": "ball"}))
+    ball = game.object_create("ball", (0.0, 0.0), height=50.0)
+
+    clock = FakeClock()
+    network_ticks = []
+    alphas = []
+
+    loop = GameLoop(
+        game,
+        tick_rate=10.0,
+        max_catch_up=3,
+        network=network_ticks.append,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    loop.add_render_hook(alphas.append)
+
+    assert [phase.name for phase in loop.phases] == [
+        "network",
+        "chunks",
+        "scripts",
+        "physics",
+    ]
+
+    assert loop.advance(0.25) == 2
+    assert loop.ticks == 2
+    assert network_ticks == [0.1, 0.1]
+    assert alphas == [pytest.approx(0.5)]
+    assert not loop.overloaded
+
+    # objects fall
+    assert ball.height < 50.0
+
+    # far behind: only catch up so much, and skip skippable phases
+    chunk_runs = loop.phases[1].timing.count
+
+    assert loop.advance(10.0) == 3
+    assert loop.overloaded
+    assert loop.dropped_ticks == 97
+    assert loop.alpha == pytest.approx(0.5)
+    assert loop.phases[1].timing.count == chunk_runs + 1
+    assert loop.phases[2].timing.count == 5
+
+    report = loop.report()
+
+    assert set(report) == {"network", "chunks", "scripts", "physics", "tick"}
+    assert report["tick"]["count"] == 5
+
+    # running in real time sleeps between ticks
+    loop.run(max_ticks=4)
+
+    assert loop.ticks == 9
+    assert clock.sleeps >= 4
+    assert not loop.running
+
+
+def test_loop_phases():
+    """Test adding and removing game loop phases."""
+
+    game = Game()
+    loop = GameLoop(game, tick_rate=20.0)
+    calls = []
+
+    loop.add_phase("ai", lambda time_step: calls.append(("ai", time_step)))
+    loop.add_phase("input", lambda _: calls.append("input"), before="chunks")
+
+    with pytest.raises(ValueError):
+        loop.add_phase("ai", print)
+
+    with pytest.raises(ValueError):
+        loop.add_phase("late", print, before="nothing")
+
+    loop.tick()
+
+    assert calls == ["input", ("ai", 0.05)]
+    assert [phase.name for phase in loop.phases] == [
+        "input",
+        "chunks",
+        "scripts",
+        "physics",
+        "ai",
+    ]
+
+    loop.remove_phase("ai")
+    assert [phase.name for phase in loop.phases][-1] == "physics"
+
+    with pytest.raises(ValueError):
+        GameLoop(game, tick_rate=0.0)
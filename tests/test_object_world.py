@@ -5,7 +5,14 @@ in the world and the latter's partitioning into chunks,
 including things like object iterators and chunk lookups.
 """
 
+import pytest
+
 from vanquisher.game import Game
+from vanquisher.game.object_type import ObjectType
+from vanquisher.game.spatial import SpatialHash
+from vanquisher.game.terrain.generator.sine import SineTerrainGenerator
+from vanquisher.game.world import World
+from vanquisher.numpy import SUPPORTED as NUMPY_SUPPORTED
 
 
 def test_object_radius():
@@ -85,3 +92,235 @@ def test_object_radius():
     chunk_set.add(game.world.chunk_at_pos((75, 75)))
 
     assert len(game.world.chunks) == len(chunk_set) == num_chunks_pred
+
+
+def test_object_index():
+    """Test that radius queries go through an up to date object index."""
+
+    game = Game()
+
+    for name in ("thing", "cake"):
+        game.object_types.register_type(ObjectType(game.object_types, {"name": name}))
+
+    pivot = game.object_create("thing", (0, 0), 0)
+
+    game.object_create("thing", (38, 0), 0)
+    game.object_create("thing", (-50, 0), 0)
+    game.object_create("thing", (-17, 36), 0)
+    game.object_create("cake", (20, 0))
+    game.object_create("cake", (0, 15))
+    cake = game.object_create("cake", (75, 75))
+
+    def count_around(radius, type_filter=None):
+        """How many objects are within a radius of the origin."""
+        return len(list(game.world.objects_in_radius((0, 0), radius, type_filter)))
+
+    assert len(game.world.object_index) == 7
+
+    for cell_size in (16.0, 5.0, 200.0):
+        game.world.set_object_cell_size(cell_size)
+
+        assert count_around(None) == 7
+        assert count_around(1000.0) == 7
+        assert count_around(45.0) == 5
+        assert count_around(1000.0, "cake") == 3
+        assert count_around(45.0, "Cake") == 2
+
+    # moving objects keeps the index up to date
+    cake.move(-70.0, -70.0)
+    assert count_around(45.0, "cake") == 3
+
+    pivot.move(300.0, 0.0)
+    assert count_around(45.0) == 5
+    assert pivot in game.world.objects_in_radius((300, 0), 1.0)
+
+    game.object_remove(cake)
+    assert count_around(45.0, "cake") == 2
+    assert len(game.world.object_index) == 6
+
+    index = SpatialHash(4.0)
+    index.insert("a", 1.0, 1.0)
+    index.insert("b", -3.0, 1.0)
+
+    assert sorted(index.query_radius(0.0, 0.0, 2.0)) == ["a"]
+    assert sorted(index.query_radius(0.0, 0.0, 4.0)) == ["a", "b"]
+
+    index.move("a", 9.0, 9.0)
+    assert list(index.query_radius(0.0, 0.0, 4.0)) == ["b"]
+    assert index.cell_at(9.0, 9.0) in index.cells
+
+
+def test_object_nearest_and_box():
+    """Test k-nearest and box queries, from Python and the JS API alike."""
+
+    game = Game()
+
+    for name in ("thing", "cake"):
+        game.object_types.register_type(ObjectType(game.object_types, {"name": name}))
+
+    game.world.set_object_cell_size(8.0)
+
+    pivot = game.object_create("thing", (0, 0), 0)
+    far_thing = game.object_create("thing", (300, -200), 0)
+    cakes = [game.object_create("cake", (dist, 1.5 * dist)) for dist in (40, -7, 19)]
+
+    nearest = game.world.nearest((0, 0), 3)
+    assert nearest == [pivot, cakes[1], cakes[2]]
+
+    assert game.world.nearest((0, 0), 2, "cake") == [cakes[1], cakes[2]]
+    assert game.world.nearest((0, 0), 10, "thing") == [pivot, far_thing]
+    assert game.world.nearest((290, -190), 1) == [far_thing]
+    assert not game.world.nearest((0, 0), 0)
+
+    # the JS API never finds the object itself
+    found = pivot.js_wrapper.nearest(2)
+    assert [obj.to_ref() for obj in found] == [
+        str(cakes[1].identifier),
+        str(cakes[2].identifier),
+    ]
+
+    found = game.object_types.js_context.nearest(300, -200, 1, "thing")
+    assert [obj.to_ref() for obj in found] == [str(far_thing.identifier)]
+
+    in_box = set(game.world.objects_in_box((-10, -20), (20, 30)))
+    assert in_box == {pivot, cakes[1], cakes[2]}
+
+    in_box = set(game.world.objects_in_box((-10, -20), (20, 30), "cake"))
+    assert in_box == {cakes[1], cakes[2]}
+
+    refs = []
+    pivot.js_wrapper.iter_box_objects(
+        lambda obj: refs.append(obj.to_ref()), 0, 0, 500, 500, "cake"
+    )
+    assert sorted(refs) == sorted(str(cake.identifier) for cake in cakes[::2])
+
+    refs = []
+    game.object_types.js_context.iter_box_objects(
+        lambda obj: refs.append(obj.to_ref()), -1000, -1000, 1000, 1000
+    )
+    assert len(refs) == 5
+
+
+def test_batch_physics():
+    """Test that batched object physics match ticking objects one at a time."""
+
+    pytest.importorskip("numpy")
+
+    games = []
+
+    for batch_physics in (False, True):
+        game = Game()
+        game.world = World(game, SineTerrainGenerator(0), batch_physics=batch_physics)
+        game.object_types.register_type(ObjectType(game.object_types, {"name": "ball"}))
+
+        for index in range(12):
+            game.object_create(
+                "ball",
+                (index * 7.0 - 40.0, index * 3.0),
+                height=40.0 + index,
+                vel_speed=float(index % 3),
+                restitution=0.5,
+                rolling=0.0 if index % 4 else 0.5,
+                horz_speed=(index - 6.0, 2.0),
+            )
+
+        games.append(game)
+
+    for _ in range(40):
+        for game in games:
+            game.world.update_objects(0.1)
+
+    plain, batched = (list(game.objects.values()) for game in games)
+
+    assert len(batched[0].store) == 12
+
+    for obj, stored in zip(plain, batched):
+        assert stored.slot is not None
+        assert abs(obj.pos.x - stored.pos.x) < 1e-4
+        assert abs(obj.pos.y - stored.pos.y) < 1e-4
+        assert abs(obj.height - stored.height) < 1e-4
+        assert abs(obj.vel_speed - stored.vel_speed) < 1e-4
+        assert abs(obj.horz_speed.x - stored.horz_speed.x) < 1e-4
+        assert abs(obj.horz_speed.y - stored.horz_speed.y) < 1e-4
+
+    # removed objects keep their state
+    removed = batched[3]
+    height, pos = removed.height, removed.pos.as_tuple()
+
+    games[1].object_remove(removed)
+
+    assert removed.store is None
+    assert removed.height == height
+    assert removed.pos.as_tuple() == pos
+    assert len(games[1].world.object_store) == 11
+
+
+def test_floor_height_cache():
+    """Test that ticking objects resolves floor heights in a batch, and correctly."""
+
+    games = []
+    point_queries = []
+
+    for index in range(2):
+        game = Game()
+        game.world = World(game, SineTerrainGenerator(0))
+        game.object_types.register_type(ObjectType(game.object_types, {"name": "ball"}))
+
+        for obj_index in range(8):
+            game.object_create(
+                "ball",
+                (obj_index * 9.0 - 30.0, obj_index * 4.0),
+                height=20.0 + obj_index,
+                horz_speed=(obj_index - 4.0, 1.0),
+            )
+
+        def counting_point_chunk(pos_x, pos_y, world=game.world, index=index):
+            """Counts single point terrain queries."""
+            point_queries[index] += 1
+            return type(world)._point_chunk(world, pos_x, pos_y)
+
+        game.world._point_chunk = counting_point_chunk
+        games.append(game)
+        point_queries.append(0)
+
+    cached, direct = games
+
+    for _ in range(10):
+        cached.world.update_objects(0.1)
+
+        for obj in direct.objects.values():
+            obj.tick(0.1)
+
+    # the cache only lives for the tick
+    assert cached.world._floor_cache is None
+
+    if NUMPY_SUPPORTED:
+        assert point_queries[0] * 3 < point_queries[1]
+
+    else:
+        # the batch is sampled one point at a time too
+        assert point_queries[0] < point_queries[1]
+
+    for obj, other in zip(cached.objects.values(), direct.objects.values()):
+        assert obj.pos.as_tuple() == other.pos.as_tuple()
+        assert obj.height == other.height
+        assert obj.vel_speed == other.vel_speed
+
+
+def test_deprecated_roll_sampling():
+    """Test that the old roll sampling parameters still work, with a warning."""
+
+    game = Game()
+    game.object_types.register_type(ObjectType(game.object_types, {"name": "ball"}))
+
+    with pytest.warns(DeprecationWarning):
+        ball = game.object_create("ball", (0, 0), num_roll_samples=4)
+
+    # passed positionally, they still shift the parameters after them
+    with pytest.warns(DeprecationWarning):
+        heavy = game.object_create(
+            "ball", (0, 0), 0.0, 0.0, 0.0, 0.5, (0, 0), 0.7, 8, 0.5, 2.0
+        )
+
+    assert ball.rolling == 0.5
+    assert heavy.gravity == 2.0
@@ -0,0 +1,133 @@
+"""
+Tests concerning the persistence of world terrain in region files.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from vanquisher.game.region import RegionStorage
+from vanquisher.game.terrain.generator.sine import SineTerrainGenerator
+from vanquisher.game.world import World
+
+
+def test_region_storage(tmp_path):
+    """
+    Test that chunks stored in region files are loaded
+    back as they were, without generating them again.
+    """
+
+    directory = str(tmp_path / "world")
+
+    storage = RegionStorage(directory, chunk_width=8, region_size=4)
+    my_world = World(None, SineTerrainGenerator(0), chunk_width=8, storage=storage)
+
+    # spans several region files, negative ones included
+    chunk_positions = [(0, 0), (3, 3), (4, 0), (-1, -5)]
+
+    for chunk_pos in chunk_positions:
+        my_world.get_chunk(chunk_pos)
+
+    my_world.get_chunk((0, 0)).terrain[2, 3] = 1000.0
+
+    my_world.save()
+
+    assert len(storage.regions) == 3
+    assert os.path.exists(os.path.join(directory, "world.json"))
+
+    # Reopen the same directory; no generator this time,
+    # so chunks can only come from the region files.
+    reopened = RegionStorage(directory)
+    new_world = World(None, None, chunk_width=8, storage=reopened)
+
+    assert reopened.region_size == 4
+    assert not reopened.regions  # nothing is mapped until it is needed
+
+    for chunk_pos in chunk_positions:
+        assert new_world.is_stored(chunk_pos)
+
+        old_terrain = my_world.get_chunk(chunk_pos).terrain
+        new_terrain = new_world.get_chunk(chunk_pos).terrain
+
+        for y_pos in range(8):
+            for x_pos in range(8):
+                assert new_terrain.get(x_pos, y_pos) == old_terrain.get(x_pos, y_pos)
+
+    assert new_world.get_chunk((0, 0)).terrain.get(2, 3) == 1000.0
+    assert not new_world.is_stored((1, 1))
+
+
+def test_chunk_eviction(tmp_path):
+    """
+    Test that chunks beyond the memory budget are unloaded,
+    least recently used first, and spilled to the storage.
+    """
+
+    storage = RegionStorage(str(tmp_path / "world"), chunk_width=8)
+    chunk_size = (8 + 1) ** 2 * 4
+
+    my_world = World(
+        None,
+        SineTerrainGenerator(0),
+        chunk_width=8,
+        storage=storage,
+        memory_budget=3 * chunk_size,
+    )
+
+    pinned = my_world.get_chunk((0, 0))
+    pinned.objects_in_chunk.add(uuid.uuid4())
+
+    my_world.get_chunk((1, 0)).terrain[4, 4] = -50.0
+
+    for chunk_x in range(2, 6):
+        my_world.get_chunk((chunk_x, 0))
+
+    assert len(my_world.chunks) == 3
+    assert my_world.memory_usage == 3 * chunk_size
+
+    assert (0, 0) in my_world.chunks  # pinned by its object
+    assert (5, 0) in my_world.chunks  # most recently used
+    assert (1, 0) not in my_world.chunks
+
+    # Evicted chunks come back from the storage, changes included
+    assert my_world.get_chunk((1, 0)).terrain.get(4, 4) == -50.0
+    assert len(my_world.chunks) == 3
+
+
+def test_quantized_region_storage(tmp_path):
+    """
+    Test that quantized chunks are stored and
+    loaded back with their offset and scale.
+    """
+
+    pytest.importorskip("numpy")
+
+    directory = str(tmp_path / "world")
+
+    storage = RegionStorage(directory, chunk_width=8, quantized=True)
+    my_world = World(
+        None, SineTerrainGenerator(0), chunk_width=8, storage=storage, quantized=True
+    )
+
+    my_world.get_chunk((0, 0)).terrain[2, 3] = 1000.0
+    my_world.save()
+
+    reopened = RegionStorage(directory)
+    assert reopened.quantized
+
+    with pytest.raises(ValueError):
+        World(None, None, chunk_width=8, storage=reopened)
+
+    new_world = World(None, None, chunk_width=8, storage=reopened, quantized=True)
+
+    old_terrain = my_world.get_chunk((0, 0)).terrain
+    new_terrain = new_world.get_chunk((0, 0)).terrain
+
+    assert new_terrain.height_scale == old_terrain.height_scale
+
+    for y_pos in range(8):
+        for x_pos in range(8):
+            assert new_terrain.get(x_pos, y_pos) == old_terrain.get(x_pos, y_pos)
+
+    assert abs(new_terrain.get(2, 3) - 1000.0) <= new_terrain.height_scale
@@ -2,9 +2,23 @@
 A few tests concerning the terrain functionality of Vanquisher, primarily generation.
 """
 
-from vanquisher.game.terrain import TerrainChunk
+import asyncio
+import os
+
+import pytest
+
+from vanquisher.game import terrain
+from vanquisher.game.terrain import (
+    MIN_QUANTIZATION_STEP,
+    QuantizedTerrainChunk,
+    TerrainChunk,
+)
 from vanquisher.game.terrain import generator as terragen
+from vanquisher.game.terrain.generator import graph
+from vanquisher.game.terrain.generator.fractal import FractalTerrainGenerator
 from vanquisher.game.terrain.generator.peak import Peak, PeakTerrainGenerator
+from vanquisher.game.terrain.generator.sine import SineTerrainGenerator
+from vanquisher.game.world import World
 
 
 def test_terragen_simple():
@@ -45,3 +59,750 @@ def test_terragen_simple():
 
     assert 10.0 < my_terrain[5.0, 5.0] <= 20.0
     assert my_terrain[20.0, 5.0] <= my_terrain[5.0, 5.0]
+
+
+def test_sample_many():
+    """
+    Test that batch heightmap sampling agrees
+    with the expected bilinear interpolation.
+    """
+
+    class XYHalfSumGenerator(terragen.TerrainGenerator):
+        """
+        Bilinear interpolation of a plane is exact,
+        which makes this a good reference.
+        """
+
+        def height_at(self, x_pos: int, y_pos: int):
+            return (x_pos + y_pos) / 2
+
+    my_terrain = TerrainChunk(8)
+    my_terrain.generate(XYHalfSumGenerator(0))
+
+    xs = [0.0, 0.5, 1.5, 3.25, 6.75]
+    ys = [0.0, 1.5, 1.5, 2.5, 0.5]
+
+    heights = my_terrain.sample_many(xs, ys)
+
+    assert len(heights) == len(xs)
+
+    for x_pos, y_pos, height in zip(xs, ys, heights):
+        assert abs(height - (x_pos + y_pos) / 2) < 1e-5
+
+
+def test_height_grid():
+    """
+    Test that the whole-grid generation paths agree
+    with the point-by-point ones.
+    """
+
+    my_peak = Peak(x=5, y=5, height=20, max_radius=5, strength=1.5, lip=1.5, tip=1.5)
+
+    generators = [
+        SineTerrainGenerator(0),
+        PeakTerrainGenerator(0, 10.0, 1.5, my_peak),
+        FractalTerrainGenerator(0, scale=5.0),
+    ]
+
+    for generator in generators:
+        grid = generator.height_grid(2, -3, 8)
+
+        for y_pos in range(8):
+            for x_pos in range(8):
+                expected = generator.height_at(x_pos + 2, y_pos - 3)
+                assert abs(grid[y_pos][x_pos] - expected) < 1e-6
+
+
+def test_hash_noise():
+    """
+    Test that hash noise only depends on the seed
+    and the coordinates, and that its vectorized
+    version agrees with the scalar one.
+    """
+
+    generator = PeakTerrainGenerator(7, 10.0, 2.0)
+
+    later = [generator.height_at(x_pos, -x_pos) for x_pos in range(-4, 4)]
+    earlier = [generator.height_at(x_pos, -x_pos) for x_pos in range(3, -5, -1)]
+
+    assert later == earlier[::-1]
+    assert all(8.0 <= height < 12.0 for height in later)
+    assert len(set(later)) == len(later)
+
+    assert generator.noise_at(1, 2) != generator.noise_at(1, 2, salt=1)
+    assert generator.noise_at(1, 2) != PeakTerrainGenerator(8, 0, 0).noise_at(1, 2)
+
+    numpy = pytest.importorskip("numpy")
+
+    xs, ys = numpy.meshgrid(numpy.arange(-40, 40), numpy.arange(-3, 3))
+    grid = generator.noise_grid(xs, ys)
+
+    for (y_idx, x_idx), value in numpy.ndenumerate(grid):
+        assert value == generator.noise_at(xs[y_idx, x_idx], ys[y_idx, x_idx])
+
+
+def test_peak_index():
+    """
+    Test that bucketing peaks into grid cells
+    does not change the generated terrain.
+    """
+
+    peaks = [
+        Peak(x=index * 7 % 60 - 30, y=index * 13 % 60 - 30, max_radius=3 + index % 5)
+        for index in range(100)
+    ]
+
+    generator = PeakTerrainGenerator(0, 10.0, 0.0, *peaks, cell_size=8.0)
+
+    assert generator.peaks == tuple(peaks)
+    assert len(generator.peaks_in(0, 0, 4, 4)) < len(peaks)
+
+    grid = generator.height_grid(-20, -12, 24)
+
+    for y_pos in range(24):
+        for x_pos in range(24):
+            expected = 10.0 + sum(
+                peak.height_offset_at(10.0, x_pos - 20, y_pos - 12) for peak in peaks
+            )
+
+            assert abs(generator.height_at(x_pos - 20, y_pos - 12) - expected) < 1e-6
+            assert abs(grid[y_pos][x_pos] - expected) < 1e-6
+
+
+def test_fractal_generator():
+    """
+    Test that fractal terrain stays within its
+    amplitude and only depends on its seed.
+    """
+
+    generator = FractalTerrainGenerator(4, base_height=10.0, amplitude=6.0, scale=8.0)
+    heights = [generator.height_at(x_pos, x_pos * 3) for x_pos in range(-50, 50)]
+
+    assert all(4.0 <= height <= 16.0 for height in heights)
+    assert max(heights) - min(heights) > 2.0
+
+    same = FractalTerrainGenerator(4, base_height=10.0, amplitude=6.0, scale=8.0)
+    assert same.height_at(-17, 23) == generator.height_at(-17, 23)
+
+    other = FractalTerrainGenerator(5, base_height=10.0, amplitude=6.0, scale=8.0)
+    assert other.height_at(-17, 23) != generator.height_at(-17, 23)
+
+
+def test_as_array():
+    """
+    Test that the NumPy heightmap view shares
+    memory with the heightmap itself.
+    """
+
+    pytest.importorskip("numpy")
+
+    my_terrain = TerrainChunk(4)
+    heights = my_terrain.as_array()
+
+    assert heights.shape == (4, 4)
+
+    heights[2, 1] = 8.0
+
+    assert my_terrain.get(1, 2) == 8.0
+    assert my_terrain[1.0, 2.0] == 8.0
+    assert my_terrain[1.5, 2.0] == 4.0
+
+    my_terrain[3, 0] = -2.0
+
+    assert heights[0, 3] == -2.0
+
+
+class PlaneGenerator(terragen.TerrainGenerator):
+    """
+    A terrain generation algorithm for a tilted plane,
+    which bilinear interpolation reproduces exactly,
+    even across chunk borders.
+    """
+
+    def height_at(self, x_pos: int, y_pos: int):
+        return x_pos + 2 * y_pos
+
+
+def test_world_height_at():
+    """
+    Test that world-space height queries are seamless
+    across chunk borders, thanks to chunk halos.
+    """
+
+    my_world = World(None, PlaneGenerator(0), chunk_width=4)
+
+    for x_pos, y_pos in [(3.5, 1.0), (3.9, 3.9), (-0.5, 2.25), (7.75, -4.5)]:
+        assert abs(my_world.height_at(x_pos, y_pos) - (x_pos + 2 * y_pos)) < 1e-4
+
+    xs = [0.5, 3.5, 4.5, -3.75, 3.99]
+    ys = [0.5, 3.5, -0.5, 7.25, 3.99]
+
+    for x_pos, y_pos, height in zip(xs, ys, my_world.heights_at(xs, ys)):
+        assert abs(height - (x_pos + 2 * y_pos)) < 1e-4
+
+    # Changing a chunk border is reflected in its neighbour's halo
+    my_world.get_chunk((1, 0)).terrain[0, 1] = 100.0
+    my_world.sync_halos(my_world.get_chunk((1, 0)))
+
+    assert my_world.get_chunk((0, 0)).terrain.get(4, 1) == 100.0
+    assert my_world.height_at(3.5, 1.0) > 50.0
+
+
+def test_gradients():
+    """
+    Test that terrain gradients match the slope
+    of the terrain, and that their batch versions
+    agree with the scalar ones.
+    """
+
+    my_world = World(None, PlaneGenerator(0), chunk_width=4)
+
+    xs = [0.5, 3.5, 4.5, -3.75, 3.99]
+    ys = [0.5, 3.5, -0.5, 7.25, 3.99]
+
+    heights, grads_x, grads_y = my_world.gradients_at(xs, ys)
+
+    for index, (x_pos, y_pos) in enumerate(zip(xs, ys)):
+        assert my_world.gradient_at(x_pos, y_pos) == pytest.approx(
+            (heights[index], grads_x[index], grads_y[index])
+        )
+        assert heights[index] == pytest.approx(x_pos + 2 * y_pos)
+        assert (grads_x[index], grads_y[index]) == pytest.approx((1.0, 2.0))
+
+    # A single bump
+    my_terrain = TerrainChunk(4)
+    my_terrain[2, 1] = 4.0
+
+    assert my_terrain.gradient_at(1.5, 1.25) == pytest.approx((1.5, 3.0, -2.0))
+    assert my_terrain.gradient_at(2.5, 1.5) == pytest.approx((1.0, -2.0, -2.0))
+
+    heights, grads_x, grads_y = my_terrain.gradient_many([1.5, 2.5], [1.25, 1.5])
+
+    assert list(heights) == pytest.approx([1.5, 1.0])
+    assert list(grads_x) == pytest.approx([3.0, -2.0])
+    assert list(grads_y) == pytest.approx([-2.0, -2.0])
+    assert list(my_terrain.sample_many([1.5, 2.5], [1.25, 1.5])) == list(heights)
+
+
+def test_normals():
+    """
+    Test terrain normals from the cached slope
+    map, and that it follows heightmap changes.
+    """
+
+    my_world = World(None, PlaneGenerator(0), chunk_width=4)
+    plane_normal = (-1 / 6 ** 0.5, -2 / 6 ** 0.5, 1 / 6 ** 0.5)
+
+    xs = [0.5, 3.5, 4.5, -3.75, 3.99]
+    ys = [0.5, 3.5, -0.5, 7.25, 3.99]
+
+    normals = my_world.normals_at(xs, ys)
+
+    for index, (x_pos, y_pos) in enumerate(zip(xs, ys)):
+        normal = (normals[0][index], normals[1][index], normals[2][index])
+
+        assert normal == pytest.approx(plane_normal)
+        assert my_world.normal_at(x_pos, y_pos) == pytest.approx(plane_normal)
+
+    my_terrain = my_world.get_chunk((0, 0)).terrain
+
+    assert my_terrain.slope_map()[0][2][1] == 1.0
+
+    my_terrain[2, 2] = 50.0
+
+    assert my_terrain.slope_map()[0][2][1] == 23.0
+    assert my_terrain.normal_at(1.0, 2.0)[0] < -0.9
+    assert my_terrain.normal_at(3.0, 2.0)[0] > 0.9
+
+
+def test_terrain_editing():
+    """
+    Test editing terrain across chunk borders, the
+    dirty rectangle log, and that caches follow the
+    changes just like if they were built anew.
+    """
+
+    my_world = World(None, PlaneGenerator(0), chunk_width=4)
+    my_terrain = my_world.get_chunk((0, 0)).terrain
+
+    for chunk_pos in [(1, 0), (0, 1), (1, 1)]:
+        my_world.get_chunk(chunk_pos)
+
+    slope_map = my_terrain.slope_map()
+    my_terrain.max_pyramid()
+    revision = my_terrain.revision
+
+    changes = my_world.raise_terrain(2, 2, 4, 4, 3.0)
+
+    assert changes[(0, 0)] == (2, 2, 5, 5)
+    assert changes[(1, 1)] == (0, 0, 2, 2)
+    assert set(changes) == {(0, 0), (1, 0), (0, 1), (1, 1)}
+    assert my_terrain.dirty_since(revision) == [(2, 2, 5, 5)]
+    assert my_terrain.dirty_since(my_terrain.revision) == []
+
+    assert my_world.height_at(3.0, 3.0) == 12.0
+    assert my_world.height_at(4.0, 4.0) == 15.0
+    assert my_terrain.get(4, 4) == 15.0
+    assert my_world.height_at(1.0, 3.0) == 7.0
+
+    my_world.flatten_terrain(-1, -1, 2, 2, 1.0)
+    my_world.lower_terrain(3, 0, 1, 1, 2.0)
+
+    assert my_terrain.get(0, 0) == 1.0
+    assert my_world.get_chunk((-1, -1)).terrain.get(3, 3) == 1.0
+    assert my_terrain.get(3, 0) == 1.0
+
+    fresh = TerrainChunk(4)
+    fresh.load_grid([[my_terrain.get(x, y) for x in range(5)] for y in range(5)])
+
+    assert my_terrain.slope_map() is slope_map
+
+    for mine, theirs in zip(my_terrain.slope_map(), fresh.slope_map()):
+        assert [list(row) for row in mine] == [list(row) for row in theirs]
+
+    for mine, theirs in zip(my_terrain.max_pyramid(), fresh.max_pyramid()):
+        assert [list(row) for row in mine] == [list(row) for row in theirs]
+
+    with pytest.raises(ValueError):
+        my_world.stamp_brush(0, 0, [[1.0]], mode="smudge")
+
+
+def test_max_pyramid():
+    """
+    Test the max pyramid of terrain chunks, and
+    using it to skip rays through open air.
+    """
+
+    my_terrain = TerrainChunk(8)
+    my_terrain.generate(PlaneGenerator(0))
+
+    pyramid = my_terrain.max_pyramid()
+
+    assert [len(level) for level in pyramid] == [8, 4, 2, 1]
+    assert pyramid[0][2][3] == my_terrain.get(4, 3)
+    assert pyramid[-1][0][0] == my_terrain.get(8, 8) == 24.0
+
+    # Above the whole chunk, a level ray leaves it at once
+    skip = my_terrain.ray_skip(0.5, 0.5, 30.0, (1.0, 0.0, 0.0))
+    assert 7.5 < skip < 7.6
+
+    # A ray below the highest point must go through smaller nodes
+    skip = my_terrain.ray_skip(0.5, 0.5, 10.0, (1.0, 0.0, 0.0))
+    assert 0.0 < skip < 7.5
+
+    # A ray inside the terrain can't skip anything
+    assert my_terrain.ray_skip(6.5, 6.5, 1.0, (1.0, 0.0, 0.0)) == 0.0
+
+    # Changes to the heightmap rebuild the pyramid
+    my_terrain[1, 1] = 100.0
+    assert my_terrain.max_pyramid()[-1][0][0] == 100.0
+
+
+class StepGenerator(terragen.TerrainGenerator):
+    """
+    Flat ground, with a tall wall from X = 26 onwards,
+    just past the first chunk of a 24-wide world.
+    """
+
+    def height_at(self, x_pos: int, y_pos: int):
+        return 100.0 if x_pos >= 26 else 0.0
+
+
+def test_ray_skip_uneven_width():
+    """
+    Test that rays never skip past the edge of chunks
+    whose width is not a power of two.
+    """
+
+    my_world = World(None, StepGenerator(0), chunk_width=24)
+    my_terrain = my_world.get_chunk((0, 0)).terrain
+
+    # the pyramid's top node covers [0, 32), past the chunk
+    assert [len(level) for level in my_terrain.max_pyramid()] == [24, 12, 6, 3, 2, 1]
+    assert my_world.height_at(27.0, 5.0) > 10.0
+
+    skip = my_terrain.ray_skip(20.0, 5.0, 10.0, (1.0, 0.0, 0.0))
+    assert 3.9 < skip < 4.01
+
+    skip = my_terrain.ray_skip(5.0, 20.0, 10.0, (0.0, 1.0, 0.0))
+    assert 3.9 < skip < 4.01
+
+
+def test_prefetch_chunks():
+    """
+    Test that chunks generated in worker processes
+    match those generated synchronously.
+    """
+
+    generator = SineTerrainGenerator(0)
+
+    sync_world = World(None, generator, chunk_width=8)
+    async_world = World(None, generator, chunk_width=8, chunk_workers=2)
+
+    try:
+        assert async_world.prefetch_chunks(((-1, -1), (1, 0))) == 6
+        assert async_world.prefetch_chunks(((0, 0), (1, 1))) == 2
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            chunk = loop.run_until_complete(async_world.get_chunk_async((2, 2)))
+
+        finally:
+            loop.close()
+
+        assert chunk is async_world.chunks[2, 2]
+
+    finally:
+        async_world.shutdown_chunk_workers()
+
+    assert len(async_world.chunks) == 9
+
+    for chunk_pos, chunk in async_world.chunks.items():
+        expected = sync_world.get_chunk(chunk_pos)
+
+        for y_pos in range(8):
+            for x_pos in range(8):
+                assert abs(
+                    chunk.terrain.get(x_pos, y_pos) - expected.terrain.get(x_pos, y_pos)
+                ) < 1e-5
+
+
+class WorkerFailingGenerator(SineTerrainGenerator):
+    """
+    A terrain generator that fails in any process but
+    the one that made it, like chunk generation workers.
+    """
+
+    def __init__(self, seed: int):
+        super().__init__(seed)
+        self.owner_pid = os.getpid()
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int):
+        if os.getpid() != self.owner_pid:
+            raise RuntimeError("No terrain in workers")
+
+        return super().height_grid(x_offset, y_offset, width)
+
+
+def test_failed_background_chunks():
+    """
+    Test that chunks whose background generation failed
+    are reported once, and generated in place when waited for.
+    """
+
+    my_world = World(
+        None,
+        WorkerFailingGenerator(0),
+        chunk_width=8,
+        chunk_workers=1,
+        nonblocking=True,
+    )
+
+    try:
+        placeholder = my_world.get_chunk((0, 0))
+        my_world._pending_chunks[0, 0].exception()
+
+        with pytest.warns(RuntimeWarning):
+            assert my_world.collect_chunks() == []
+
+        assert my_world.collect_chunks() == []
+        assert my_world.get_chunk((0, 0)) is placeholder
+
+        my_world.get_chunk((1, 0))
+        my_world._pending_chunks[1, 0].exception()
+
+        with pytest.warns(RuntimeWarning):
+            chunk = my_world.get_chunk((1, 0), wait=True)
+
+        assert not chunk.placeholder
+
+        chunk = my_world.get_chunk((0, 0), wait=True)
+
+        assert not chunk.placeholder
+        assert my_world.chunks[0, 0] is chunk
+
+    finally:
+        my_world.shutdown_chunk_workers()
+
+
+def test_background_chunks_need_generator():
+    """
+    Test that chunks are not sent to the generation workers
+    of a world without a terrain generator.
+    """
+
+    my_world = World(None, None, chunk_width=8, chunk_workers=1)
+
+    with pytest.raises(ValueError):
+        my_world._request_chunk((0, 0))
+
+    assert not my_world._pending_chunks
+    assert my_world._chunk_executor is None
+
+
+@pytest.fixture(params=["default", "python"])
+def sampling_backend(request, monkeypatch):
+    """
+    Runs a test with the default terrain sampling kernels,
+    then again without the CFFI interpolator at all.
+    """
+
+    if request.param == "python":
+        monkeypatch.setattr(terrain, "USE_CFFI_INTERPOLATOR", False)
+
+        for kernel in (
+            terrain.SAMPLE_KERNEL,
+            terrain.SAMPLE_MANY_KERNEL,
+            terrain.GRADIENT_MANY_KERNEL,
+        ):
+            monkeypatch.setattr(kernel, "function", kernel.implementations["python"])
+
+    return request.param
+
+
+def test_nonblocking_chunks(sampling_backend):
+    """
+    Test that non-blocking worlds stand placeholders in for
+    missing chunks, and swap the real chunks in once ready.
+    """
+
+    generator = SineTerrainGenerator(0)
+
+    sync_world = World(None, generator, chunk_width=8)
+    flat_world = World(
+        None, generator, chunk_width=8, chunk_workers=2, nonblocking=True
+    )
+    lod_world = World(
+        None,
+        generator,
+        chunk_width=8,
+        chunk_workers=2,
+        nonblocking=True,
+        placeholder="lod",
+    )
+
+    with pytest.raises(ValueError):
+        World(None, generator, placeholder="nothing")
+
+    ready = []
+
+    try:
+        placeholder = flat_world.get_chunk((1, 2))
+
+        assert placeholder.placeholder
+        assert placeholder.terrain.get(3, 3) == flat_world.base_height
+        assert flat_world.get_chunk((1, 2)) is placeholder
+
+        flat_world.on_chunk_ready((1, 2), ready.append)
+        assert not ready
+
+        lod_placeholder = lod_world.get_chunk((0, 0))
+
+        assert lod_placeholder.placeholder
+        expected = sync_world.get_chunk((0, 0)).terrain.get(4, 4)
+        assert abs(lod_placeholder.terrain.get(4, 4) - expected) < 2.0
+
+        chunk = lod_world.get_chunk((0, 0), wait=True)
+        assert not chunk.placeholder
+
+        # a placeholder nothing is generating anymore is replaced too
+        flat_world.get_chunk((3, 3))
+        flat_world._pending_chunks.pop((3, 3)).cancel()
+        usage = flat_world.memory_usage
+
+        chunk = flat_world.get_chunk((3, 3), wait=True)
+        assert not chunk.placeholder
+        assert flat_world.chunks[3, 3] is chunk
+        assert flat_world.memory_usage == usage
+
+    finally:
+        flat_world.shutdown_chunk_workers()
+        lod_world.shutdown_chunk_workers()
+
+    assert len(ready) == 1
+    chunk = ready[0]
+
+    assert chunk is flat_world.chunks[1, 2]
+    assert not chunk.placeholder
+
+    later = []
+    flat_world.on_chunk_ready((1, 2), later.append)
+    assert later == [chunk]
+
+    expected = sync_world.get_chunk((1, 2))
+
+    for y_pos in range(8):
+        for x_pos in range(8):
+            assert abs(
+                chunk.terrain.get(x_pos, y_pos) - expected.terrain.get(x_pos, y_pos)
+            ) < 1e-5
+
+
+def test_quantized_terrain():
+    """
+    Test that quantized terrain chunks stay within
+    their error bound of float terrain chunks.
+    """
+
+    pytest.importorskip("numpy")
+
+    generator = FractalTerrainGenerator(3)
+
+    exact = TerrainChunk(16)
+    exact.generate(generator)
+
+    quantized = QuantizedTerrainChunk(16)
+    quantized.generate(generator)
+
+    assert quantized.memory_usage() < exact.memory_usage() * 0.6
+
+    step = quantized.height_scale
+    assert step == MIN_QUANTIZATION_STEP
+
+    for y_pos in range(17):
+        for x_pos in range(17):
+            assert abs(quantized.get(x_pos, y_pos) - exact.get(x_pos, y_pos)) <= step
+
+    xs = [0.0, 0.5, 3.25, 9.75, 15.5]
+    ys = [0.0, 1.5, 2.5, 12.25, 15.5]
+
+    for mine, theirs in zip(quantized.sample_many(xs, ys), exact.sample_many(xs, ys)):
+        assert abs(mine - theirs) <= step
+
+    gradients = zip(quantized.gradient_many(xs, ys), exact.gradient_many(xs, ys))
+
+    for mine, theirs in gradients:
+        for my_value, their_value in zip(mine, theirs):
+            assert abs(my_value - their_value) <= 2 * step
+
+    # Out of range edits requantize the whole chunk
+    quantized[4, 4] = 1000.0
+
+    assert quantized.height_scale >= 2 * step
+    assert abs(quantized[4, 4] - 1000.0) <= quantized.height_scale / 2
+    assert abs(quantized.get(5, 5) - exact.get(5, 5)) <= quantized.height_scale
+
+
+def test_generator_graph():
+    """
+    Test that generator graphs match their per-point
+    equivalent, and evaluate shared inputs only once.
+    """
+
+    pytest.importorskip("numpy")
+
+    class CountingGenerator(PlaneGenerator):
+        """
+        A tilted plane, counting how many blocks it
+        was evaluated over.
+        """
+
+        calls = 0
+
+        def height_grid(self, x_offset: int, y_offset: int, width: int):
+            self.calls += 1
+            return super().height_grid(x_offset, y_offset, width)
+
+    plane = CountingGenerator(0)
+    hills = FractalTerrainGenerator(2, scale=8.0)
+
+    terrain = graph.Add(
+        graph.Clamp(graph.Scale(plane, 0.5, 1.0), high=6.0),
+        graph.Mask(hills, graph.Scale(plane, 0.1), graph.Constant(3.0)),
+        graph.Multiply(plane, graph.Constant(0.25)),
+    )
+
+    grid = terrain.height_grid(-2, 1, 8)
+    assert plane.calls == 1
+
+    for y_pos in range(8):
+        for x_pos in range(8):
+            point_x = x_pos - 2
+            point_y = y_pos + 1
+
+            flat = point_x + 2 * point_y
+            alpha = min(max(flat * 0.1, 0.0), 1.0)
+
+            expected = (
+                min(flat * 0.5 + 1.0, 6.0)
+                + 3.0
+                + (hills.height_at(point_x, point_y) - 3.0) * alpha
+                + flat * 0.25
+            )
+
+            assert abs(grid[y_pos][x_pos] - expected) < 1e-9
+            assert abs(terrain.height_at(point_x, point_y) - expected) < 1e-9
+
+    # A constant warp shifts the input
+    warped = graph.DomainWarp(
+        hills, graph.Constant(1.5), graph.Constant(-2.0), strength=2.0
+    )
+    grid = warped.height_grid(0, 0, 4)
+
+    for y_pos in range(4):
+        for x_pos in range(4):
+            expected = hills.height_at(x_pos + 3.0, y_pos - 4.0)
+            assert abs(grid[y_pos][x_pos] - expected) < 1e-9
+
+    # Graphs generate chunks like any other generator
+    my_terrain = TerrainChunk(8)
+    my_terrain.generate(graph.Scale(plane, 2.0))
+
+    assert my_terrain.get(3, 4) == 22.0
+
+    # Nodes must say how they are evaluated
+    class Incomplete(graph.GraphGenerator):
+        """A graph node that forgot to override evaluate."""
+
+    with pytest.raises(TypeError):
+        Incomplete(plane)
+
+
+def test_terrain_lod():
+    """
+    Test coarse levels of detail of terrain chunks, and
+    that far queries do not generate full chunks.
+    """
+
+    my_terrain = TerrainChunk(8)
+    my_terrain.generate(PlaneGenerator(0))
+
+    half = my_terrain.lod(1)
+
+    assert my_terrain.lod(0) is my_terrain
+    assert half.width == 4
+    assert half.get(1, 3) == my_terrain.get(2, 6)
+    assert half.get(4, 4) == my_terrain.get(8, 8)
+    assert my_terrain.lod(3).width == 1
+    assert my_terrain.lod(1) is half
+
+    with pytest.raises(ValueError):
+        my_terrain.lod(4)
+
+    my_terrain[2, 2] = 100.0
+    assert my_terrain.lod(1).get(1, 1) == 100.0
+
+    my_world = World(None, PlaneGenerator(0), chunk_width=8, lod_distances=(10, 20))
+
+    assert my_world.max_lod_level == 3
+    levels = [my_world.lod_level(distance) for distance in (0, 10, 15, 25, 1000)]
+    assert levels == [0, 1, 1, 2, 2]
+
+    # planes are interpolated exactly at any level
+    assert abs(my_world.lod_height_at(37.3, -12.9, 2) - (37.3 - 2 * 12.9)) < 1e-4
+    assert abs(my_world.height_at_distance(5.5, 1.0, 100.0) - 7.5) < 1e-4
+    assert not my_world.chunks
+    assert ((4, -2), 2) in my_world.coarse_chunks
+
+    normal = my_world.lod_normal_at(37.3, -12.9, 2)
+    assert not my_world.chunks
+
+    for mine, theirs in zip(normal, my_world.normal_at(37.3, -12.9)):
+        assert abs(mine - theirs) < 1e-5
+
+    # once generated, chunks serve their own coarse versions
+    chunk = my_world.get_chunk((4, -2))
+
+    assert ((4, -2), 2) not in my_world.coarse_chunks
+    assert my_world.lod_terrain((4, -2), 2) is chunk.terrain.lod(2)
@@ -15,6 +15,7 @@ side at all.
 import typing
 import uuid
 
+from .. import kernels
 from . import object_type, objects, world
 
 
@@ -32,11 +33,19 @@ class Game:
     the network.
     """
 
-    def __init__(self):
+    def __init__(self, autoselect_kernels: bool = True):
         """
         Creates a new, empty game, with an empty world
         and no objects or object types populating it.
+
+        Unless autoselect_kernels is unset, the fastest
+        implementation of every kernel is picked first;
+        the choice is persisted, so it is only measured
+        once per machine (see kernels.autoselect).
         """
+        if autoselect_kernels:
+            kernels.autoselect()
+
         self.world = world.World(self)
         self.objects: typing.Dict[uuid.UUID, objects.GameObject] = {}
 
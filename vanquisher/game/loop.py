@@ -0,0 +1,291 @@
+"""
+A fixed timestep game loop, which can be run from any context.
+
+The playsim always advances in ticks of the same length, no matter
+how fast frames are drawn or how much real time went by, so that
+it behaves the same on every machine, and on the server and its
+clients alike. Real time is fed to the loop (or read from a clock,
+if the loop is run by itself), piles up in an accumulator, and is
+spent one tick at a time.
+
+If ticks take longer than their length, the loop would fall ever
+further behind, running ever more ticks to catch up; instead, it
+runs at most a bounded number of ticks per advance, and drops the
+rest of the backlog, slowing the game down rather than spiralling.
+While catching up, skippable phases (such as installing chunks
+generated in the background) only run on the last tick.
+
+Every tick runs a list of phases (by default, networking if a
+network hook is given, chunk generation, object scripts and
+physics), each of which is timed, so that one can see which one
+eats the tick budget. Render hooks are called after every advance
+with how far into the next tick the game is, to interpolate
+between the last two ticks.
+"""
+
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from . import Game
+
+
+# Runs a phase of a tick, given the length of the tick, in seconds.
+PhaseFunction = typing.Callable[[float], typing.Any]
+
+# Called after every advance, with how far (from 0 to 1) into the
+# next tick the game is.
+RenderHook = typing.Callable[[float], typing.Any]
+
+
+class PhaseTiming:
+    """How long a phase of the game loop takes to run."""
+
+    # The weight of every new sample in the moving average.
+    SMOOTHING = 0.1
+
+    def __init__(self):
+        """Initializes these timings, with no samples yet."""
+        self.last = 0.0
+        self.average = 0.0
+        self.peak = 0.0
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, duration: float):
+        """Records how long a run of the phase took, in seconds."""
+        self.last = duration
+        self.peak = max(self.peak, duration)
+        self.total += duration
+
+        if self.count == 0:
+            self.average = duration
+
+        else:
+            self.average += (duration - self.average) * self.SMOOTHING
+
+        self.count += 1
+
+
+class Phase:
+    """A phase of every tick of the game loop."""
+
+    def __init__(self, name: str, function: PhaseFunction, skippable: bool = False):
+        """Initializes this phase.
+
+        Skippable phases are only run on the last of the ticks
+        run to catch up; see GameLoop.advance.
+        """
+        self.name = name
+        self.function = function
+        self.skippable = skippable
+        self.timing = PhaseTiming()
+
+
+class GameLoop:
+    """Runs a game at a fixed tick rate, with bounded catch-up."""
+
+    def __init__(
+        self,
+        game: "Game",
+        tick_rate: float = 30.0,
+        max_catch_up: int = 5,
+        network: typing.Optional[PhaseFunction] = None,
+        clock: typing.Callable[[], float] = time.perf_counter,
+        sleep: typing.Callable[[float], typing.Any] = time.sleep,
+    ):
+        """Initializes a game loop for a game.
+
+        tick_rate is the number of ticks per second of game time.
+        At most max_catch_up ticks are run per advance, however
+        far behind the loop is.
+
+        network, if given, is run as the first phase of every
+        tick, to send and receive game state. clock and sleep
+        are only used by run.
+        """
+        if tick_rate <= 0.0:
+            raise ValueError("The tick rate must be positive")
+
+        if max_catch_up < 1:
+            raise ValueError("At least one tick must be run per advance")
+
+        self.game = game
+        self.time_step = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up
+
+        self.clock = clock
+        self.sleep = sleep
+
+        # Real time not spent on ticks yet, in seconds.
+        self.accumulator = 0.0
+
+        self.ticks = 0
+        self.dropped_ticks = 0
+
+        # Whether the last advance had to drop time to keep up.
+        self.overloaded = False
+
+        self.phases: typing.List[Phase] = []
+        self.render_hooks: typing.List[RenderHook] = []
+
+        self.tick_timing = PhaseTiming()
+
+        self.running = False
+
+        if network is not None:
+            self.add_phase("network", network)
+
+        self.add_phase("chunks", lambda _: game.world.update_chunks(), skippable=True)
+        self.add_phase("scripts", lambda _: game.world.run_object_scripts())
+        self.add_phase("physics", game.world.update_physics)
+
+    def add_phase(
+        self,
+        name: str,
+        function: PhaseFunction,
+        skippable: bool = False,
+        before: typing.Optional[str] = None,
+    ) -> Phase:
+        """Adds a phase to every tick, last, or before another phase.
+
+        Raises ValueError if a phase of that name already exists,
+        or if before names no phase.
+        """
+        if any(phase.name == name for phase in self.phases):
+            raise ValueError("There already is a phase named {}".format(name))
+
+        phase = Phase(name, function, skippable)
+
+        if before is None:
+            self.phases.append(phase)
+
+        else:
+            self.phases.insert(self._phase_index(before), phase)
+
+        return phase
+
+    def remove_phase(self, name: str):
+        """Removes a phase; raises ValueError if there is none of that name."""
+        del self.phases[self._phase_index(name)]
+
+    def _phase_index(self, name: str) -> int:
+        """The position of a phase in the tick; raises ValueError if there is none."""
+        for index, phase in enumerate(self.phases):
+            if phase.name == name:
+                return index
+
+        raise ValueError("No phase named {}".format(name))
+
+    def add_render_hook(self, hook: RenderHook):
+        """Adds a function to call after every advance, to render the game.
+
+        It is given how far into the next tick the game is, from
+        0 to 1, to interpolate between the last two ticks.
+        """
+        self.render_hooks.append(hook)
+
+    @property
+    def alpha(self) -> float:
+        """How far into the next tick the game is, from 0 to 1."""
+        return self.accumulator / self.time_step
+
+    def tick(self, skip: bool = False):
+        """Runs a single tick, timing each of its phases.
+
+        If skip is set, skippable phases are not run.
+        """
+        tick_start = self.clock()
+
+        for phase in self.phases:
+            if skip and phase.skippable:
+                continue
+
+            start = self.clock()
+            phase.function(self.time_step)
+            phase.timing.record(self.clock() - start)
+
+        self.tick_timing.record(self.clock() - tick_start)
+        self.ticks += 1
+
+    def advance(self, elapsed: float) -> int:
+        """Advances the game by an amount of real time, in seconds.
+
+        Runs as many ticks as the time (plus what was left from
+        the last advance) covers, but at most max_catch_up; then
+        the backlog beyond less than a tick is dropped, and counted
+        in dropped_ticks. Render hooks are called afterwards.
+
+        Returns the number of ticks run.
+        """
+        self.accumulator += max(0.0, elapsed)
+
+        due = int(self.accumulator // self.time_step)
+        ran = min(due, self.max_catch_up)
+
+        self.overloaded = due > ran
+
+        if self.overloaded:
+            self.dropped_ticks += due - ran
+            self.accumulator -= (due - ran) * self.time_step
+
+        for index in range(ran):
+            self.tick(skip=index < ran - 1)
+            self.accumulator -= self.time_step
+
+        # floating point errors must not leave a tick's worth behind
+        self.accumulator = min(max(self.accumulator, 0.0), self.time_step)
+
+        for hook in self.render_hooks:
+            hook(self.alpha)
+
+        return ran
+
+    def run(self, max_ticks: typing.Optional[int] = None):
+        """Runs the game in real time, until stop is called.
+
+        Uses clock to measure time, and sleep to wait for the
+        next tick when ahead. If max_ticks is given, also stops
+        once that many ticks were run by this call.
+        """
+        self.running = True
+        last_time = self.clock()
+        stop_at = None if max_ticks is None else self.ticks + max_ticks
+
+        while self.running and (stop_at is None or self.ticks < stop_at):
+            now = self.clock()
+            self.advance(now - last_time)
+            last_time = now
+
+            wait = self.time_step - self.accumulator
+
+            if wait > 0.0:
+                self.sleep(wait)
+
+        self.running = False
+
+    def stop(self):
+        """Makes run return, after the current advance."""
+        self.running = False
+
+    def report(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        """How long every phase, and whole ticks, take.
+
+        For each phase (and "tick", for whole ticks): the last,
+        average (a moving average) and peak durations, in seconds,
+        the number of runs, and the share of the tick budget (the
+        length of a tick) the average takes.
+        """
+        timings = [(phase.name, phase.timing) for phase in self.phases]
+        timings.append(("tick", self.tick_timing))
+
+        return {
+            name: {
+                "last": timing.last,
+                "average": timing.average,
+                "peak": timing.peak,
+                "count": timing.count,
+                "budget_share": timing.average / self.time_step,
+            }
+            for name, timing in timings
+        }
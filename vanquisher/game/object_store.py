@@ -0,0 +1,339 @@
+"""
+A struct-of-arrays store of game object physics state.
+
+By default, every GameObject keeps its position, speeds and
+physical properties as attributes of its own, and is ticked
+one at a time. Worlds created with batch_physics=True keep
+those in contiguous NumPy arrays instead, one element per
+object slot, so that the physics steps of a tick (vertical
+integration, floor clamping, bouncing, rolling, gravity and
+friction) run as batched array operations over every object
+at once. Object scripts still see, and tick, one object at a
+time.
+
+Requires NumPy.
+"""
+
+import math
+import typing
+
+from ..numpy import numpy as np
+from ..numpy import require_numpy
+from . import vector
+
+if typing.TYPE_CHECKING:
+    from . import objects, world
+
+
+# Every per-object value kept in the store, one array each.
+FIELDS = (
+    "pos_x",
+    "pos_y",
+    "horz_x",
+    "horz_y",
+    "height",
+    "vel_speed",
+    "restitution",
+    "rolling",
+    "friction",
+    "gravity",
+)
+
+
+class StoredField:
+    """A GameObject attribute that lives in its ObjectStore, if it has one.
+
+    Otherwise, it is kept in the object itself, under the same
+    name with a leading underscore.
+    """
+
+    def __init__(self):
+        """Initializes this field; its name is set by __set_name__."""
+        self.name = ""
+        self.private = ""
+
+    def __set_name__(self, owner: type, name: str):
+        """Learns the name of the attribute this field is."""
+        self.name = name
+        self.private = "_" + name
+
+    def __get__(
+        self, obj: typing.Any, owner: typing.Optional[type] = None
+    ) -> typing.Any:
+        """Gets the value of this field, from the store if there is one."""
+        if obj is None:
+            return self
+
+        if obj.store is None:
+            return obj.__dict__[self.private]
+
+        return float(obj.store.arrays[self.name][obj.slot])
+
+    def __set__(self, obj: typing.Any, value: float):
+        """Sets the value of this field, in the store if there is one."""
+        if obj.store is None:
+            obj.__dict__[self.private] = value
+
+        else:
+            obj.store.arrays[self.name][obj.slot] = value
+
+
+class StoredVec2(vector.Vec2):
+    """A Vec2 whose coordinates live in two arrays of an ObjectStore.
+
+    It is not pooled; done does nothing. Its size is computed
+    when asked for, rather than kept up to date.
+    """
+
+    def __init__(self, store: "ObjectStore", x_field: str, y_field: str, slot: int):
+        """Makes a view of a slot of two fields of a store.
+
+        Unlike Vec2's, this leaves the coordinates as they are.
+        """
+        self._pool = None
+        self._index = None
+        self._used = True
+
+        self._store = store
+        self._x_field = x_field
+        self._y_field = y_field
+        self._slot = slot
+
+    @property
+    def x(self) -> float:  # type: ignore
+        """The X coordinate."""
+        return float(self._store.arrays[self._x_field][self._slot])
+
+    @x.setter
+    def x(self, value: float):
+        """Sets the X coordinate."""
+        self._store.arrays[self._x_field][self._slot] = value
+
+    @property
+    def y(self) -> float:  # type: ignore
+        """The Y coordinate."""
+        return float(self._store.arrays[self._y_field][self._slot])
+
+    @y.setter
+    def y(self, value: float):
+        """Sets the Y coordinate."""
+        self._store.arrays[self._y_field][self._slot] = value
+
+    @property
+    def size(self) -> float:  # type: ignore
+        """The length of this vector."""
+        return math.hypot(self.x, self.y)
+
+    @size.setter
+    def size(self, value: float):
+        """Ignored; the size is always computed from the coordinates."""
+
+    def update(self):
+        """Does nothing; the size is always computed from the coordinates."""
+
+
+class ObjectStore:
+    """The physics state of game objects, as arrays indexed by object slot.
+
+    Slots are handed out as objects are added, and reused once
+    they are removed; the arrays double in size when full.
+    """
+
+    def __init__(self, capacity: int = 64):
+        """Initializes an empty store, with room for a number of objects.
+
+        Requires NumPy.
+        """
+        require_numpy("ObjectStore")
+
+        self.capacity = max(1, capacity)
+
+        self.arrays: typing.Dict[str, "np.ndarray"] = {
+            field: np.zeros(self.capacity, dtype=np.float64) for field in FIELDS
+        }
+
+        # Whether each slot holds an object.
+        self.used: "np.ndarray" = np.zeros(self.capacity, dtype=bool)
+        self.objects: typing.List[typing.Optional["objects.GameObject"]] = [
+            None
+        ] * self.capacity
+
+        # Free slots, the lowest last, so it is handed out first.
+        self.free: typing.List[int] = list(range(self.capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        """How many objects are in this store."""
+        return self.capacity - len(self.free)
+
+    def _grow(self):
+        """Doubles the capacity of this store."""
+        old_capacity = self.capacity
+        self.capacity *= 2
+
+        for field, values in self.arrays.items():
+            grown = np.zeros(self.capacity, dtype=np.float64)
+            grown[:old_capacity] = values
+            self.arrays[field] = grown
+
+        used = np.zeros(self.capacity, dtype=bool)
+        used[:old_capacity] = self.used
+        self.used = used
+
+        self.objects.extend([None] * old_capacity)
+        self.free.extend(range(self.capacity - 1, old_capacity - 1, -1))
+
+    def add(self, obj: "objects.GameObject") -> int:
+        """Moves the physics state of an object into this store.
+
+        From then on, the object's fields and vectors read and
+        write the store's arrays. Returns the object's slot.
+        """
+        if obj.store is not None:
+            raise ValueError("The object is already in a store")
+
+        if not self.free:
+            self._grow()
+
+        slot = self.free.pop()
+        values = {
+            "pos_x": obj.pos.x,
+            "pos_y": obj.pos.y,
+            "horz_x": obj.horz_speed.x,
+            "horz_y": obj.horz_speed.y,
+        }
+
+        for field in FIELDS[4:]:
+            values[field] = getattr(obj, field)
+
+        for field, value in values.items():
+            self.arrays[field][slot] = value
+
+        self.used[slot] = True
+        self.objects[slot] = obj
+
+        obj.pos.done()
+        obj.horz_speed.done()
+
+        obj.store = self
+        obj.slot = slot
+        obj.pos = StoredVec2(self, "pos_x", "pos_y", slot)
+        obj.horz_speed = StoredVec2(self, "horz_x", "horz_y", slot)
+
+        return slot
+
+    def remove(self, obj: "objects.GameObject"):
+        """Moves the physics state of an object back out of this store.
+
+        The object keeps working as before it was added.
+        """
+        slot = obj.slot
+
+        if obj.store is not self or slot is None:
+            raise ValueError("The object is not in this store")
+
+        values = {field: float(self.arrays[field][slot]) for field in FIELDS}
+
+        obj.store = None
+        obj.slot = None
+        obj.pos = vector.vec2(values["pos_x"], values["pos_y"])
+        obj.horz_speed = vector.vec2(values["horz_x"], values["horz_y"])
+
+        for field in FIELDS[4:]:
+            setattr(obj, field, values[field])
+
+        self.used[slot] = False
+        self.objects[slot] = None
+        self.free.append(slot)
+
+    def _push(
+        self, my_world: "world.World", slots: "np.ndarray", time_delta: float
+    ) -> "np.ndarray":
+        """Pushes objects by their horizontal speed, like GameObject.push.
+
+        Offsets are scaled by the slope between where each object
+        is and where it is headed, then applied all at once; only
+        updating where moved objects are registered is done one
+        object at a time. Objects are then kept above the floor.
+        Returns the floor heights at the new positions.
+        """
+        arrays = self.arrays
+
+        pos_x = arrays["pos_x"][slots]
+        pos_y = arrays["pos_y"][slots]
+        off_x = arrays["horz_x"][slots] * time_delta
+        off_y = arrays["horz_y"][slots] * time_delta
+
+        slope = np.asarray(
+            my_world.heights_at(pos_x + off_x, pos_y + off_y)
+        ) - np.asarray(my_world.heights_at(pos_x, pos_y))
+
+        # uphill slows objects down, downhill speeds them up
+        scale = np.where(slope > 0.0, 1.0 / (1.0 + np.abs(slope)), 1.0 - slope)
+
+        arrays["pos_x"][slots] = pos_x + off_x * scale
+        arrays["pos_y"][slots] = pos_y + off_y * scale
+
+        for slot in slots[(off_x != 0.0) | (off_y != 0.0)]:
+            self.objects[slot].relocated()
+
+        floor = np.asarray(
+            my_world.heights_at(arrays["pos_x"][slots], arrays["pos_y"][slots])
+        )
+
+        # like GameObject.check_physical_state, after every move
+        arrays["height"][slots] = np.maximum(arrays["height"][slots], floor)
+
+        return floor
+
+    def tick_physics(self, my_world: "world.World", time_delta: float):
+        """Ticks the physics of every object in this store.
+
+        Does what GameObject.tick_physics does to every object,
+        batched over the whole store: heights are integrated,
+        every object is pushed by its speed, clamped to the floor
+        (bouncing and rolling off slopes), falls, and slows down
+        by friction, all at once. Tick callbacks are left to the
+        world; see World.run_object_scripts.
+        """
+        slots = np.flatnonzero(self.used)
+
+        if not len(slots):
+            return
+
+        arrays = self.arrays
+
+        arrays["height"][slots] += arrays["vel_speed"][slots] * time_delta
+
+        floor = self._push(my_world, slots, time_delta)
+
+        height = arrays["height"][slots]
+        vel_speed = arrays["vel_speed"][slots]
+        friction = arrays["friction"][slots]
+
+        below = height < floor
+        above = height > floor
+
+        height[below] = floor[below]
+        vel_speed[below] = -vel_speed[below] * np.maximum(
+            0.0, arrays["restitution"][slots][below]
+        )
+        vel_speed[above] += my_world.gravity * time_delta
+
+        rolling = below & (arrays["rolling"][slots] != 0.0)
+
+        if rolling.any():
+            rolled = slots[rolling]
+            norm_x, norm_y, norm_z = my_world.normals_at(
+                arrays["pos_x"][rolled], arrays["pos_y"][rolled]
+            )
+            push = vel_speed[rolling] * friction[rolling] / np.asarray(norm_z)
+
+            arrays["horz_x"][rolled] += np.asarray(norm_x) * push
+            arrays["horz_y"][rolled] += np.asarray(norm_y) * push
+
+        arrays["height"][slots] = height
+        arrays["vel_speed"][slots] = vel_speed
+
+        decay = friction ** time_delta
+        arrays["horz_x"][slots] *= decay
+        arrays["horz_y"][slots] *= decay
@@ -162,6 +162,46 @@ class GameContextJS:
         for obj in self.__game.objects.values():
             callback(obj.js_wrapper)
 
+    def iter_box_objects(
+        self,
+        callback: "objects.ObjectCallback",
+        min_x: float,
+        min_y: float,
+        max_x: float,
+        max_y: float,
+        type_filter: typing.Optional[str] = None,
+    ):
+        """
+        Iterates on all objects inside an axis-aligned box,
+        optionally only of a given type. For each object,
+        calls the callback.
+        """
+
+        for obj in self.__game.world.objects_in_box(
+            (min_x, min_y), (max_x, max_y), type_filter
+        ):
+            callback(obj.js_wrapper)
+
+    def nearest(
+        self,
+        pos_x: float,
+        pos_y: float,
+        count: int,
+        type_filter: typing.Optional[str] = None,
+    ) -> typing.List["objects.GameObjectJS"]:
+        """
+        Finds the objects nearest to a position, nearest
+        first, up to a count of them, optionally only of
+        a given type.
+        """
+
+        return [
+            obj.js_wrapper
+            for obj in self.__game.world.nearest(
+                (pos_x, pos_y), int(count), type_filter
+            )
+        ]
+
 
 class ObjectTypeContext:
     """
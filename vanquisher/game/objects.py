@@ -4,13 +4,13 @@ both for Python and for the object definitions in
 JavaScript.
 """
 
-import math
 import typing
 import uuid
+import warnings
 
 import typing_extensions as typext
 
-from . import object_type, vector, world
+from . import object_store, object_type, vector, world
 
 
 class ObjectCallback(typext.Protocol):
@@ -80,8 +80,19 @@ class VariableNotFoundCallback(typext.Protocol):
 class GameObject:
     """
     A game object.
+
+    Its physics state lives either in its own attributes, or,
+    in worlds that have one, in an ObjectStore; either way,
+    it is accessed the same.
     """
 
+    height = object_store.StoredField()
+    vel_speed = object_store.StoredField()
+    restitution = object_store.StoredField()
+    gravity = object_store.StoredField()
+    friction = object_store.StoredField()
+    rolling = object_store.StoredField()
+
     def __init__(
         self,
         my_world: "world.World",
@@ -94,8 +105,8 @@ class GameObject:
         rolling: float = 0.5,
         horz_speed: typing.Tuple[float, float] = (0, 0),
         friction: float = 0.7,
-        num_roll_samples: int = 8,
-        sample_distance: float = 0.5,
+        num_roll_samples: typing.Optional[int] = None,
+        sample_distance: typing.Optional[float] = None,
         gravity: float = 1.0,
     ):
         """
@@ -104,25 +115,37 @@ class GameObject:
         This is not sufficient to place your object in the world,
         as you still have to add it. If you want a simpler way
         to create objects, see  World.object_create.
+
+        num_roll_samples and sample_distance are deprecated, and
+        ignored; rolling now uses the terrain's slope map.
         """
+        if num_roll_samples is not None or sample_distance is not None:
+            warnings.warn(
+                "num_roll_samples and sample_distance are deprecated and ignored",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
         self.identifier = identifier or uuid.uuid4()
 
+        # The store the physics state of this object is in, if any,
+        # and its slot there; see ObjectStore.add.
+        self.store: typing.Optional[object_store.ObjectStore] = None
+        self.slot: typing.Optional[int] = None
+
         self.pos: vector.Vec2 = vector.from_tuple2(pos)
         self.horz_speed: vector.Vec2 = vector.from_tuple2(horz_speed)
 
         self.world = my_world
         self.chunk = self.world.chunk_at_pos(self.pos.as_tuple())
 
-        self.height: float = height if height is not None else self.floor_height()
-        self.vel_speed: float = vel_speed
-
-        self.restitution: float = restitution
-        self.gravity: float = gravity
-        self.friction: float = friction
-        self.rolling: float = rolling
+        self.height = height if height is not None else self.floor_height()
+        self.vel_speed = vel_speed
 
-        self.num_roll_samples: int = num_roll_samples
-        self.sample_distance: float = sample_distance
+        self.restitution = restitution
+        self.gravity = gravity
+        self.friction = friction
+        self.rolling = rolling
 
         self._obj_type = obj_type
         self.type: object_type.ObjectType = self.game().object_types.get_type(
@@ -144,14 +167,14 @@ class GameObject:
         The height of the floor at this game object's position.
         """
 
-        return self.chunk.terrain[self.pos.as_tuple()]
+        return self.world.height_at(*self.pos.as_tuple())
 
     def offset_floor_height(self, off_x: float, off_y: float):
         """
         The height of the floor at a position near that of this game object.
         """
 
-        return self.chunk.terrain[self.pos.x + off_x, self.pos.y + off_y]
+        return self.world.height_at(self.pos.x + off_x, self.pos.y + off_y)
 
     def game(self):
         """
@@ -171,6 +194,19 @@ class GameObject:
         to game physics, use `push` instead.
         """
 
+        self.pos.increment(offset_x, offset_y)
+        self.relocated()
+
+        self.check_physical_state()
+
+    def relocated(self):
+        """
+        Updates the object index and chunk this object is
+        registered to, after its position changed.
+        """
+
+        self.world.object_index.move(self.identifier, *self.pos.as_tuple())
+
         new_chunk = self.world.chunk_at_pos(self.pos.as_tuple())
 
         if self.chunk is not new_chunk:
@@ -179,10 +215,6 @@ class GameObject:
 
             self.chunk = new_chunk
 
-        self.pos.increment(offset_x, offset_y)
-
-        self.check_physical_state()
-
     def check_physical_state(self):
         """
         Prevents states that would break the laws of physics,
@@ -214,37 +246,45 @@ class GameObject:
         """
         Obtains the roll vector of this GaemObject.
 
-        It's the direction of the downward slope,
-        obtained by sampling the surrounding areas
-        to find the most "downward" way.
-
-        Square roots on sampled heights ensure that
-        a general direction is favoured over a single
-        narrow steep.
+        It's the direction of the downward slope, as
+        steep as the slope itself, taken from the
+        terrain's cached slope map in a single lookup.
+        The slope map is smoothed over neighbouring
+        heightmap points, so that a general direction
+        is favoured over a single narrow steep.
         """
 
-        roll_vec = [0.0, 0.0]
+        norm_x, norm_y, norm_z = self.world.normal_at(*self.pos.as_tuple())
 
-        for sample_index in range(self.num_roll_samples):
-            samp_angle = math.pi * sample_index * 2 / self.num_roll_samples
+        return vector.vec2(norm_x / norm_z, norm_y / norm_z)
 
-            samp_x = math.cos(samp_angle) * self.sample_distance
-            samp_y = math.sin(samp_angle) * self.sample_distance
-
-            samp_height = self.offset_floor_height(samp_x, samp_y)
+    def tick_callback(self):
+        """
+        Calls the tick callback of this object's type, if it has one.
+        """
 
-            roll_vec[0] -= math.sqrt(samp_x * samp_height)
-            roll_vec[1] -= math.sqrt(samp_y * samp_height)
+        callback = self.type.callbacks.get("tick")
 
-        return vector.vec2(*roll_vec)
+        if callback:
+            callback(self.js_wrapper)
 
     def tick(self, time_delta: float):
         """
         Updates the object;
+
+        That is, calls its tick callback, then ticks its physics.
+        """
+
+        self.tick_callback()
+        self.tick_physics(time_delta)
+
+    def tick_physics(self, time_delta: float):
         """
+        Updates the physics of the object: falling, moving,
+        bouncing, rolling and slowing down.
 
-        if self.type.callbacks["tick"]:
-            self.type.callbacks["tick"](self)
+        Objects in an ObjectStore are ticked by it instead.
+        """
 
         self.height += self.vel_speed * time_delta
 
@@ -474,7 +514,7 @@ class GameObjectJS:
     def iter_radius_objects(
         self,
         callback: ObjectCallback,
-        radius: float = None,
+        radius: typing.Optional[float] = None,
         type_filter: typing.Optional[str] = None,
     ):
         """
@@ -484,51 +524,54 @@ class GameObjectJS:
         found.
 
         Instead of checking every object in the world, this
-        skips far away chunks and only checks chunks that
-        have any corner within a radius of this object.
-        """
-
-        if type_filter is not None:
-            type_filter = type_filter.lower()
-
-        my_world = self.__obj.world
-
-        # Chunks are square. The diagonal of a square is the largest distance
-        # within said square. t is sqrt(2) times the width of the square.
-        # So sqrt(2) * world.chunk_width is the maximum we need to add to the
-        # search radius to make sure we don't rule out eligible chunks.
-        # Also, a little epsilon, just to be extra sure!
-        if radius is not None:
-            max_chunk_dist_sq = (
-                radius + math.sqrt(2) * my_world.chunk_width + 0.0001
-            ) ** 2
-
-        for chunk in my_world.chunks.values():
-            # check if chunk overlaps radius
-            if radius is not None:
-                corner_x, corner_y = (
-                    (chunk.chunk_pos[0] + 0.5) * my_world.chunk_width,
-                    (chunk.chunk_pos[1] + 0.5) * my_world.chunk_width,
-                )
-
-                distance = (corner_x - self.__obj.pos.x) ** 2 + (
-                    corner_y - self.__obj.pos.y
-                ) ** 2
-
-                if distance > max_chunk_dist_sq:
-                    continue
-
-            # check if any object is within radius
-            for obj in chunk.objects_inside():
-                if type_filter is not None and obj.type.name != type_filter:
-                    continue
-
-                if radius is not None:
-                    with obj.pos - self.__obj.pos as off_vec:
-                        if off_vec.size > radius:
-                            continue
-
-                callback(obj.js_wrapper)
+        goes through the world's object index, and only checks
+        objects in the cells that overlap the radius.
+        """
+
+        for obj in self.__obj.world.objects_in_radius(
+            self.__obj.pos.as_tuple(), radius, type_filter
+        ):
+            callback(obj.js_wrapper)
+
+    def iter_box_objects(
+        self,
+        callback: ObjectCallback,
+        min_x: float,
+        min_y: float,
+        max_x: float,
+        max_y: float,
+        type_filter: typing.Optional[str] = None,
+    ):
+        """
+        Iterates on all objects inside an axis-aligned box,
+        given in absolute world coordinates, calling a callback
+        for every object found.
+        """
+
+        for obj in self.__obj.world.objects_in_box(
+            (min_x, min_y), (max_x, max_y), type_filter
+        ):
+            callback(obj.js_wrapper)
+
+    def nearest(
+        self, count: int, type_filter: typing.Optional[str] = None
+    ) -> typing.List["GameObjectJS"]:
+        """
+        Finds the objects nearest to this one, nearest first,
+        up to a count of them, optionally only of a given type.
+
+        This object itself is never among them.
+        """
+
+        return [
+            obj.js_wrapper
+            for obj in self.__obj.world.nearest(
+                self.__obj.pos.as_tuple(),
+                int(count),
+                type_filter,
+                exclude=self.__obj.identifier,
+            )
+        ]
 
     def call(self, method_name: str, *args):
         """
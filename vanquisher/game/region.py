@@ -0,0 +1,284 @@
+"""
+On-disk persistence of world terrain, in region files.
+
+A region file groups a square of region_size by region_size
+chunks. It starts with a small header, followed by a table of
+one byte per chunk slot (nonzero if the slot holds a chunk),
+and then the slots themselves, each one the heightmap of a
+chunk in exactly the same layout its TerrainChunk keeps in memory:
+row-major little-endian float32, halo included, or, for quantized
+storages, the float64 offset and scale followed by the int16
+heights (see QuantizedTerrainChunk).
+
+Region files are memory-mapped, and chunks loaded from them use
+their slot as their heightmap buffer directly, so a chunk is only
+read from disk once it is actually touched, and writes to it end
+up in the file without any explicit serialization step.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import typing
+
+from .terrain import QuantizedTerrainChunk, TerrainChunk
+
+REGION_MAGIC = b"VQRG"
+REGION_VERSION = 1
+
+# magic, version, region size (in chunks), chunk width
+REGION_HEADER = struct.Struct("<4sHHI")
+
+# the presence table starts right after the header
+TABLE_OFFSET = 16
+
+METADATA_FILE = "world.json"
+
+
+class RegionFile:
+    """A single memory-mapped region file.
+
+    Used internally by RegionStorage.
+    """
+
+    def __init__(self, path: str, region_size: int, chunk_width: int, slot_size: int):
+        """Opens a region file, creating it first if it does not exist.
+
+        slot_size is the size, in bytes, of a chunk's heightmap.
+        """
+        self.path = path
+        self.region_size = region_size
+        self.chunk_width = chunk_width
+
+        self.slot_size = slot_size
+        self.data_offset = (TABLE_OFFSET + region_size * region_size + 15) // 16 * 16
+        file_size = self.data_offset + region_size * region_size * self.slot_size
+
+        if not os.path.exists(path):
+            with open(path, "wb") as region_file:
+                region_file.write(
+                    REGION_HEADER.pack(
+                        REGION_MAGIC, REGION_VERSION, region_size, chunk_width
+                    )
+                )
+
+                # sparse on most filesystems; empty slots cost nothing
+                region_file.truncate(file_size)
+
+        with open(path, "r+b") as region_file:
+            self.map = mmap.mmap(region_file.fileno(), 0, access=mmap.ACCESS_WRITE)
+
+        header = REGION_HEADER.unpack_from(self.map, 0)
+        magic, version, file_region_size, file_chunk_width = header
+
+        if (
+            magic != REGION_MAGIC
+            or version != REGION_VERSION
+            or file_region_size != region_size
+            or file_chunk_width != chunk_width
+            or len(self.map) != file_size
+        ):
+            self.map.close()
+
+            raise ValueError("{} is not a compatible region file".format(path))
+
+    def slot_index(self, local_pos: typing.Tuple[int, int]) -> int:
+        """The slot index of a chunk, given its position within the region."""
+        return local_pos[1] * self.region_size + local_pos[0]
+
+    def has_slot(self, index: int) -> bool:
+        """Whether a slot holds a chunk."""
+        return self.map[TABLE_OFFSET + index] != 0
+
+    def mark_slot(self, index: int):
+        """Marks a slot as holding a chunk."""
+        self.map[TABLE_OFFSET + index] = 1
+
+    def slot_buffer(self, index: int) -> memoryview:
+        """A writable view of a slot's heightmap, straight into the mapped file."""
+        start = self.data_offset + index * self.slot_size
+
+        return memoryview(self.map)[start : start + self.slot_size]
+
+    def flush(self):
+        """Writes pending changes back to the disk."""
+        self.map.flush()
+
+    def close(self):
+        """Unmaps the region file.
+
+        Raises BufferError if any chunk still uses one of its slots.
+        """
+        self.map.flush()
+        self.map.close()
+
+
+class RegionStorage:
+    """A World storage backend, keeping chunks in region files in a directory.
+
+    Opening it only reads the world metadata; region files are
+    opened and mapped as their chunks are asked for, and chunks
+    are paged in by the operating system as they are touched.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        chunk_width: int = 32,
+        region_size: int = 16,
+        quantized: bool = False,
+    ):
+        """Opens (or creates) a storage directory.
+
+        If quantized is set, heights are stored as 16-bit integers;
+        the World using this storage must be quantized too.
+
+        If the directory already holds a world, its metadata wins
+        over the chunk_width, region_size and quantized passed.
+        """
+        if sys.byteorder != "little":
+            raise RuntimeError("Region files can only be mapped on little-endian hosts")
+
+        self.directory = directory
+
+        os.makedirs(directory, exist_ok=True)
+
+        metadata_path = os.path.join(directory, METADATA_FILE)
+
+        if os.path.exists(metadata_path):
+            with open(metadata_path, encoding="utf-8") as metadata_file:
+                metadata = json.load(metadata_file)
+
+            chunk_width = metadata["chunk_width"]
+            region_size = metadata["region_size"]
+            quantized = metadata.get("heights", "float32") == "int16"
+
+        else:
+            with open(metadata_path, "w", encoding="utf-8") as metadata_file:
+                json.dump(
+                    {
+                        "format": REGION_VERSION,
+                        "chunk_width": chunk_width,
+                        "region_size": region_size,
+                        "heights": "int16" if quantized else "float32",
+                    },
+                    metadata_file,
+                )
+
+        self.chunk_width: int = chunk_width
+        self.region_size: int = region_size
+        self.quantized: bool = quantized
+
+        self.terrain_class: typing.Type[TerrainChunk] = (
+            QuantizedTerrainChunk if quantized else TerrainChunk
+        )
+
+        self.regions: typing.Dict[typing.Tuple[int, int], RegionFile] = {}
+
+    def _region_path(self, region_pos: typing.Tuple[int, int]) -> str:
+        """The path of a region file."""
+        return os.path.join(
+            self.directory, "r.{}.{}.vqr".format(region_pos[0], region_pos[1])
+        )
+
+    def _locate(
+        self, chunk_pos: typing.Tuple[int, int]
+    ) -> typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]:
+        """Finds the position of a chunk's region, and its position within it."""
+        region_pos = (
+            math.floor(chunk_pos[0] / self.region_size),
+            math.floor(chunk_pos[1] / self.region_size),
+        )
+
+        local_pos = (
+            chunk_pos[0] - region_pos[0] * self.region_size,
+            chunk_pos[1] - region_pos[1] * self.region_size,
+        )
+
+        return region_pos, local_pos
+
+    def _open_slot(
+        self, chunk_pos: typing.Tuple[int, int]
+    ) -> typing.Tuple[RegionFile, int]:
+        """Finds the region file and slot index of a chunk.
+
+        Opens the region file if needed, creating it if it does
+        not exist yet.
+        """
+        region_pos, local_pos = self._locate(chunk_pos)
+        region = self.regions.get(region_pos)
+
+        if region is None:
+            region = RegionFile(
+                self._region_path(region_pos),
+                self.region_size,
+                self.chunk_width,
+                self.terrain_class.buffer_size(self.chunk_width),
+            )
+            self.regions[region_pos] = region
+
+        return region, region.slot_index(local_pos)
+
+    def has_chunk(self, chunk_pos: typing.Tuple[int, int]) -> bool:
+        """Whether a chunk was stored."""
+        region_pos, _ = self._locate(chunk_pos)
+
+        if region_pos not in self.regions and not os.path.exists(
+            self._region_path(region_pos)
+        ):
+            return False
+
+        region, index = self._open_slot(chunk_pos)
+
+        return region.has_slot(index)
+
+    def chunk_buffer(self, chunk_pos: typing.Tuple[int, int]) -> memoryview:
+        """The writable, memory-mapped heightmap buffer of a chunk's slot.
+
+        Meant to be passed to TerrainChunk. The slot is not marked
+        as holding a chunk until commit_chunk is called, so a chunk
+        that was being generated when the process died is simply
+        generated again.
+        """
+        region, index = self._open_slot(chunk_pos)
+
+        return region.slot_buffer(index)
+
+    def commit_chunk(self, chunk_pos: typing.Tuple[int, int]):
+        """Marks a chunk's slot as holding a chunk."""
+        region, index = self._open_slot(chunk_pos)
+
+        region.mark_slot(index)
+
+    def store_chunk(self, chunk_pos: typing.Tuple[int, int], terrain: "TerrainChunk"):
+        """Copies a chunk's heightmap into its slot and commits it.
+
+        Only needed for chunks whose heightmap does not already
+        live in their slot.
+        """
+        if terrain.width != self.chunk_width:
+            raise ValueError("Chunk does not match this storage's chunk width")
+
+        if terrain.quantized != self.quantized:
+            raise ValueError("Chunk does not match this storage's height format")
+
+        self.chunk_buffer(chunk_pos)[:] = terrain.heightmap_buffer()
+        self.commit_chunk(chunk_pos)
+
+    def flush(self):
+        """Writes pending changes of every open region file back to the disk."""
+        for region in self.regions.values():
+            region.flush()
+
+    def close(self):
+        """Flushes and unmaps every open region file.
+
+        Chunks loaded from this storage must be dropped first.
+        """
+        for region in self.regions.values():
+            region.close()
+
+        self.regions.clear()
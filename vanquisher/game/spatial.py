@@ -0,0 +1,307 @@
+"""
+A spatial index of objects in the world, for proximity queries.
+
+Objects are hashed into square cells of a fixed size, independent
+of the chunk width, so that a query only looks at the objects in
+the few cells it overlaps, rather than at every loaded chunk and
+every object in them.
+"""
+
+import heapq
+import itertools
+import math
+import typing
+
+# The position of a cell, in cell units.
+Cell = typing.Tuple[int, int]
+
+# What the index is keyed by; in practice, object identifiers.
+Key = typing.TypeVar("Key", bound=typing.Hashable)
+
+# Decides whether a key is eligible for a query.
+KeyFilter = typing.Callable[[Key], bool]
+
+
+class SpatialHash(typing.Generic[Key]):
+    """A uniform grid of cells, each holding the keys of the objects within it.
+
+    Every key's position is kept too, so that queries can test
+    distances exactly without looking the objects up.
+    """
+
+    def __init__(self, cell_size: float = 16.0):
+        """Initializes an empty index, with cells of the given size."""
+        if cell_size <= 0.0:
+            raise ValueError("The cell size must be positive")
+
+        self.cell_size = cell_size
+
+        self.cells: typing.Dict[Cell, typing.Set[Key]] = {}
+        self.positions: typing.Dict[Key, typing.Tuple[float, float]] = {}
+        self.key_cells: typing.Dict[Key, Cell] = {}
+
+    def __len__(self) -> int:
+        """How many keys are in this index."""
+        return len(self.positions)
+
+    def __contains__(self, key: Key) -> bool:
+        """Whether a key is in this index."""
+        return key in self.positions
+
+    def cell_at(self, pos_x: float, pos_y: float) -> Cell:
+        """The cell a position falls in."""
+        return (
+            math.floor(pos_x / self.cell_size),
+            math.floor(pos_y / self.cell_size),
+        )
+
+    def insert(self, key: Key, pos_x: float, pos_y: float):
+        """Adds a key to this index, at a position.
+
+        If it is already in it, it is moved there instead.
+        """
+        if key in self.positions:
+            self.move(key, pos_x, pos_y)
+            return
+
+        cell = self.cell_at(pos_x, pos_y)
+
+        self.cells.setdefault(cell, set()).add(key)
+        self.key_cells[key] = cell
+        self.positions[key] = (pos_x, pos_y)
+
+    def remove(self, key: Key):
+        """Removes a key from this index.
+
+        Raises KeyError if it is not in it.
+        """
+        cell = self.key_cells.pop(key)
+        del self.positions[key]
+
+        members = self.cells[cell]
+        members.remove(key)
+
+        if not members:
+            del self.cells[cell]
+
+    def move(self, key: Key, pos_x: float, pos_y: float):
+        """Updates the position of a key.
+
+        It only changes cells if it crossed into another one.
+        Keys not in this index are left alone.
+        """
+        old_cell = self.key_cells.get(key)
+
+        if old_cell is None:
+            return
+
+        self.positions[key] = (pos_x, pos_y)
+
+        new_cell = self.cell_at(pos_x, pos_y)
+
+        if new_cell == old_cell:
+            return
+
+        members = self.cells[old_cell]
+        members.remove(key)
+
+        if not members:
+            del self.cells[old_cell]
+
+        self.cells.setdefault(new_cell, set()).add(key)
+        self.key_cells[key] = new_cell
+
+    def rebuild(self, cell_size: float):
+        """Changes the cell size, hashing every key again."""
+        if cell_size <= 0.0:
+            raise ValueError("The cell size must be positive")
+
+        positions = self.positions
+
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+        self.key_cells = {}
+
+        for key, (pos_x, pos_y) in positions.items():
+            self.insert(key, pos_x, pos_y)
+
+    def _cells_in_range(
+        self, min_cell: Cell, max_cell: Cell
+    ) -> typing.Iterator[typing.Tuple[Cell, typing.Set[Key]]]:
+        """Every non-empty cell within a rectangle of cells, inclusive.
+
+        For large rectangles, walking the occupied cells is cheaper
+        than walking every cell in range, so that is done instead.
+        """
+        min_x, min_y = min_cell
+        max_x, max_y = max_cell
+
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self.cells):
+            for cell, members in list(self.cells.items()):
+                if min_x <= cell[0] <= max_x and min_y <= cell[1] <= max_y:
+                    yield cell, members
+
+            return
+
+        for cell_y in range(min_y, max_y + 1):
+            for cell_x in range(min_x, max_x + 1):
+                occupied = self.cells.get((cell_x, cell_y))
+
+                if occupied:
+                    yield (cell_x, cell_y), occupied
+
+    def _cells_in_radius(
+        self, pos_x: float, pos_y: float, radius: float
+    ) -> typing.Iterator[typing.Set[Key]]:
+        """The members of every non-empty cell that overlaps a circle."""
+        size = self.cell_size
+        min_x, min_y = self.cell_at(pos_x - radius, pos_y - radius)
+        max_x, max_y = self.cell_at(pos_x + radius, pos_y + radius)
+        radius_sq = radius * radius
+
+        def overlaps(cell_x: int, cell_y: int) -> bool:
+            """Whether the point of a cell nearest to the circle's centre is in it."""
+            near_x = min(max(pos_x, cell_x * size), (cell_x + 1) * size)
+            near_y = min(max(pos_y, cell_y * size), (cell_y + 1) * size)
+
+            return (near_x - pos_x) ** 2 + (near_y - pos_y) ** 2 <= radius_sq
+
+        for (cell_x, cell_y), members in self._cells_in_range(
+            (min_x, min_y), (max_x, max_y)
+        ):
+            if overlaps(cell_x, cell_y):
+                yield members
+
+    def query_radius(
+        self, pos_x: float, pos_y: float, radius: float
+    ) -> typing.Iterator[Key]:
+        """Every key within a distance of a position.
+
+        Only the cells overlapping the query circle are visited.
+        Keys may be moved or removed while iterating; the ones
+        removed before they are reached are skipped.
+        """
+        radius_sq = radius * radius
+
+        for members in self._cells_in_radius(pos_x, pos_y, radius):
+            for key in list(members):
+                key_pos = self.positions.get(key)
+
+                if key_pos is None:
+                    continue
+
+                if (key_pos[0] - pos_x) ** 2 + (key_pos[1] - pos_y) ** 2 <= radius_sq:
+                    yield key
+
+    def query_box(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> typing.Iterator[Key]:
+        """Every key within an axis-aligned box, bounds included.
+
+        Only the cells overlapping the box are visited.
+        """
+        for _, members in self._cells_in_range(
+            self.cell_at(min_x, min_y), self.cell_at(max_x, max_y)
+        ):
+            for key in list(members):
+                key_pos = self.positions.get(key)
+
+                if key_pos is None:
+                    continue
+
+                if min_x <= key_pos[0] <= max_x and min_y <= key_pos[1] <= max_y:
+                    yield key
+
+    def _ring(self, center: Cell, ring: int) -> typing.Iterator[typing.Set[Key]]:
+        """The members of every non-empty cell at a Chebyshev distance from a cell."""
+        center_x, center_y = center
+
+        if ring == 0:
+            members = self.cells.get(center)
+
+            if members:
+                yield members
+
+            return
+
+        for cell_x in range(center_x - ring, center_x + ring + 1):
+            for cell_y in (center_y - ring, center_y + ring):
+                members = self.cells.get((cell_x, cell_y))
+
+                if members:
+                    yield members
+
+        for cell_y in range(center_y - ring + 1, center_y + ring):
+            for cell_x in (center_x - ring, center_x + ring):
+                members = self.cells.get((cell_x, cell_y))
+
+                if members:
+                    yield members
+
+    def nearest(
+        self,
+        pos_x: float,
+        pos_y: float,
+        count: int,
+        key_filter: typing.Optional[KeyFilter[Key]] = None,
+    ) -> typing.List[Key]:
+        """The count keys nearest to a position, nearest first.
+
+        Only keys the filter accepts, if one is passed, are
+        considered. Cells are searched in rings, outwards from
+        the one the position falls in; the search stops as soon
+        as no cell further out can hold anything nearer than the
+        keys already found, or once every key has been seen.
+        """
+        if count <= 0:
+            return []
+
+        center = self.cell_at(pos_x, pos_y)
+
+        # a max-heap of the best candidates so far, by negated distance;
+        # the counter breaks ties, as keys need not be comparable
+        best: typing.List[typing.Tuple[float, int, Key]] = []
+        tiebreak = itertools.count()
+
+        seen = 0
+        total = len(self.positions)
+        ring = 0
+
+        def consider(members: typing.Set[Key]) -> int:
+            """Adds the eligible members of a cell to the candidates."""
+            for key in members:
+                if key_filter is not None and not key_filter(key):
+                    continue
+
+                key_x, key_y = self.positions[key]
+                dist_sq = (key_x - pos_x) ** 2 + (key_y - pos_y) ** 2
+
+                if len(best) < count:
+                    heapq.heappush(best, (-dist_sq, next(tiebreak), key))
+
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, next(tiebreak), key))
+
+            return len(members)
+
+        while seen < total:
+            # once rings hold more cells than there are occupied
+            # ones, scan the remaining occupied cells at once
+            if (2 * ring + 1) ** 2 > 4 * len(self.cells):
+                for cell, members in self.cells.items():
+                    if max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) >= ring:
+                        consider(members)
+
+                break
+
+            for members in self._ring(center, ring):
+                seen += consider(members)
+
+            # cells past this ring are at least ring cells away
+            if len(best) == count and -best[0][0] <= (ring * self.cell_size) ** 2:
+                break
+
+            ring += 1
+
+        return [key for _, _, key in sorted(best, key=lambda item: (-item[0], item[1]))]
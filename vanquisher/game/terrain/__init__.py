@@ -5,17 +5,31 @@ of specifically terrain. Every world.Chunk has a terrain property
 of type TerrainChunk.
 """
 
+import array
+import collections
 import math
 import typing
 
+from ... import kernels
+from ...numba import SUPPORTED as NUMBA_SUPPORTED
 from ...numba import maybe_numba_jit
+from ...numpy import SUPPORTED as NUMPY_SUPPORTED
+from ...numpy import numpy as np
+from ...numpy import require_numpy
 
 if typing.TYPE_CHECKING:
     from . import generator
 
 try:
     from ._interpolate import ffi
-    from ._interpolate.lib import bilinear
+    from ._interpolate.lib import (
+        bilinear,
+        bilinear_many,
+        bilinear_many_q,
+        bilinear_q,
+        gradient_many,
+        gradient_many_q,
+    )
 
     USE_CFFI_INTERPOLATOR = True
 
@@ -23,14 +37,462 @@ except ImportError:
     USE_CFFI_INTERPOLATOR = False
 
 
+Coordinates = typing.Union[typing.Sequence[float], "np.ndarray"]
+
+# Heights, and their partial derivatives along X and Y.
+Gradients = typing.Tuple[Coordinates, Coordinates, Coordinates]
+
+# The X, Y and Z components of unit surface normals.
+Normals = typing.Tuple[Coordinates, Coordinates, Coordinates]
+
+# A rectangle of heightmap points, as (left, top, right, bottom);
+# right and bottom are exclusive.
+Rect = typing.Tuple[int, int, int, int]
+
+# How many changes a TerrainChunk remembers the rectangle of.
+DIRTY_LOG_LENGTH = 64
+
+# The ways TerrainChunk.apply_brush can combine a brush with the heightmap.
+BRUSH_MODES = ("add", "set")
+
+# How many levels of detail chunks have past full resolution;
+# each halves the resolution of the previous one.
+LOD_LEVELS = 3
+
+# The smallest height step of QuantizedTerrainChunk.
+MIN_QUANTIZATION_STEP = 2.0 ** -8
+
+# The largest magnitude of a quantized height.
+QUANTIZED_LIMIT = 32767
+
+
+@maybe_numba_jit(nopython=True)
+def _bilinear_many_kernel(stride, heights, xs, ys, out):
+    """Batch bilinear interpolation loop. Made for Numba."""
+    cap_width = stride - 1.0001
+
+    for i in range(xs.shape[0]):
+        x_pos = min(max(xs[i], 0.0), cap_width)
+        y_pos = min(max(ys[i], 0.0), cap_width)
+
+        x_lo = int(math.floor(x_pos))
+        y_lo = int(math.floor(y_pos))
+
+        x_alpha = x_pos - x_lo
+        y_alpha = y_pos - y_lo
+
+        val_a = heights[y_lo * stride + x_lo]
+        val_b = heights[(y_lo + 1) * stride + x_lo]
+        val_c = heights[y_lo * stride + x_lo + 1]
+        val_d = heights[(y_lo + 1) * stride + x_lo + 1]
+
+        out[i] = (
+            val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+            + val_b * (1.0 - x_alpha) * y_alpha
+            + val_c * x_alpha * (1.0 - y_alpha)
+            + val_d * x_alpha * y_alpha
+        )
+
+
+def _sample_many_numba(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap sampling, using the Numba-compiled kernel."""
+    x_arr, y_arr = np.broadcast_arrays(
+        np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    )
+    heights = chunk.raw_array(halo=True).ravel()
+    out = np.empty(x_arr.size, dtype=np.float64)
+
+    _bilinear_many_kernel(chunk.stride, heights, x_arr.ravel(), y_arr.ravel(), out)
+
+    if chunk.quantized:
+        out = chunk.height_offset + chunk.height_scale * out
+
+    return out.reshape(x_arr.shape)
+
+
+def _sample_many_numpy(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap sampling, using vectorized NumPy operations."""
+    cap_width = chunk.stride - 1.0001
+
+    heights = chunk.raw_array(halo=True)
+
+    x_pos = np.clip(np.asarray(xs, dtype=np.float64), 0.0, cap_width)
+    y_pos = np.clip(np.asarray(ys, dtype=np.float64), 0.0, cap_width)
+
+    x_lo = np.floor(x_pos).astype(np.intp)
+    y_lo = np.floor(y_pos).astype(np.intp)
+
+    x_alpha = x_pos - x_lo
+    y_alpha = y_pos - y_lo
+
+    val_a = heights[y_lo, x_lo]
+    val_b = heights[y_lo + 1, x_lo]
+    val_c = heights[y_lo, x_lo + 1]
+    val_d = heights[y_lo + 1, x_lo + 1]
+
+    out = (
+        val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+        + val_b * (1.0 - x_alpha) * y_alpha
+        + val_c * x_alpha * (1.0 - y_alpha)
+        + val_d * x_alpha * y_alpha
+    )
+
+    if chunk.quantized:
+        return chunk.height_offset + chunk.height_scale * out
+
+    return out
+
+
+@maybe_numba_jit(nopython=True)
+def _gradient_many_kernel(stride, heights, xs, ys, out, out_dx, out_dy):
+    """Batch bilinear interpolation loop, with partial derivatives. Made for Numba."""
+    cap_width = stride - 1.0001
+
+    for i in range(xs.shape[0]):
+        x_pos = min(max(xs[i], 0.0), cap_width)
+        y_pos = min(max(ys[i], 0.0), cap_width)
+
+        x_lo = int(math.floor(x_pos))
+        y_lo = int(math.floor(y_pos))
+
+        x_alpha = x_pos - x_lo
+        y_alpha = y_pos - y_lo
+
+        val_a = heights[y_lo * stride + x_lo]
+        val_b = heights[(y_lo + 1) * stride + x_lo]
+        val_c = heights[y_lo * stride + x_lo + 1]
+        val_d = heights[(y_lo + 1) * stride + x_lo + 1]
+
+        out[i] = (
+            val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+            + val_b * (1.0 - x_alpha) * y_alpha
+            + val_c * x_alpha * (1.0 - y_alpha)
+            + val_d * x_alpha * y_alpha
+        )
+        out_dx[i] = (val_c - val_a) * (1.0 - y_alpha) + (val_d - val_b) * y_alpha
+        out_dy[i] = (val_b - val_a) * (1.0 - x_alpha) + (val_d - val_c) * x_alpha
+
+
+def _gradient_many_numba(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap gradients, using the Numba-compiled kernel."""
+    x_arr, y_arr = np.broadcast_arrays(
+        np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    )
+    heights = chunk.raw_array(halo=True).ravel()
+    out = np.empty((3, x_arr.size), dtype=np.float64)
+
+    _gradient_many_kernel(
+        chunk.stride, heights, x_arr.ravel(), y_arr.ravel(), out[0], out[1], out[2]
+    )
+
+    if chunk.quantized:
+        out *= chunk.height_scale
+        out[0] += chunk.height_offset
+
+    return tuple(values.reshape(x_arr.shape) for values in out)
+
+
+def _gradient_many_numpy(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap gradients, using vectorized NumPy operations."""
+    cap_width = chunk.stride - 1.0001
+
+    heights = chunk.raw_array(halo=True)
+    offset, scale = chunk.height_offset, chunk.height_scale
+
+    x_pos = np.clip(np.asarray(xs, dtype=np.float64), 0.0, cap_width)
+    y_pos = np.clip(np.asarray(ys, dtype=np.float64), 0.0, cap_width)
+
+    x_lo = np.floor(x_pos).astype(np.intp)
+    y_lo = np.floor(y_pos).astype(np.intp)
+
+    x_alpha = x_pos - x_lo
+    y_alpha = y_pos - y_lo
+
+    val_a = heights[y_lo, x_lo].astype(np.float64)
+    val_b = heights[y_lo + 1, x_lo].astype(np.float64)
+    val_c = heights[y_lo, x_lo + 1].astype(np.float64)
+    val_d = heights[y_lo + 1, x_lo + 1].astype(np.float64)
+
+    out = (
+        val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+        + val_b * (1.0 - x_alpha) * y_alpha
+        + val_c * x_alpha * (1.0 - y_alpha)
+        + val_d * x_alpha * y_alpha,
+        (val_c - val_a) * (1.0 - y_alpha) + (val_d - val_b) * y_alpha,
+        (val_b - val_a) * (1.0 - x_alpha) + (val_d - val_c) * x_alpha,
+    )
+
+    if chunk.quantized:
+        return (offset + scale * out[0], scale * out[1], scale * out[2])
+
+    return out
+
+
+def _cffi_batch(
+    kernel, outputs: int, chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates
+):
+    """Runs a CFFI batch kernel over many points of a chunk.
+
+    Returns the kernel's output arrays, as NumPy arrays of the
+    broadcast shape of xs and ys if NumPy is available, or as
+    lists otherwise. Outputs are heights first, then (for the
+    gradient kernels) partial derivatives along X and Y.
+
+    Quantized chunks get their offset and scale passed along
+    to the kernel, which must be one of the _q kernels.
+    """
+    heightmap_args: typing.Tuple[typing.Any, ...] = (chunk.stride, chunk.heightmap)
+
+    if chunk.quantized:
+        heightmap_args += (chunk.height_offset, chunk.height_scale)
+
+    if NUMPY_SUPPORTED:
+        x_arr, y_arr = np.broadcast_arrays(
+            np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        )
+        shape = x_arr.shape
+
+        x_arr = np.ascontiguousarray(x_arr).ravel()
+        y_arr = np.ascontiguousarray(y_arr).ravel()
+        results = np.empty((outputs, x_arr.size), dtype=np.float64)
+
+        kernel(
+            *heightmap_args,
+            x_arr.size,
+            ffi.from_buffer("double[]", x_arr),
+            ffi.from_buffer("double[]", y_arr),
+            *(ffi.from_buffer("double[]", row) for row in results),
+        )
+
+        if np.isnan(results[0]).any():
+            raise ValueError("Got NaN trying to interpolate a batch of positions")
+
+        return [row.reshape(shape) for row in results]
+
+    x_list = list(xs)
+    y_list = list(ys)
+    count = min(len(x_list), len(y_list))
+    buffers = [ffi.new("double[]", count) for _ in range(outputs)]
+
+    kernel(
+        *heightmap_args,
+        count,
+        ffi.new("double[]", x_list[:count]),
+        ffi.new("double[]", y_list[:count]),
+        *buffers,
+    )
+
+    lists = [list(buffer) for buffer in buffers]
+
+    if any(math.isnan(height) for height in lists[0]):
+        raise ValueError("Got NaN trying to interpolate a batch of positions")
+
+    return lists
+
+
+def _sample_many_cffi(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap sampling, using the CFFI batch kernel."""
+    kernel = bilinear_many_q if chunk.quantized else bilinear_many
+
+    return _cffi_batch(kernel, 1, chunk, xs, ys)[0]
+
+
+def _gradient_many_cffi(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap gradients, using the CFFI batch kernel."""
+    kernel = gradient_many_q if chunk.quantized else gradient_many
+
+    return tuple(_cffi_batch(kernel, 3, chunk, xs, ys))
+
+
+def _sample_many_python(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap sampling, one TerrainChunk lookup at a time."""
+    return [chunk[x_pos, y_pos] for x_pos, y_pos in zip(xs, ys)]
+
+
+def _gradient_many_python(chunk: "TerrainChunk", xs: Coordinates, ys: Coordinates):
+    """Batch heightmap gradients, one point at a time."""
+    return unzip_triples(
+        [chunk.gradient_at(x_pos, y_pos) for x_pos, y_pos in zip(xs, ys)]
+    )
+
+
+def unzip_triples(
+    triples: typing.Sequence[typing.Tuple[float, float, float]]
+) -> typing.Tuple[typing.List[float], typing.List[float], typing.List[float]]:
+    """Splits a list of (a, b, c) triples into three lists, one per component."""
+    return (
+        [triple[0] for triple in triples],
+        [triple[1] for triple in triples],
+        [triple[2] for triple in triples],
+    )
+
+
+def _bilinear_grid_at(grid: typing.Any, x_pos: float, y_pos: float) -> float:
+    """Bilinear interpolation of a [y][x] grid at a point, clamped to its edges."""
+    cap_width = len(grid) - 1.0001
+
+    x_pos = min(max(x_pos, 0.0), cap_width)
+    y_pos = min(max(y_pos, 0.0), cap_width)
+
+    x_lo = math.floor(x_pos)
+    y_lo = math.floor(y_pos)
+
+    x_alpha = x_pos - x_lo
+    y_alpha = y_pos - y_lo
+
+    return float(
+        grid[y_lo][x_lo] * (1.0 - x_alpha) * (1.0 - y_alpha)
+        + grid[y_lo + 1][x_lo] * (1.0 - x_alpha) * y_alpha
+        + grid[y_lo][x_lo + 1] * x_alpha * (1.0 - y_alpha)
+        + grid[y_lo + 1][x_lo + 1] * x_alpha * y_alpha
+    )
+
+
+def _bilinear_grid_many(
+    grids: typing.Sequence["np.ndarray"], xs: Coordinates, ys: Coordinates
+) -> typing.List["np.ndarray"]:
+    """Vectorized bilinear interpolation of same-sized 2D arrays at many points."""
+    cap_width = grids[0].shape[0] - 1.0001
+
+    x_pos = np.clip(np.asarray(xs, dtype=np.float64), 0.0, cap_width)
+    y_pos = np.clip(np.asarray(ys, dtype=np.float64), 0.0, cap_width)
+
+    x_lo = np.floor(x_pos).astype(np.intp)
+    y_lo = np.floor(y_pos).astype(np.intp)
+
+    x_alpha = x_pos - x_lo
+    y_alpha = y_pos - y_lo
+
+    return [
+        grid[y_lo, x_lo] * (1.0 - x_alpha) * (1.0 - y_alpha)
+        + grid[y_lo + 1, x_lo] * (1.0 - x_alpha) * y_alpha
+        + grid[y_lo, x_lo + 1] * x_alpha * (1.0 - y_alpha)
+        + grid[y_lo + 1, x_lo + 1] * x_alpha * y_alpha
+        for grid in grids
+    ]
+
+
+def _max_reduce(level: "np.ndarray") -> "np.ndarray":
+    """Halves a max pyramid level, each node the maximum of 2x2 nodes below it."""
+    rows, cols = level.shape
+    half_rows = (rows + 1) // 2
+    half_cols = (cols + 1) // 2
+
+    padded = np.full((half_rows * 2, half_cols * 2), -np.inf, dtype=level.dtype)
+    padded[:rows, :cols] = level
+
+    return padded.reshape(half_rows, 2, half_cols, 2).max(axis=(1, 3))
+
+
+def _sample_cffi(chunk: "TerrainChunk", x_pos: float, y_pos: float) -> float:
+    """Single point sampling, using the CFFI interpolator."""
+    res = chunk._bilinear_cffi(x_pos, y_pos)
+
+    if math.isnan(res):
+        raise ValueError(
+            "Got NaN trying to interpolate position ({},{})".format(x_pos, y_pos)
+        )
+
+    return res
+
+
+def _sample_python(chunk: "TerrainChunk", x_pos: float, y_pos: float) -> float:
+    """Single point sampling, without the CFFI interpolator."""
+    return chunk._bilinear_python(x_pos, y_pos)
+
+
+def _workload_chunk() -> "TerrainChunk":
+    """A small chunk with a smooth, uneven heightmap, for kernel workloads."""
+    chunk = TerrainChunk(32)
+    chunk.load_grid(
+        [
+            [math.sin(x_pos * 0.3) + math.cos(y_pos * 0.2) for x_pos in range(33)]
+            for y_pos in range(33)
+        ]
+    )
+
+    return chunk
+
+
+def _point_sampling_workload() -> typing.Callable[[typing.Callable], typing.Any]:
+    """A single point sampling workload, to pick the fastest backend with."""
+    chunk = _workload_chunk()
+    points = [((index * 7.31) % 32.0, (index * 3.17) % 32.0) for index in range(1024)]
+
+    def run(implementation: typing.Callable):
+        """Samples every point, one at a time."""
+        for x_pos, y_pos in points:
+            implementation(chunk, x_pos, y_pos)
+
+    return run
+
+
+def _sampling_workload() -> typing.Callable[[typing.Callable], typing.Any]:
+    """A batch sampling workload, to pick the fastest backend with."""
+    chunk = _workload_chunk()
+
+    xs: Coordinates = [(index * 7.31) % 32.0 for index in range(4096)]
+    ys: Coordinates = [(index * 3.17) % 32.0 for index in range(4096)]
+
+    if NUMPY_SUPPORTED:
+        xs = np.array(xs)
+        ys = np.array(ys)
+
+    return lambda implementation: implementation(chunk, xs, ys)
+
+
+# Single point sampling, used by TerrainChunk.__getitem__; the
+# Python backend has its arithmetic compiled by Numba, if available.
+SAMPLE_KERNEL = kernels.kernel("terrain.sample", _point_sampling_workload)
+
+if USE_CFFI_INTERPOLATOR:
+    SAMPLE_KERNEL.register("cffi", _sample_cffi)
+
+SAMPLE_KERNEL.register("python", _sample_python)
+
+# Batch sampling and gradients, from the fastest backend expected
+# to the slowest; kernels.autoselect may pick another one.
+SAMPLE_MANY_KERNEL = kernels.kernel("terrain.sample_many", _sampling_workload)
+GRADIENT_MANY_KERNEL = kernels.kernel("terrain.gradient_many", _sampling_workload)
+
+if NUMPY_SUPPORTED and NUMBA_SUPPORTED:
+    SAMPLE_MANY_KERNEL.register("numba", _sample_many_numba)
+    GRADIENT_MANY_KERNEL.register("numba", _gradient_many_numba)
+
+if USE_CFFI_INTERPOLATOR:
+    SAMPLE_MANY_KERNEL.register("cffi", _sample_many_cffi)
+    GRADIENT_MANY_KERNEL.register("cffi", _gradient_many_cffi)
+
+if NUMPY_SUPPORTED:
+    SAMPLE_MANY_KERNEL.register("numpy", _sample_many_numpy)
+    GRADIENT_MANY_KERNEL.register("numpy", _gradient_many_numpy)
+
+SAMPLE_MANY_KERNEL.register("python", _sample_many_python)
+GRADIENT_MANY_KERNEL.register("python", _gradient_many_python)
+
+
 class TerrainChunk:
     """A square chunk of terrain.
 
     This is the terrain part of the game's concept of chunk.
     You can tell because Chunk.terrain is always a TerrainChunk.
+
+    The heightmap has one extra column and row past the chunk's
+    width, the 'halo', which mirrors the first column and row of
+    the neighbouring chunks along +X and +Y (see fill_halo). This
+    way, interpolating anywhere between 0 and the chunk's width,
+    even across the border, never needs a second chunk.
+
+    Heights are stored as float32; see QuantizedTerrainChunk for
+    a more compact alternative.
     """
 
-    def __init__(self, width=32):
+    # Whether heights are stored quantized, as offset + scale * value.
+    quantized = False
+    height_offset = 0.0
+    height_scale = 1.0
+
+    def __init__(self, width=32, buffer: typing.Optional[typing.Any] = None):
         """TerrainChunk initializer.
 
         Creates a new terrain, with the given square width and
@@ -40,12 +502,67 @@ class TerrainChunk:
         You can then use a TerrainGenerator to make this terrain
         more interesting.
 
+        If a writable buffer is passed (e.g. a slot of a memory-mapped
+        region file), it is used as the heightmap directly, without
+        copying; it must be buffer_size(width) bytes long, and for
+        this class, hold (width + 1) ** 2 native float32 values.
+
         In general, though, let World handle this job, unless you
         really want to use TerrainChunk directly and manually.
         """
 
-        self.heightmap = ffi.new("float[]", width * width)
         self.width = width
+        self.stride = width + 1
+
+        if buffer is not None and memoryview(buffer).nbytes != self.buffer_size(width):
+            raise ValueError(
+                "Heightmap buffer does not fit a chunk of width {}".format(width)
+            )
+
+        self._init_heightmap(buffer)
+
+        # Bumped on every change to the heightmap, so that derived
+        # caches, like the max pyramid, know when to be rebuilt.
+        self.revision = 0
+
+        # (revision, rectangle) of the latest changes; see dirty_since.
+        self.dirty_log: typing.Deque[typing.Tuple[int, Rect]] = collections.deque(
+            maxlen=DIRTY_LOG_LENGTH
+        )
+
+        self._max_pyramid: typing.Optional[typing.List[typing.Any]] = None
+        self._max_pyramid_revision = -1
+
+        self._lods: typing.Dict[int, "TerrainChunk"] = {}
+        self._lods_revision = -1
+
+        self._slope_map: typing.Optional[typing.Tuple[typing.Any, typing.Any]] = None
+        self._slope_map_revision = -1
+
+    @classmethod
+    def buffer_size(cls, width: int) -> int:
+        """The size, in bytes, of the heightmap buffer of a chunk of a given width."""
+        return (width + 1) ** 2 * 4
+
+    def _init_heightmap(self, buffer: typing.Optional[typing.Any]):
+        """Sets the heightmap up, in a given buffer or in a new one."""
+
+        # a plain buffer, a view of the given one, or a CFFI array
+        self.heightmap: typing.Any
+
+        if not USE_CFFI_INTERPOLATOR:
+            # a plain float32 buffer; slower, but works anywhere
+            if buffer is None:
+                self.heightmap = array.array("f", bytes(self.buffer_size(self.width)))
+
+            else:
+                self.heightmap = memoryview(buffer).cast("B").cast("f")
+
+        elif buffer is None:
+            self.heightmap = ffi.new("float[]", self.stride * self.stride)
+
+        else:
+            self.heightmap = ffi.from_buffer("float[]", buffer, require_writable=True)
 
     def get(self, x_pos: int, y_pos: int) -> float:
         """A terrain height getter, at aligned (integer) positions, uninterpolated.
@@ -53,8 +570,78 @@ class TerrainChunk:
         Gets the height at the specified integer position of the
         heightmap. Use an indexing syntax instead unless you know
         what you are doing.
+
+        Positions equal to the width address the halo.
+        """
+        return self.heightmap[y_pos * self.stride + x_pos]
+
+    def get_raw(self, x_pos: int, y_pos: int) -> float:
+        """The value stored at an aligned (integer) position of the heightmap.
+
+        Same as get, here; quantized chunks return the quantized
+        value instead, like raw_array.
+        """
+        return self.heightmap[y_pos * self.stride + x_pos]
+
+    def memory_usage(self) -> int:
+        """The memory taken by the heightmap, halo included, in bytes.
+
+        Caches derived from the heightmap are not counted.
+        """
+        return self.buffer_size(self.width)
+
+    def heightmap_buffer(self) -> typing.Any:
+        """The raw bytes of the heightmap, halo included, as a buffer object."""
+        if not USE_CFFI_INTERPOLATOR:
+            return memoryview(self.heightmap).cast("B")
+
+        return ffi.buffer(self.heightmap)
+
+    def as_array(self, halo: bool = False) -> "np.ndarray":
+        """A zero-copy NumPy view of the heightmap.
+
+        Returns a 2D float32 array, indexed [y, x], that shares
+        its memory with the heightmap buffer itself, so writes
+        through it are seen by the interpolator, and vice versa.
+
+        The view only covers the chunk's own width, unless halo
+        is True, in which case it includes the halo too.
+
+        Call mark_changed after writing through the view, so that
+        caches derived from the heightmap are rebuilt.
+
+        Requires NumPy.
+        """
+        numpy = require_numpy("TerrainChunk.as_array")
+
+        heights = numpy.frombuffer(
+            self.heightmap_buffer(), dtype=numpy.float32
+        ).reshape(self.stride, self.stride)
+
+        if halo:
+            return heights
+
+        return heights[: self.width, : self.width]
+
+    def raw_array(self, halo: bool = False) -> "np.ndarray":
+        """A zero-copy NumPy view of the heightmap, as stored.
+
+        Same as as_array, here; quantized chunks return their
+        quantized values instead. Meant for kernels that work
+        on either, and dequantize their results.
+
+        Requires NumPy.
+        """
+        return self.as_array(halo)
+
+    def _store_block(self, top: int, left: int, block: "np.ndarray"):
+        """Writes a [y][x] block of heights into the heightmap. Needs NumPy.
+
+        Does not mark the heightmap as changed.
         """
-        return self.heightmap[y_pos * self.width + x_pos]
+        rows, cols = np.shape(block)
+
+        self.as_array(halo=True)[top : top + rows, left : left + cols] = block
 
     @staticmethod
     @maybe_numba_jit(nopython=True)
@@ -63,20 +650,20 @@ class TerrainChunk:
         val_b: float,
         val_c: float,
         val_d: float,
-        x_pos: float,
-        y_pos: float,
-        x_lo: float,
-        x_hi: float,
-        y_lo: float,
-        y_hi: float,
+        x_alpha: float,
+        y_alpha: float,
     ) -> float:
-        """Bilinear interpolation without fuss. Made for Numba."""
-        weight_a = (x_hi - x_pos) * (y_hi - y_pos)
-        weight_b = (x_hi - x_pos) * (y_pos - y_lo)
-        weight_c = (x_pos - x_lo) * (y_hi - y_pos)
-        weight_d = (x_pos - x_lo) * (y_pos - y_lo)
+        """Bilinear interpolation without fuss. Made for Numba.
 
-        return weight_a * val_a + weight_b * val_b + weight_c * val_c + weight_d * val_d
+        Uses the same formula as the batch kernels, so that both
+        give the exact same heights.
+        """
+        return (
+            val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+            + val_b * (1.0 - x_alpha) * y_alpha
+            + val_c * x_alpha * (1.0 - y_alpha)
+            + val_d * x_alpha * y_alpha
+        )
 
     def __getitem__(self, coords: typing.Tuple[float, float]) -> float:
         """A terrain height getter.
@@ -84,57 +671,705 @@ class TerrainChunk:
         Gets the height at any point of this TerrainChunk, including
         using bilinear interpolation.
 
-        Uses the Cython interpolator whenever possible.
+        The backend in use is that of SAMPLE_KERNEL, which is the
+        CFFI interpolator whenever it is available, unless another
+        is selected; see the kernels module.
         """
 
-        if USE_CFFI_INTERPOLATOR:
-            res = bilinear(self.width, *coords, self.heightmap)
+        return SAMPLE_KERNEL.function(self, *coords)
 
-            if math.isnan(res):
-                raise ValueError(
-                    ("Got NaN trying to interpolate position ({0[0]},{0[1]})").format(
-                        coords
-                    )
-                )
+    def _bilinear_python(self, x_pos: float, y_pos: float) -> float:
+        """Interpolates the heightmap at a point, without the CFFI interpolator.
 
-            return res
+        The interpolation itself is compiled with Numba when it
+        is available.
+        """
 
-        (x_pos, y_pos) = coords
+        # like the other kernels; a tiny epsilon for flooring purposes
+        cap_width = self.stride - 1.0001
 
         if x_pos < 0.0:
             x_pos = 0.0
 
-        if x_pos > self.width - 1.0:
-            x_pos = self.width - 1.0001  # tiny epsilon for flooring purposes
+        if x_pos >= cap_width:
+            x_pos = cap_width
 
         if y_pos < 0.0:
             y_pos = 0.0
 
-        if y_pos > self.width - 1.0:
-            y_pos = self.width - 1.0001  # tiny epsilon for flooring purposes
+        if y_pos >= cap_width:
+            y_pos = cap_width
 
         x_lo = math.floor(x_pos)
-        x_hi = x_lo + 1
         y_lo = math.floor(y_pos)
-        y_hi = y_lo + 1
+
+        height = self._bilinear_interpolate(
+            self.get_raw(x_lo, y_lo),
+            self.get_raw(x_lo, y_lo + 1),
+            self.get_raw(x_lo + 1, y_lo),
+            self.get_raw(x_lo + 1, y_lo + 1),
+            x_pos - x_lo,
+            y_pos - y_lo,
+        )
+
+        if self.quantized:
+            return self.height_offset + self.height_scale * height
+
+        return height
+
+    def _bilinear_cffi(self, x_pos: float, y_pos: float) -> float:
+        """Interpolates the heightmap at a point, using the CFFI interpolator."""
+
+        return bilinear(self.stride, x_pos, y_pos, self.heightmap)
+
+    def sample_many(self, xs: Coordinates, ys: Coordinates) -> Coordinates:
+        """A batch terrain height getter.
+
+        Gets the interpolated heights at many points of this
+        TerrainChunk at once, given their X and Y coordinates
+        as two same-length sequences (NumPy arrays, or any buffer
+        or sequence of floats).
+
+        This crosses the Python boundary once per batch, rather
+        than once per point, whenever NumPy or the CFFI interpolator
+        is available. A NumPy array is returned if NumPy is
+        available; otherwise, a list.
+
+        The backend in use is that of SAMPLE_MANY_KERNEL; see the
+        kernels module.
+        """
+
+        return SAMPLE_MANY_KERNEL.function(self, xs, ys)
+
+    def gradient_at(
+        self, x_pos: float, y_pos: float
+    ) -> typing.Tuple[float, float, float]:
+        """The height at a point, and its partial derivatives along X and Y.
+
+        The derivatives are the analytic ones of the bilinear
+        interpolation, not finite differences; they only change
+        from one heightmap square to the next along the axis
+        they are taken along.
+        """
+
+        cap_width = self.stride - 1.0001
+
+        x_pos = min(max(x_pos, 0.0), cap_width)
+        y_pos = min(max(y_pos, 0.0), cap_width)
+
+        x_lo = math.floor(x_pos)
+        y_lo = math.floor(y_pos)
+
+        x_alpha = x_pos - x_lo
+        y_alpha = y_pos - y_lo
 
         val_a = self.get(x_lo, y_lo)
-        val_b = self.get(x_lo, y_hi)
-        val_c = self.get(x_hi, y_lo)
-        val_d = self.get(x_hi, y_hi)
+        val_b = self.get(x_lo, y_lo + 1)
+        val_c = self.get(x_lo + 1, y_lo)
+        val_d = self.get(x_lo + 1, y_lo + 1)
+
+        return (
+            val_a * (1.0 - x_alpha) * (1.0 - y_alpha)
+            + val_b * (1.0 - x_alpha) * y_alpha
+            + val_c * x_alpha * (1.0 - y_alpha)
+            + val_d * x_alpha * y_alpha,
+            (val_c - val_a) * (1.0 - y_alpha) + (val_d - val_b) * y_alpha,
+            (val_b - val_a) * (1.0 - x_alpha) + (val_d - val_c) * x_alpha,
+        )
+
+    def gradient_many(self, xs: Coordinates, ys: Coordinates) -> Gradients:
+        """A batch terrain height and gradient getter.
+
+        The batch counterpart of gradient_at, returning the
+        heights, the partial derivatives along X and those along
+        Y, as three arrays (or lists), like sample_many does.
+        """
+
+        return GRADIENT_MANY_KERNEL.function(self, xs, ys)
+
+    def slope_map(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """The gradient field of this chunk, at every heightmap point.
+
+        Returns the partial derivatives along X and along Y, as
+        two [y][x] grids covering the halo too, estimated with
+        central differences (one-sided at the edges). Interpolated
+        between points, they make for slopes that change smoothly,
+        unlike the ones of gradient_at.
+
+        The grids are 2D NumPy arrays if NumPy is available, or
+        lists of rows otherwise.
+
+        Cached; when the heightmap changes, only the points
+        around the changed rectangles are computed again.
+        """
 
-        return self._bilinear_interpolate(
-            val_a, val_b, val_c, val_d, x_pos, y_pos, x_lo, x_hi, y_lo, y_hi
+        slope_map = self._slope_map
+
+        if slope_map is not None and self._slope_map_revision == self.revision:
+            return slope_map
+
+        if slope_map is None:
+            slope_map = self._slope_map = self._build_slope_map()
+
+        else:
+            for rect in self._cache_updates(self._slope_map_revision):
+                self._update_slope_map(slope_map, rect)
+
+        self._slope_map_revision = self.revision
+
+        return slope_map
+
+    def _build_slope_map(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """Builds the gradient field from scratch."""
+
+        if NUMPY_SUPPORTED:
+            grad_y, grad_x = np.gradient(self.as_array(halo=True).astype(np.float64))
+
+            return grad_x, grad_y
+
+        slopes = [
+            [self._point_slope(x_pos, y_pos) for x_pos in range(self.stride)]
+            for y_pos in range(self.stride)
+        ]
+
+        return (
+            [[slope[0] for slope in row] for row in slopes],
+            [[slope[1] for slope in row] for row in slopes],
         )
 
+    def _point_slope(self, x_pos: int, y_pos: int) -> typing.Tuple[float, float]:
+        """The central difference derivatives of the heightmap at a single point."""
+
+        last = self.stride - 1
+
+        lo_x, hi_x = max(x_pos - 1, 0), min(x_pos + 1, last)
+        lo_y, hi_y = max(y_pos - 1, 0), min(y_pos + 1, last)
+
+        return (
+            (self.get(hi_x, y_pos) - self.get(lo_x, y_pos)) / (hi_x - lo_x),
+            (self.get(x_pos, hi_y) - self.get(x_pos, lo_y)) / (hi_y - lo_y),
+        )
+
+    def _update_slope_map(
+        self, slope_map: typing.Tuple[typing.Any, typing.Any], rect: Rect
+    ):
+        """Computes the gradient field again around a changed rectangle."""
+
+        grad_x, grad_y = slope_map
+        left, top, right, bottom = rect
+
+        # a point's derivatives depend on its direct neighbours
+        left, top = max(left - 1, 0), max(top - 1, 0)
+        right, bottom = min(right + 1, self.stride), min(bottom + 1, self.stride)
+
+        if not NUMPY_SUPPORTED:
+            for y_pos in range(top, bottom):
+                for x_pos in range(left, right):
+                    slope_x, slope_y = self._point_slope(x_pos, y_pos)
+                    grad_x[y_pos][x_pos] = slope_x
+                    grad_y[y_pos][x_pos] = slope_y
+
+            return
+
+        # ...so differentiate over a margin around them
+        in_left, in_top = max(left - 1, 0), max(top - 1, 0)
+        in_right, in_bottom = min(right + 1, self.stride), min(bottom + 1, self.stride)
+
+        block = self.as_array(halo=True)[in_top:in_bottom, in_left:in_right]
+        block_y, block_x = np.gradient(block.astype(np.float64))
+
+        inner = (
+            slice(top - in_top, bottom - in_top),
+            slice(left - in_left, right - in_left),
+        )
+
+        grad_x[top:bottom, left:right] = block_x[inner]
+        grad_y[top:bottom, left:right] = block_y[inner]
+
+    def normal_at(
+        self, x_pos: float, y_pos: float
+    ) -> typing.Tuple[float, float, float]:
+        """The unit surface normal of the terrain at a point, as (X, Y, Z).
+
+        Interpolated from the slope map, so it is a single lookup
+        into a cached field, rather than several height samples.
+        Z points up.
+        """
+
+        grad_x, grad_y = self.slope_map()
+
+        slope_x = _bilinear_grid_at(grad_x, x_pos, y_pos)
+        slope_y = _bilinear_grid_at(grad_y, x_pos, y_pos)
+
+        length = math.sqrt(slope_x * slope_x + slope_y * slope_y + 1.0)
+
+        return (-slope_x / length, -slope_y / length, 1.0 / length)
+
+    def normal_many(self, xs: Coordinates, ys: Coordinates) -> Normals:
+        """A batch terrain normal getter.
+
+        The batch counterpart of normal_at, returning the X, Y
+        and Z components of the normals as three NumPy arrays if
+        NumPy is available, or three lists otherwise.
+        """
+
+        if not NUMPY_SUPPORTED:
+            return unzip_triples(
+                [self.normal_at(x_pos, y_pos) for x_pos, y_pos in zip(xs, ys)]
+            )
+
+        slope_x, slope_y = _bilinear_grid_many(self.slope_map(), xs, ys)
+        length = np.sqrt(slope_x * slope_x + slope_y * slope_y + 1.0)
+
+        return (-slope_x / length, -slope_y / length, 1.0 / length)
+
     def __setitem__(self, pos: typing.Tuple[int, int], value: float):
         """Sets a value of this TerrainChunk heightmap."""
 
         (x_pos, y_pos) = pos
 
-        self.heightmap[y_pos * self.width + x_pos] = value
+        self.heightmap[y_pos * self.stride + x_pos] = value
+        self.mark_changed((x_pos, y_pos, x_pos + 1, y_pos + 1))
+
+    def mark_changed(self, rect: typing.Optional[Rect] = None):
+        """Signals that the heightmap was changed behind this chunk's back.
+
+        For instance, through the view returned by as_array.
+        Pass the rectangle that changed, if known, so that caches
+        derived from the heightmap can be updated only there;
+        otherwise, the whole heightmap is assumed to have changed.
+        """
+
+        self.revision += 1
+        self.dirty_log.append((self.revision, rect or self.full_rect()))
+
+    def full_rect(self) -> Rect:
+        """The rectangle covering the whole heightmap, halo included."""
+
+        return (0, 0, self.stride, self.stride)
+
+    def dirty_since(self, revision: int) -> typing.List[Rect]:
+        """The rectangles of the heightmap changed after a given revision.
+
+        Empty if nothing changed. If the changes go further back
+        than the dirty log remembers, the whole heightmap is
+        returned as a single rectangle.
+
+        Useful for updating anything derived from the heightmap,
+        such as caches, saved copies or remote replicas, only
+        where it changed.
+        """
+
+        if revision >= self.revision:
+            return []
+
+        if not self.dirty_log or self.dirty_log[0][0] > revision + 1:
+            return [self.full_rect()]
+
+        return [rect for change, rect in self.dirty_log if change > revision]
+
+    def _cache_updates(self, revision: int) -> typing.List[Rect]:
+        """The rectangles a cache built at a given revision must update.
+
+        Past a few rectangles, they are merged into their bounding
+        box, so that caches are not updated piecemeal over and over.
+        """
+
+        rects = self.dirty_since(revision)
+
+        if len(rects) > 4:
+            rects = [
+                (
+                    min(rect[0] for rect in rects),
+                    min(rect[1] for rect in rects),
+                    max(rect[2] for rect in rects),
+                    max(rect[3] for rect in rects),
+                )
+            ]
+
+        return rects
+
+    def apply_brush(
+        self,
+        x_pos: int,
+        y_pos: int,
+        brush: "generator.HeightGrid",
+        mode: str = "add",
+    ) -> typing.Optional[Rect]:
+        """Applies a brush, a [y][x] grid of heights, onto the heightmap.
+
+        The brush's first point lands on (x_pos, y_pos), which may
+        lie outside the heightmap; only the overlapping part is
+        applied, halo included. With the 'add' mode, the brush is
+        added to the heightmap; with 'set', it replaces it.
+
+        Returns the changed rectangle, or None if the brush does
+        not overlap the heightmap at all.
+        """
+
+        if mode not in BRUSH_MODES:
+            raise ValueError("Unknown brush mode: {}".format(mode))
+
+        brush_height = len(brush)
+        brush_width = len(brush[0]) if brush_height else 0
+
+        left, top = max(x_pos, 0), max(y_pos, 0)
+        right = min(x_pos + brush_width, self.stride)
+        bottom = min(y_pos + brush_height, self.stride)
+
+        if left >= right or top >= bottom:
+            return None
+
+        if NUMPY_SUPPORTED:
+            block = np.asarray(brush, dtype=np.float64)[
+                top - y_pos : bottom - y_pos, left - x_pos : right - x_pos
+            ]
+
+            if mode == "add":
+                block = self.as_array(halo=True)[top:bottom, left:right] + block
+
+            self._store_block(top, left, block)
+
+        else:
+            for row_pos in range(top, bottom):
+                row = brush[row_pos - y_pos]
+                start = row_pos * self.stride
+
+                for col_pos in range(left, right):
+                    value = row[col_pos - x_pos]
+
+                    if mode == "add":
+                        value += self.heightmap[start + col_pos]
+
+                    self.heightmap[start + col_pos] = value
+
+        rect = (left, top, right, bottom)
+        self.mark_changed(rect)
+
+        return rect
+
+    def fill_halo(
+        self,
+        right: typing.Optional["TerrainChunk"] = None,
+        below: typing.Optional["TerrainChunk"] = None,
+        diagonal: typing.Optional["TerrainChunk"] = None,
+    ):
+        """Fills the halo of this chunk from its neighbours.
+
+        The halo column is copied from the first column of the
+        neighbour along +X ('right'), the halo row from the first
+        row of the neighbour along +Y ('below'), and the corner from
+        the neighbour along both ('diagonal').
+
+        Missing neighbours leave their part of the halo as it was.
+        """
+
+        width = self.width
+
+        if NUMPY_SUPPORTED:
+            if right is not None:
+                self._store_block(0, width, right.as_array()[:, :1])
+
+            if below is not None:
+                self._store_block(width, 0, below.as_array()[:1, :])
+
+        else:
+            for pos in range(width):
+                if right is not None:
+                    self.heightmap[pos * self.stride + width] = right.get(0, pos)
+
+                if below is not None:
+                    self.heightmap[width * self.stride + pos] = below.get(pos, 0)
+
+        if right is not None:
+            self.mark_changed((width, 0, width + 1, width))
+
+        if below is not None:
+            self.mark_changed((0, width, width, width + 1))
+
+        if diagonal is not None:
+            self[width, width] = diagonal.get(0, 0)
+
+    def _extend_halo(self):
+        """Makes the halo flat, by repeating the last column and row into it.
+
+        Does not mark the heightmap as changed.
+        """
+
+        width = self.width
+        stride = self.stride
+
+        for pos in range(width):
+            self.heightmap[pos * stride + width] = self.get(width - 1, pos)
+            self.heightmap[width * stride + pos] = self.get(pos, width - 1)
+
+        self.heightmap[width * stride + width] = self.get(width - 1, width - 1)
+
+    def load_grid(self, grid: "generator.HeightGrid"):
+        """Overwrite the whole heightmap with a grid of heights, indexed [y][x].
+
+        Takes the output of TerrainGenerator.height_grid. The grid
+        may either be as wide as this chunk, in which case the halo
+        is made flat, or as wide as its stride, in which case the
+        halo is loaded from the grid too.
+        """
+
+        grid_width = len(grid)
+
+        if NUMPY_SUPPORTED:
+            grid = np.asarray(grid, dtype=np.float64)
+
+            if grid_width < self.stride:
+                grid = np.pad(grid, (0, self.stride - grid_width), mode="edge")
+
+            self._store_block(0, 0, grid)
+
+        else:
+            for y_pos, row in enumerate(grid):
+                start = y_pos * self.stride
+
+                # per item, as plain buffers only take slices of their own kind
+                for x_pos, height in enumerate(row):
+                    self.heightmap[start + x_pos] = height
+
+            if grid_width < self.stride:
+                self._extend_halo()
+
+        self.mark_changed()
+
+    def max_pyramid(self) -> typing.List[typing.Any]:
+        """The hierarchical maximum-height pyramid of this chunk.
+
+        Level 0 holds, for every heightmap cell, the highest of
+        its four corners, which bounds the interpolated surface
+        within the cell. Each following level halves the
+        resolution, every node holding the maximum of the 2x2
+        nodes below it, until a single node covers the whole chunk.
+
+        Levels are indexed [y][x], and are 2D NumPy arrays if
+        NumPy is available, or lists of rows otherwise.
+
+        Cached; when the heightmap changes, only the nodes above
+        the changed rectangles are computed again, if NumPy is
+        available, or the whole pyramid otherwise.
+        """
+
+        levels = self._max_pyramid
+
+        if levels is not None and self._max_pyramid_revision == self.revision:
+            return levels
+
+        if levels is None or not NUMPY_SUPPORTED:
+            levels = self._max_pyramid = self._build_max_pyramid()
+
+        else:
+            for rect in self._cache_updates(self._max_pyramid_revision):
+                self._update_max_pyramid(levels, rect)
+
+        self._max_pyramid_revision = self.revision
+
+        return levels
+
+    def _build_max_pyramid(self) -> typing.List[typing.Any]:
+        """Builds the maximum-height pyramid from scratch."""
+
+        if NUMPY_SUPPORTED:
+            heights = self.as_array(halo=True)
+
+            array_level = np.maximum(
+                np.maximum(heights[:-1, :-1], heights[1:, :-1]),
+                np.maximum(heights[:-1, 1:], heights[1:, 1:]),
+            )
+            array_levels: typing.List[typing.Any] = [array_level]
+
+            while array_level.shape[0] > 1:
+                array_level = _max_reduce(array_level)
+                array_levels.append(array_level)
+
+            return array_levels
+
+        level: typing.List[typing.List[float]] = [
+            [
+                max(
+                    self.get(x_pos, y_pos),
+                    self.get(x_pos + 1, y_pos),
+                    self.get(x_pos, y_pos + 1),
+                    self.get(x_pos + 1, y_pos + 1),
+                )
+                for x_pos in range(self.width)
+            ]
+            for y_pos in range(self.width)
+        ]
+        levels = [level]
+
+        while len(level) > 1:
+            size = len(level)
+            level = [
+                [
+                    max(
+                        level[y_pos][x_pos]
+                        for y_pos in range(y_node * 2, min(y_node * 2 + 2, size))
+                        for x_pos in range(x_node * 2, min(x_node * 2 + 2, size))
+                    )
+                    for x_node in range((size + 1) // 2)
+                ]
+                for y_node in range((size + 1) // 2)
+            ]
+            levels.append(level)
+
+        return levels
+
+    def _update_max_pyramid(self, levels: typing.List[typing.Any], rect: Rect):
+        """Computes the levels of the max pyramid again above a changed rectangle.
+
+        Needs NumPy.
+        """
+
+        heights = self.as_array(halo=True)
+        left, top, right, bottom = rect
+
+        # a cell covers its corner points, so a point is in up to four cells
+        left, top = max(left - 1, 0), max(top - 1, 0)
+        right, bottom = min(right, self.width), min(bottom, self.width)
+
+        if left >= right or top >= bottom:
+            return
+
+        levels[0][top:bottom, left:right] = np.maximum(
+            np.maximum(
+                heights[top:bottom, left:right],
+                heights[top + 1 : bottom + 1, left:right],
+            ),
+            np.maximum(
+                heights[top:bottom, left + 1 : right + 1],
+                heights[top + 1 : bottom + 1, left + 1 : right + 1],
+            ),
+        )
+
+        for below, level in zip(levels, levels[1:]):
+            left, top = left // 2, top // 2
+            right, bottom = (right + 1) // 2, (bottom + 1) // 2
+
+            level[top:bottom, left:right] = _max_reduce(
+                below[top * 2 : bottom * 2, left * 2 : right * 2]
+            )
+
+    def lod(self, level: int) -> "TerrainChunk":
+        """A reduced resolution version of this chunk, at a level of detail.
+
+        Level 0 is this chunk itself; every level above it halves
+        the resolution, keeping every other point of the level
+        below, up to LOD_LEVELS. The result is a (float32)
+        TerrainChunk of its own, 2 ** level times narrower, so
+        chunk-space coordinates must be divided by 2 ** level to
+        sample it, and its slopes by 2 ** level to get this chunk's.
+
+        Coarse levels are built on demand, and cached until the
+        heightmap changes. Raises ValueError if the chunk's width
+        is not a multiple of 2 ** level.
+        """
+        if level == 0:
+            return self
+
+        factor = 1 << level
+
+        if not 0 < level <= LOD_LEVELS or self.width % factor:
+            raise ValueError(
+                "No level of detail {} for chunks of width {}".format(level, self.width)
+            )
+
+        if self._lods_revision != self.revision:
+            self._lods.clear()
+            self._lods_revision = self.revision
+
+        coarse = self._lods.get(level)
+
+        if coarse is None:
+            coarse = self._lods[level] = self._decimate(factor)
+
+        return coarse
+
+    def _decimate(self, factor: int) -> "TerrainChunk":
+        """A TerrainChunk keeping every factor-th heightmap point, halo included."""
+        coarse = TerrainChunk(self.width // factor)
+
+        if NUMPY_SUPPORTED:
+            coarse.load_grid(self.as_array(halo=True)[::factor, ::factor])
+
+        else:
+            coarse.load_grid(
+                [
+                    [self.get(x_pos, y_pos) for x_pos in range(0, self.stride, factor)]
+                    for y_pos in range(0, self.stride, factor)
+                ]
+            )
+
+        return coarse
+
+    def ray_skip(
+        self,
+        x_pos: float,
+        y_pos: float,
+        height: float,
+        direction: typing.Tuple[float, float, float],
+    ) -> float:
+        """How far a ray can go without possibly hitting this chunk's terrain.
+
+        Takes the ray's position in chunk-space, its height, and
+        its direction as a unit (X, Y, Z) vector. Walks down the
+        max pyramid, from the node covering the whole chunk toward
+        single cells, looking for the largest node containing the
+        ray that the ray stays above of until leaving it.
+
+        Returns the distance until the ray leaves that node, plus
+        a small epsilon, or zero if no such node was found.
+        """
+
+        dir_x, dir_y, dir_z = direction
+
+        if not (0.0 <= x_pos < self.width and 0.0 <= y_pos < self.width):
+            return 0.0
+
+        pyramid = self.max_pyramid()
+
+        for level_index in range(len(pyramid) - 1, -1, -1):
+            level = pyramid[level_index]
+            node_size = 1 << level_index
+
+            node_x = min(int(x_pos) >> level_index, len(level) - 1)
+            node_y = min(int(y_pos) >> level_index, len(level) - 1)
+
+            node_max = level[node_y][node_x]
+
+            if height <= node_max:
+                continue
+
+            exit_dist = math.inf
+
+            # nodes of chunks whose width is not a power of two may
+            # reach past the chunk, into terrain they do not cover
+            far_x = min((node_x + 1) * node_size, self.width)
+            far_y = min((node_y + 1) * node_size, self.width)
+
+            if dir_x > 0.0:
+                exit_dist = (far_x - x_pos) / dir_x
+
+            elif dir_x < 0.0:
+                exit_dist = (node_x * node_size - x_pos) / dir_x
+
+            if dir_y > 0.0:
+                exit_dist = min(exit_dist, (far_y - y_pos) / dir_y)
+
+            elif dir_y < 0.0:
+                exit_dist = min(exit_dist, (node_y * node_size - y_pos) / dir_y)
+
+            if dir_z < 0.0 and height + dir_z * exit_dist <= node_max:
+                continue
+
+            return exit_dist + 0.0001
+
+        return 0.0
 
-    @maybe_numba_jit(nopython=False)
     def generate(
         self,
         generator: "generator.TerrainGenerator",
@@ -143,13 +1378,208 @@ class TerrainChunk:
         """Generate the heightmap according to the passed TerrainGenerator.
 
         Generates the heightmap of this terrain chunk from
-        a TerrainGenerator instance.
+        a TerrainGenerator instance, in a single height_grid
+        call, so that vectorized generators can fill the
+        whole chunk in one pass.
+
+        The halo is generated too, so that it already matches
+        the neighbouring chunks, as long as the generator is
+        deterministic; World.sync_halos takes care of the rest.
         """
 
         x_offset, y_offset = offset
 
-        for i_pos in range(self.width * self.width):
-            x_pos = i_pos % self.width
-            y_pos = math.floor(i_pos / self.width)
+        self.load_grid(generator.height_grid(x_offset, y_offset, self.stride))
+
+
+class QuantizedTerrainChunk(TerrainChunk):
+    """A TerrainChunk storing its heights as 16-bit integers.
+
+    Every height is kept as offset + scale * value, where value is
+    an int16 between -32767 and 32767, and offset and scale (the
+    height step, height_scale) are picked per chunk to cover the
+    range of its heights. This takes half the memory, and half
+    the region file space, of float32 heights.
+
+    The interpolation kernels dequantize on the fly, so the
+    whole float API (indexing, sample_many, gradients, normals,
+    and so on) works as usual, just with slightly rounded heights:
+
+    * a height is off by at most half a step (height_scale / 2)
+      from what was last written to it;
+    * when a write falls out of the range the chunk can represent,
+      the whole chunk is requantized with a step at least twice as
+      large, which may round the other heights again; as the step
+      at least doubles every time, they are still never off by
+      more than one step in total.
+
+    Writing a whole heightmap (load_grid, and so generation) picks
+    the tightest step for it: the chunk's height range divided by
+    65534, and never less than MIN_QUANTIZATION_STEP. Chunks
+    spanning 100 units of height are thus off by less than a
+    millimetre, if a unit is a metre.
+
+    Use TerrainChunk wherever exact float32 heights matter.
 
-            self[x_pos, y_pos] = generator.height_at(x_pos + x_offset, y_pos + y_offset)
+    as_array returns a dequantized copy, not a view, so it cannot
+    be written through; use apply_brush or indexing instead.
+
+    Requires NumPy.
+    """
+
+    quantized = True
+
+    @classmethod
+    def buffer_size(cls, width: int) -> int:
+        """The size, in bytes, of the heightmap buffer of a chunk of a given width.
+
+        That is, 16 bytes for the offset and scale, as float64,
+        followed by the heights, as int16.
+        """
+        return 16 + (width + 1) ** 2 * 2
+
+    def _init_heightmap(self, buffer: typing.Optional[typing.Any]):
+        """Sets the quantized heightmap up, in a given buffer or in a new one."""
+
+        numpy = require_numpy("QuantizedTerrainChunk")
+
+        if buffer is None:
+            buffer = bytearray(self.buffer_size(self.width))
+
+        self._buffer = memoryview(buffer).cast("B")
+
+        self._params = numpy.frombuffer(self._buffer, dtype=numpy.float64, count=2)
+        self._values = numpy.frombuffer(
+            self._buffer, dtype=numpy.int16, offset=16
+        ).reshape(self.stride, self.stride)
+
+        if USE_CFFI_INTERPOLATOR:
+            self.heightmap = ffi.from_buffer(
+                "short[]", self._buffer[16:], require_writable=True
+            )
+
+        else:
+            self.heightmap = self._buffer[16:].cast("h")
+
+        # blank buffers have no step yet
+        if not self._params[1] > 0.0:
+            self._params[:] = (0.0, MIN_QUANTIZATION_STEP)
+
+    @property
+    def height_offset(self) -> float:  # type: ignore
+        """The height a quantized value of zero stands for."""
+        return float(self._params[0])
+
+    @property
+    def height_scale(self) -> float:  # type: ignore
+        """The height step between consecutive quantized values."""
+        return float(self._params[1])
+
+    def get(self, x_pos: int, y_pos: int) -> float:
+        """A terrain height getter, at aligned (integer) positions, uninterpolated.
+
+        Dequantizes the stored value.
+        """
+        return self.height_offset + self.height_scale * int(self._values[y_pos, x_pos])
+
+    def get_raw(self, x_pos: int, y_pos: int) -> float:
+        """The quantized value stored at an aligned (integer) position."""
+        return int(self._values[y_pos, x_pos])
+
+    def heightmap_buffer(self) -> typing.Any:
+        """The raw bytes of the heightmap, offset and scale included."""
+        return self._buffer
+
+    def as_array(self, halo: bool = False) -> "np.ndarray":
+        """A dequantized float32 copy of the heightmap.
+
+        Unlike TerrainChunk.as_array, writes to it are not seen
+        by the chunk.
+        """
+        heights = (
+            self.height_offset + self.height_scale * self._values.astype(np.float64)
+        ).astype(np.float32)
+
+        if halo:
+            return heights
+
+        return heights[: self.width, : self.width]
+
+    def raw_array(self, halo: bool = False) -> "np.ndarray":
+        """A zero-copy NumPy view of the quantized int16 values."""
+        if halo:
+            return self._values
+
+        return self._values[: self.width, : self.width]
+
+    def _bilinear_cffi(self, x_pos: float, y_pos: float) -> float:
+        """Interpolates the heightmap at a point, using the CFFI interpolator."""
+
+        return bilinear_q(
+            self.stride,
+            x_pos,
+            y_pos,
+            self.heightmap,
+            self.height_offset,
+            self.height_scale,
+        )
+
+    def __setitem__(self, pos: typing.Tuple[int, int], value: float):
+        """Sets a value of this TerrainChunk heightmap, quantizing it."""
+
+        (x_pos, y_pos) = pos
+
+        self._store_block(y_pos, x_pos, np.full((1, 1), value, dtype=np.float64))
+        self.mark_changed((x_pos, y_pos, x_pos + 1, y_pos + 1))
+
+    def _store_block(self, top: int, left: int, block: "np.ndarray"):
+        """Quantizes and writes a [y][x] block of heights into the heightmap.
+
+        Requantizes the whole chunk first if the block does not
+        fit in its current range. Does not mark the heightmap as
+        changed.
+        """
+        block = np.asarray(block, dtype=np.float64)
+        rows, cols = block.shape
+
+        if block.size == 0:
+            return
+
+        if (rows, cols) == (self.stride, self.stride):
+            self._requantize(block, grow=False)
+            return
+
+        offset, scale = self.height_offset, self.height_scale
+        limit = QUANTIZED_LIMIT * scale
+
+        if block.min() < offset - limit or block.max() > offset + limit:
+            heights = self.as_array(halo=True).astype(np.float64)
+            heights[top : top + rows, left : left + cols] = block
+
+            self._requantize(heights, grow=True)
+            return
+
+        self._values[top : top + rows, left : left + cols] = np.rint(
+            (block - offset) / scale
+        )
+
+    def _requantize(self, heights: "np.ndarray", grow: bool):
+        """Picks a new offset and scale for a whole heightmap, and stores it.
+
+        If grow is set, the step is at least doubled, which bounds
+        how far repeated requantizations can drift heights.
+        """
+        low = float(heights.min())
+        high = float(heights.max())
+
+        scale = max((high - low) / (2 * QUANTIZED_LIMIT), MIN_QUANTIZATION_STEP)
+
+        if grow:
+            scale = max(scale, self.height_scale * 2.0)
+
+        offset = (low + high) / 2.0
+
+        self._params[:] = (offset, scale)
+        self._values[:] = np.clip(
+            np.rint((heights - offset) / scale), -QUANTIZED_LIMIT, QUANTIZED_LIMIT
+        )
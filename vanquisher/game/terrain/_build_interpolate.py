@@ -2,7 +2,19 @@
 from cffi import FFI  # type: ignore
 
 C_DEFS = """
-float bilinear(int width, float x, float y, float *vals);
+double bilinear(int width, double x, double y, const float *vals);
+void bilinear_many(int width, const float *vals, int count, const double *xs,
+    const double *ys, double *heights);
+void gradient_many(int width, const float *vals, int count, const double *xs,
+    const double *ys, double *heights, double *grad_x, double *grad_y);
+
+double bilinear_q(int width, double x, double y, const short *vals, double offset,
+    double scale);
+void bilinear_many_q(int width, const short *vals, double offset, double scale,
+    int count, const double *xs, const double *ys, double *heights);
+void gradient_many_q(int width, const short *vals, double offset, double scale,
+    int count, const double *xs, const double *ys, double *heights, double *grad_x,
+    double *grad_y);
 """
 
 ffibuilder = FFI()
@@ -11,8 +23,9 @@ ffibuilder.cdef(C_DEFS)
 
 ffibuilder.set_source(
     "vanquisher.game.terrain._interpolate",
-    C_DEFS,
+    '#include "_interpolate.h"',
     sources=["ext/_interpolate.c"],
+    include_dirs=["ext"],
 )
 
 
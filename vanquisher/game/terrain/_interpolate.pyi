@@ -1,5 +1,45 @@
 """Bilinear interpolation C extension stub."""
 
-def _bilinear(width: int, x: float, y: float, values) -> float:
+def bilinear(width: int, x: float, y: float, values) -> float:
     """C bilinear interpolation function."""
     ...
+
+def bilinear_many(width: int, values, count: int, xs, ys, heights) -> None:
+    """C batch bilinear interpolation function; writes into heights."""
+    ...
+
+def gradient_many(
+    width: int, values, count: int, xs, ys, heights, grad_x, grad_y
+) -> None:
+    """C batch bilinear interpolation function, with partial derivatives.
+
+    Writes into heights, grad_x and grad_y.
+    """
+    ...
+
+def bilinear_q(
+    width: int, x: float, y: float, values, offset: float, scale: float
+) -> float:
+    """C bilinear interpolation function, for int16 quantized heights."""
+    ...
+
+def bilinear_many_q(
+    width: int, values, offset: float, scale: float, count: int, xs, ys, heights
+) -> None:
+    """C batch bilinear interpolation function, for int16 quantized heights."""
+    ...
+
+def gradient_many_q(
+    width: int,
+    values,
+    offset: float,
+    scale: float,
+    count: int,
+    xs,
+    ys,
+    heights,
+    grad_x,
+    grad_y,
+) -> None:
+    """C batch gradient function, for int16 quantized heights."""
+    ...
@@ -7,6 +7,16 @@ first loaded and does not have terrain in it yet.
 
 import abc
 import random
+import typing
+
+from ....numpy import SUPPORTED as NUMPY_SUPPORTED
+from ....numpy import numpy as np
+from ....numpy import require_numpy
+from .. import noise
+
+# A square grid of heights, indexed [y][x]; a 2D NumPy
+# array if NumPy is available, or a list of rows otherwise.
+HeightGrid = typing.Union[typing.List[typing.List[float]], "np.ndarray"]
 
 
 class TerrainGenerator(abc.ABC):
@@ -17,15 +27,138 @@ class TerrainGenerator(abc.ABC):
     to initialize parameters, but call `super().__init__`
     if you do.
 
+    Generators that can compute many heights at once
+    should also override `height_grid`, which is what
+    TerrainChunk.generate actually uses.
+
+    Randomness should come from noise_at and noise_grid rather
+    than from rng; they are keyed by position rather than by how
+    many values were drawn before, so chunks come out the same no
+    matter the order (or process) they are generated in.
+
     This example implementation puts much of its code in
     height_at.
     """
 
     def __init__(self, seed: int):
         """Initializes this TerrainGenerator with a random number generator seed."""
+        self.seed: int = int(seed)
         self.rng: random.Random = random.Random(seed)
 
+    def noise_at(self, x_pos: int, y_pos: int, salt: int = 0) -> float:
+        """Uniform noise in [0, 1) at a terrain heightmap point.
+
+        Keyed by this generator's seed and the point alone. Different
+        salts give independent noise channels.
+        """
+        return noise.noise_at(noise.derive_seed(self.seed, salt), x_pos, y_pos)
+
+    def noise_grid(
+        self, xs: "np.ndarray", ys: "np.ndarray", salt: int = 0
+    ) -> "np.ndarray":
+        """Uniform noise in [0, 1) at many terrain heightmap points at once.
+
+        Same as noise_at, for NumPy arrays of coordinates (such as
+        the ones from grid_coordinates).
+        """
+        return noise.noise_array(noise.derive_seed(self.seed, salt), xs, ys)
+
     @abc.abstractmethod
     def height_at(self, x_pos: int, y_pos: int) -> float:
         """Gets the height this generator shall assign to a terrain heightmap point."""
         ...
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int) -> HeightGrid:
+        """Gets the heights of a whole square grid of terrain heightmap points.
+
+        The grid starts at (x_offset, y_offset) and is indexed [y][x].
+
+        This default implementation calls height_at for every point,
+        in row-major order; subclasses are encouraged to override it
+        with a vectorized version.
+        """
+        rows = [
+            [
+                self.height_at(x_offset + x_pos, y_offset + y_pos)
+                for x_pos in range(width)
+            ]
+            for y_pos in range(width)
+        ]
+
+        if NUMPY_SUPPORTED:
+            return np.array(rows, dtype=np.float64)
+
+        return rows
+
+    def coarse_height_grid(
+        self, x_offset: int, y_offset: int, width: int, step: int
+    ) -> HeightGrid:
+        """Gets the heights of a square grid of every step-th heightmap point.
+
+        The grid starts at (x_offset, y_offset), is width points
+        wide, and is indexed [y][x]; its point (i, j) is the
+        heightmap point (x_offset + i * step, y_offset + j * step).
+        Used to generate coarse, level-of-detail versions of chunks
+        for a fraction of the cost.
+
+        This default implementation goes through height_grid if
+        step is 1, through height_points if NumPy is available, and
+        calls height_at for every point otherwise.
+        """
+        if step == 1:
+            return self.height_grid(x_offset, y_offset, width)
+
+        if NUMPY_SUPPORTED:
+            xs, ys = self.grid_coordinates(0, 0, width)
+
+            return self.height_points(x_offset + xs * step, y_offset + ys * step)
+
+        return [
+            [
+                self.height_at(x_offset + x_pos * step, y_offset + y_pos * step)
+                for x_pos in range(width)
+            ]
+            for y_pos in range(width)
+        ]
+
+    def height_points(self, xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        """Gets the heights at arbitrary, possibly fractional, points.
+
+        xs and ys are NumPy arrays of coordinates, of the same
+        shape; so is the result. Used by generator graphs, whose
+        domain warps sample their inputs off the grid.
+
+        This default implementation calls height_at for every
+        point, and thus needs a height_at that accepts fractional
+        positions; subclasses are encouraged to override it with a
+        vectorized version.
+
+        Requires NumPy.
+        """
+        numpy = require_numpy("TerrainGenerator.height_points")
+
+        xs, ys = numpy.broadcast_arrays(
+            numpy.asarray(xs, dtype=numpy.float64),
+            numpy.asarray(ys, dtype=numpy.float64),
+        )
+        heights = numpy.empty(xs.shape, dtype=numpy.float64)
+
+        for index in numpy.ndindex(*xs.shape):
+            heights[index] = self.height_at(xs[index], ys[index])
+
+        return heights
+
+    @staticmethod
+    def grid_coordinates(
+        x_offset: int, y_offset: int, width: int
+    ) -> typing.Tuple["np.ndarray", "np.ndarray"]:
+        """The X and Y coordinates of every point of a grid, as 2D NumPy arrays.
+
+        A convenience for vectorized height_grid implementations.
+        """
+        xs, ys = np.meshgrid(
+            np.arange(x_offset, x_offset + width, dtype=np.float64),
+            np.arange(y_offset, y_offset + width, dtype=np.float64),
+        )
+
+        return xs, ys
@@ -0,0 +1,384 @@
+"""A fractal gradient noise terrain generator."""
+
+import functools
+import math
+import random
+import typing
+
+import attr
+
+from .... import kernels
+from ....numba import SUPPORTED as NUMBA_SUPPORTED
+from ....numba import maybe_numba_jit
+from .. import noise
+from . import NUMPY_SUPPORTED, HeightGrid, TerrainGenerator, np
+
+# the eight gradient directions of 2D Perlin noise
+GRADIENTS = ((1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def _fade(alpha):
+    """Perlin's smootherstep fade curve; works on floats and NumPy arrays alike."""
+    return alpha * alpha * alpha * (alpha * (alpha * 6.0 - 15.0) + 10.0)
+
+
+@attr.s(frozen=True)
+class NoiseTables:
+    """The permutation and gradient tables of a gradient noise seed.
+
+    The permutation is doubled to 512 entries, so that
+    perm[perm[x] + y] never needs wrapping. grad_x and grad_y
+    hold the gradient picked by each permutation entry.
+    """
+
+    perm: typing.List[int] = attr.ib()
+    grad_x: typing.List[float] = attr.ib()
+    grad_y: typing.List[float] = attr.ib()
+
+    # NumPy copies of the above; only the vectorized noise reads
+    # them, so without NumPy they are the very same lists
+    perm_array: "np.ndarray" = attr.ib()
+    grad_x_array: "np.ndarray" = attr.ib()
+    grad_y_array: "np.ndarray" = attr.ib()
+
+
+@functools.lru_cache(maxsize=32)
+def noise_tables(seed: int) -> NoiseTables:
+    """The noise tables for a seed.
+
+    Cached, so that every generator (and every chunk) using
+    the same seed shares them.
+    """
+    perm = list(range(256))
+    random.Random(seed).shuffle(perm)
+    perm += perm
+
+    grad_x = [float(GRADIENTS[entry & 7][0]) for entry in perm]
+    grad_y = [float(GRADIENTS[entry & 7][1]) for entry in perm]
+
+    if not NUMPY_SUPPORTED:
+        return NoiseTables(
+            perm,
+            grad_x,
+            grad_y,
+            typing.cast("np.ndarray", perm),
+            typing.cast("np.ndarray", grad_x),
+            typing.cast("np.ndarray", grad_y),
+        )
+
+    return NoiseTables(
+        perm,
+        grad_x,
+        grad_y,
+        np.array(perm, dtype=np.intp),
+        np.array(grad_x, dtype=np.float64),
+        np.array(grad_y, dtype=np.float64),
+    )
+
+
+def _corner(grad_x, grad_y, hashed, off_x, off_y):
+    """The dot product of a lattice corner's gradient and the offset from it.
+
+    hashed picks the corner's gradient from grad_x and grad_y;
+    works on ints and lists, and on NumPy arrays alike.
+    """
+    return grad_x[hashed] * off_x + grad_y[hashed] * off_y
+
+
+def _blend(value_00, value_10, value_01, value_11, x_frac, y_frac):
+    """Blends the values of the four corners of a lattice cell by the fade curve.
+
+    Works on floats and NumPy arrays alike.
+    """
+    fade_x = _fade(x_frac)
+    fade_y = _fade(y_frac)
+
+    value_0 = value_00 + (value_10 - value_00) * fade_x
+    value_1 = value_01 + (value_11 - value_01) * fade_x
+
+    return value_0 + (value_1 - value_0) * fade_y
+
+
+def gradient_noise(tables: NoiseTables, x_pos: float, y_pos: float) -> float:
+    """2D gradient (Perlin) noise at a point, roughly in [-1, 1]."""
+    x_floor = math.floor(x_pos)
+    y_floor = math.floor(y_pos)
+
+    x_frac = x_pos - x_floor
+    y_frac = y_pos - y_floor
+
+    x_cell = x_floor & 255
+    y_cell = y_floor & 255
+
+    perm = tables.perm
+    grads = (tables.grad_x, tables.grad_y)
+    row_lo = perm[x_cell]
+    row_hi = perm[x_cell + 1]
+
+    return _blend(
+        _corner(*grads, perm[row_lo + y_cell], x_frac, y_frac),
+        _corner(*grads, perm[row_hi + y_cell], x_frac - 1.0, y_frac),
+        _corner(*grads, perm[row_lo + y_cell + 1], x_frac, y_frac - 1.0),
+        _corner(*grads, perm[row_hi + y_cell + 1], x_frac - 1.0, y_frac - 1.0),
+        x_frac,
+        y_frac,
+    )
+
+
+def gradient_noise_points(
+    tables: NoiseTables, xs: "np.ndarray", ys: "np.ndarray"
+) -> "np.ndarray":
+    """2D gradient noise at arbitrary points, given as arrays of coordinates.
+
+    xs and ys may be of any shapes that broadcast together;
+    the result has their broadcast shape. Gives the same values
+    gradient_noise would give.
+    """
+    x_floor = np.floor(xs)
+    y_floor = np.floor(ys)
+
+    x_frac = xs - x_floor
+    y_frac = ys - y_floor
+
+    x_cell = x_floor.astype(np.intp) & 255
+    y_cell = y_floor.astype(np.intp) & 255
+
+    perm = tables.perm_array
+    grads = (tables.grad_x_array, tables.grad_y_array)
+    row_lo = perm[x_cell]
+    row_hi = perm[x_cell + 1]
+
+    return _blend(
+        _corner(*grads, perm[row_lo + y_cell], x_frac, y_frac),
+        _corner(*grads, perm[row_hi + y_cell], x_frac - 1.0, y_frac),
+        _corner(*grads, perm[row_lo + y_cell + 1], x_frac, y_frac - 1.0),
+        _corner(*grads, perm[row_hi + y_cell + 1], x_frac - 1.0, y_frac - 1.0),
+        x_frac,
+        y_frac,
+    )
+
+
+def gradient_noise_grid(
+    tables: NoiseTables, xs: "np.ndarray", ys: "np.ndarray"
+) -> "np.ndarray":
+    """2D gradient noise over a grid, given its X and Y axes.
+
+    xs are the X coordinates of the columns and ys the Y
+    coordinates of the rows, as 1D arrays. They are passed to
+    gradient_noise_points as a row and a column, so everything
+    that only depends on one axis is computed once per column
+    or row and then broadcast. Returns a [y][x] array, with the
+    same values gradient_noise would give.
+    """
+    return gradient_noise_points(tables, xs[np.newaxis, :], ys[:, np.newaxis])
+
+
+@maybe_numba_jit(nopython=True)
+def _gradient_noise_grid_kernel(perm, grad_x, grad_y, xs, ys, out):
+    """Gradient noise over a grid, one point at a time. Made for Numba."""
+    for row in range(ys.shape[0]):
+        y_floor = math.floor(ys[row])
+        y_frac = ys[row] - y_floor
+        y_cell = int(y_floor) & 255
+        fade_y = y_frac * y_frac * y_frac * (y_frac * (y_frac * 6.0 - 15.0) + 10.0)
+
+        for col in range(xs.shape[0]):
+            x_floor = math.floor(xs[col])
+            x_frac = xs[col] - x_floor
+            x_cell = int(x_floor) & 255
+            fade_x = x_frac * x_frac * x_frac * (x_frac * (x_frac * 6.0 - 15.0) + 10.0)
+
+            row_lo = perm[x_cell]
+            row_hi = perm[x_cell + 1]
+
+            hash_00 = perm[row_lo + y_cell]
+            hash_10 = perm[row_hi + y_cell]
+            hash_01 = perm[row_lo + y_cell + 1]
+            hash_11 = perm[row_hi + y_cell + 1]
+
+            value_00 = grad_x[hash_00] * x_frac + grad_y[hash_00] * y_frac
+            value_10 = grad_x[hash_10] * (x_frac - 1.0) + grad_y[hash_10] * y_frac
+            value_01 = grad_x[hash_01] * x_frac + grad_y[hash_01] * (y_frac - 1.0)
+            value_11 = grad_x[hash_11] * (x_frac - 1.0) + grad_y[hash_11] * (
+                y_frac - 1.0
+            )
+
+            value_0 = value_00 + (value_10 - value_00) * fade_x
+            value_1 = value_01 + (value_11 - value_01) * fade_x
+
+            out[row, col] = value_0 + (value_1 - value_0) * fade_y
+
+
+def gradient_noise_grid_numba(
+    tables: NoiseTables, xs: "np.ndarray", ys: "np.ndarray"
+) -> "np.ndarray":
+    """Same as gradient_noise_grid, compiled with Numba.
+
+    Skips the temporary arrays of the vectorized version.
+    """
+    out = np.empty((ys.shape[0], xs.shape[0]), dtype=np.float64)
+
+    _gradient_noise_grid_kernel(
+        tables.perm_array,
+        tables.grad_x_array,
+        tables.grad_y_array,
+        np.ascontiguousarray(xs, dtype=np.float64),
+        np.ascontiguousarray(ys, dtype=np.float64),
+        out,
+    )
+
+    return out
+
+
+def _noise_grid_workload() -> typing.Callable[[typing.Callable], typing.Any]:
+    """A noise grid workload, to pick the fastest backend with."""
+    tables = noise_tables(0)
+    xs = np.arange(-16.0, 17.0) * 0.37 + 0.5
+    ys = np.arange(-16.0, 17.0) * 0.29 + 0.5
+
+    return lambda implementation: implementation(tables, xs, ys)
+
+
+# Gradient noise over a grid; kernels.autoselect may pick another backend.
+GRADIENT_NOISE_GRID_KERNEL = kernels.kernel(
+    "terrain.gradient_noise_grid", _noise_grid_workload
+)
+
+if NUMPY_SUPPORTED and NUMBA_SUPPORTED:
+    GRADIENT_NOISE_GRID_KERNEL.register("numba", gradient_noise_grid_numba)
+
+if NUMPY_SUPPORTED:
+    GRADIENT_NOISE_GRID_KERNEL.register("numpy", gradient_noise_grid)
+
+
+class FractalTerrainGenerator(TerrainGenerator):
+    """A TerrainGenerator implementation summing octaves of gradient noise.
+
+    Also known as fractal Brownian motion (fBm). Each octave
+    has lacunarity times the frequency of the previous one,
+    and persistence times its amplitude; the sum is
+    normalized so that heights stay roughly within
+    base_height +/- amplitude.
+
+    Everything is derived from the seed alone, so any chunk
+    can be generated independently of any other.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        base_height: float = 20.0,
+        amplitude: float = 16.0,
+        scale: float = 64.0,
+        octaves: int = 5,
+        lacunarity: float = 2.0,
+        persistence: float = 0.5,
+    ):
+        """Initializes the FractalTerrainGenerator's parameters.
+
+        scale is the size, in heightmap points, of the features
+        of the first (coarsest) octave.
+        """
+        super().__init__(seed)
+
+        self.base_height: float = base_height
+        self.amplitude: float = amplitude
+        self.scale: float = scale
+        self.octaves: int = octaves
+        self.lacunarity: float = lacunarity
+        self.persistence: float = persistence
+
+        self.tables_seed: int = noise.derive_seed(self.seed)
+
+        # (frequency, weight, X offset, Y offset) of each octave;
+        # the offsets keep lattice points of different octaves
+        # from lining up.
+        self.octave_params: typing.List[typing.Tuple[float, float, float, float]] = []
+
+        frequency = 1.0 / scale
+        weight = 1.0
+
+        for octave in range(octaves):
+            self.octave_params.append(
+                (
+                    frequency,
+                    weight,
+                    256.0 * self.noise_at(octave, 0, salt=1),
+                    256.0 * self.noise_at(octave, 1, salt=1),
+                )
+            )
+
+            frequency *= lacunarity
+            weight *= persistence
+
+        total_weight = sum(params[1] for params in self.octave_params)
+        self.normalization: float = amplitude / total_weight if total_weight else 0.0
+
+    def height_at(self, x_pos: int, y_pos: int) -> float:
+        """Finds a height at a specific X and Y position in the terrain height grid."""
+        tables = noise_tables(self.tables_seed)
+        height = 0.0
+
+        for frequency, weight, off_x, off_y in self.octave_params:
+            height += weight * gradient_noise(
+                tables, x_pos * frequency + off_x, y_pos * frequency + off_y
+            )
+
+        return self.base_height + height * self.normalization
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int) -> HeightGrid:
+        """Finds the heights of a whole square grid at once.
+
+        Each octave is a handful of vectorized operations over
+        the whole grid, or a single Numba loop; see
+        GRADIENT_NOISE_GRID_KERNEL.
+        """
+        if not NUMPY_SUPPORTED:
+            return super().height_grid(x_offset, y_offset, width)
+
+        return self.coarse_height_grid(x_offset, y_offset, width, 1)
+
+    def coarse_height_grid(
+        self, x_offset: int, y_offset: int, width: int, step: int
+    ) -> HeightGrid:
+        """Finds the heights of a square grid of every step-th point at once.
+
+        Same as height_grid, with the grid's axes spaced out.
+        """
+        if not NUMPY_SUPPORTED:
+            return super().coarse_height_grid(x_offset, y_offset, width, step)
+
+        tables = noise_tables(self.tables_seed)
+
+        xs = x_offset + np.arange(width, dtype=np.float64) * step
+        ys = y_offset + np.arange(width, dtype=np.float64) * step
+
+        heights = np.zeros((width, width), dtype=np.float64)
+
+        noise_grid = GRADIENT_NOISE_GRID_KERNEL.function
+
+        for frequency, weight, off_x, off_y in self.octave_params:
+            heights += weight * noise_grid(
+                tables, xs * frequency + off_x, ys * frequency + off_y
+            )
+
+        return self.base_height + heights * self.normalization
+
+    def height_points(self, xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        """Finds the heights at arbitrary points at once."""
+        if not NUMPY_SUPPORTED:
+            return super().height_points(xs, ys)
+
+        tables = noise_tables(self.tables_seed)
+
+        xs, ys = np.broadcast_arrays(
+            np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        )
+        heights = np.zeros(xs.shape, dtype=np.float64)
+
+        for frequency, weight, off_x, off_y in self.octave_params:
+            heights += weight * gradient_noise_points(
+                tables, xs * frequency + off_x, ys * frequency + off_y
+            )
+
+        return self.base_height + heights * self.normalization
@@ -0,0 +1,301 @@
+"""Composable terrain generator graphs.
+
+Terrain is often built by combining simpler generators: adding
+ridges to rolling hills, warping them with noise, masking them
+by a biome map, and so on. Doing so by subclassing means every
+layer calls the layers below it once per heightmap point.
+
+Instead, the nodes here are TerrainGenerators whose inputs are
+other TerrainGenerators (graph nodes or not), and which are
+evaluated a whole block of points at a time, as NumPy arrays.
+Each block is evaluated in one pass over the graph, in which
+every input is evaluated at most once; inputs shared between
+several nodes (say, a noise layer used both as a mask and as a
+warp) are only computed once per chunk.
+
+    hills = FractalTerrainGenerator(seed)
+    detail = FractalTerrainGenerator(seed + 1, amplitude=2.0, scale=8.0)
+
+    terrain = Add(DomainWarp(hills, detail, detail, strength=3.0), detail)
+
+Requires NumPy.
+"""
+
+import abc
+import typing
+
+from ....numpy import require_numpy
+from . import HeightGrid, TerrainGenerator, np
+
+# The heights of every node evaluated for a block so far,
+# keyed by the id of the node.
+Memo = typing.Dict[int, "np.ndarray"]
+
+
+class Block:
+    """A block of points a generator graph is evaluated over.
+
+    Either a square grid of heightmap points, as given to
+    height_grid, or arbitrary points, as given to height_points
+    (which is what a domain warp turns a grid into).
+    """
+
+    def __init__(
+        self,
+        grid: typing.Optional[typing.Tuple[int, int, int]] = None,
+        points: typing.Optional[typing.Tuple["np.ndarray", "np.ndarray"]] = None,
+    ):
+        """Initializes this block, from either a grid or arrays of points.
+
+        grid is (x_offset, y_offset, width); points is (xs, ys).
+        """
+        if (grid is None) == (points is None):
+            raise ValueError("A block is either a grid or points, not both")
+
+        self.grid = grid
+        self.points = points
+
+    def coordinates(self) -> typing.Tuple["np.ndarray", "np.ndarray"]:
+        """The X and Y coordinates of every point of this block."""
+        grid, points = self.grid, self.points
+
+        if points is not None:
+            return points
+
+        if grid is None:
+            raise ValueError("A block is either a grid or points")
+
+        return TerrainGenerator.grid_coordinates(*grid)
+
+    def evaluate(self, source: TerrainGenerator, memo: Memo) -> "np.ndarray":
+        """The heights of a generator over this block, memoized.
+
+        Graph nodes are evaluated through the memo, so their own
+        inputs are memoized too; other generators are asked for
+        their height_grid or height_points.
+        """
+        key = id(source)
+        heights = memo.get(key)
+
+        if heights is not None:
+            return heights
+
+        grid, points = self.grid, self.points
+
+        if isinstance(source, GraphGenerator):
+            heights = source.evaluate(self, memo)
+
+        elif grid is not None:
+            heights = np.asarray(source.height_grid(*grid), dtype=np.float64)
+
+        elif points is not None:
+            heights = np.asarray(source.height_points(*points), dtype=np.float64)
+
+        else:
+            raise ValueError("A block is either a grid or points")
+
+        memo[key] = heights
+
+        return heights
+
+
+class GraphGenerator(TerrainGenerator):
+    """Base class of generator graph nodes.
+
+    Subclasses only need to override evaluate, getting the
+    heights of their inputs from block.evaluate.
+
+    Requires NumPy.
+    """
+
+    def __init__(self, *inputs: TerrainGenerator):
+        """Initializes this node with its input generators.
+
+        Its seed is that of its first input, if any.
+        """
+        require_numpy(type(self).__name__)
+
+        super().__init__(inputs[0].seed if inputs else 0)
+
+        self.inputs: typing.Tuple[TerrainGenerator, ...] = inputs
+
+    @abc.abstractmethod
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Computes the heights of this node over a block.
+
+        Must return a float64 array of the shape of the block's
+        coordinates. Do not call this directly; go through
+        block.evaluate, which memoizes.
+        """
+        ...
+
+    def height_at(self, x_pos: int, y_pos: int) -> float:
+        """Finds a height at a specific X and Y position in the terrain height grid.
+
+        Evaluates the whole graph for a single point; use height_grid
+        or height_points for anything more than a few points.
+        """
+        return float(self.height_points(np.array([x_pos]), np.array([y_pos]))[0])
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int) -> HeightGrid:
+        """Finds the heights of a whole square grid at once, in a single graph pass."""
+        return Block(grid=(x_offset, y_offset, width)).evaluate(self, {})
+
+    def height_points(self, xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        """Finds the heights at arbitrary points at once, in a single graph pass."""
+        xs, ys = np.broadcast_arrays(
+            np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        )
+
+        return Block(points=(xs, ys)).evaluate(self, {})
+
+
+class Constant(GraphGenerator):
+    """A flat generator, at a constant height."""
+
+    def __init__(self, height: float):
+        """Initializes this node with its height."""
+        super().__init__()
+
+        self.height: float = height
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Fills the block with this node's height."""
+        xs, _ = block.coordinates()
+
+        return np.full(xs.shape, self.height, dtype=np.float64)
+
+
+class Add(GraphGenerator):
+    """The sum of the heights of its inputs."""
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Sums the heights of the inputs."""
+        heights = block.evaluate(self.inputs[0], memo).copy()
+
+        for source in self.inputs[1:]:
+            heights += block.evaluate(source, memo)
+
+        return heights
+
+
+class Multiply(GraphGenerator):
+    """The product of the heights of its inputs."""
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Multiplies the heights of the inputs."""
+        heights = block.evaluate(self.inputs[0], memo).copy()
+
+        for source in self.inputs[1:]:
+            heights *= block.evaluate(source, memo)
+
+        return heights
+
+
+class Scale(GraphGenerator):
+    """Its input's heights, times a factor, plus an offset."""
+
+    def __init__(self, source: TerrainGenerator, factor: float, offset: float = 0.0):
+        """Initializes this node with its input, factor and offset."""
+        super().__init__(source)
+
+        self.factor: float = factor
+        self.offset: float = offset
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Scales and offsets the input's heights."""
+        return block.evaluate(self.inputs[0], memo) * self.factor + self.offset
+
+
+class Clamp(GraphGenerator):
+    """Its input's heights, clamped between a low and a high bound.
+
+    Either bound may be None, for no bound on that side.
+    """
+
+    def __init__(
+        self,
+        source: TerrainGenerator,
+        low: typing.Optional[float] = None,
+        high: typing.Optional[float] = None,
+    ):
+        """Initializes this node with its input and bounds."""
+        super().__init__(source)
+
+        self.low: typing.Optional[float] = low
+        self.high: typing.Optional[float] = high
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Clamps the input's heights."""
+        return np.clip(block.evaluate(self.inputs[0], memo), self.low, self.high)
+
+
+class DomainWarp(GraphGenerator):
+    """Its input, sampled at points displaced by two other generators.
+
+    The height at (x, y) is the input's height at
+    (x + strength * warp_x(x, y), y + strength * warp_y(x, y)).
+    The input is sampled off the grid, through height_points; the
+    displaced points form a block of their own, memoized apart
+    from the undisplaced one.
+    """
+
+    def __init__(
+        self,
+        source: TerrainGenerator,
+        warp_x: TerrainGenerator,
+        warp_y: TerrainGenerator,
+        strength: float = 1.0,
+    ):
+        """Initializes this node with its input, warp generators and strength."""
+        super().__init__(source, warp_x, warp_y)
+
+        self.strength: float = strength
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Samples the input at the displaced points."""
+        source, warp_x, warp_y = self.inputs
+        xs, ys = block.coordinates()
+
+        warped = Block(
+            points=(
+                xs + self.strength * block.evaluate(warp_x, memo),
+                ys + self.strength * block.evaluate(warp_y, memo),
+            )
+        )
+
+        return warped.evaluate(source, {})
+
+
+class Mask(GraphGenerator):
+    """Blends between two generators, by a third one.
+
+    Where the mask is 1 or more, the height is the input's; where
+    it is 0 or less, the background's (flat zero if there is
+    none); in between, the two are linearly interpolated.
+    """
+
+    def __init__(
+        self,
+        source: TerrainGenerator,
+        mask: TerrainGenerator,
+        background: typing.Optional[TerrainGenerator] = None,
+    ):
+        """Initializes this node with its input, mask and background."""
+        if background is None:
+            super().__init__(source, mask)
+
+        else:
+            super().__init__(source, mask, background)
+
+    def evaluate(self, block: Block, memo: Memo) -> "np.ndarray":
+        """Blends the input and background by the mask."""
+        heights = block.evaluate(self.inputs[0], memo)
+        alpha = np.clip(block.evaluate(self.inputs[1], memo), 0.0, 1.0)
+
+        if len(self.inputs) < 3:
+            return heights * alpha
+
+        background = block.evaluate(self.inputs[2], memo)
+
+        return background + (heights - background) * alpha
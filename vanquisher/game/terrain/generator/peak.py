@@ -1,11 +1,12 @@
 """A lame peak-based terrain generator."""
 
+import math
 import typing
 
 import attr
 
 from ....util import interpolate
-from . import TerrainGenerator
+from . import NUMPY_SUPPORTED, HeightGrid, TerrainGenerator, np
 
 
 @attr.s
@@ -26,6 +27,15 @@ class Peak:
     lip: float = attr.ib(default=5)
     tip: float = attr.ib(default=9)
 
+    def bounds(self) -> typing.Tuple[float, float, float, float]:
+        """The bounding box of this peak's radius, as (min_x, min_y, max_x, max_y).
+
+        Outside of it, the height offset of this peak is always zero.
+        """
+        radius = abs(self.max_radius)
+
+        return (self.x - radius, self.y - radius, self.x + radius, self.y + radius)
+
     def distance_squared(self, other_x: int, other_y: int) -> float:
         """Distance squared from this peak at any point.
 
@@ -79,6 +89,35 @@ class Peak:
 
         return val
 
+    def height_offset_grid(
+        self, base_height: float, xs: "np.ndarray", ys: "np.ndarray"
+    ) -> "np.ndarray":
+        """Vectorized height offset utility function.
+
+        Same as height_offset_at, but for NumPy arrays of X and Y
+        coordinates at once, returning an array of offsets.
+        """
+        distance_sq = (self.x - xs) ** 2 + (self.y - ys) ** 2
+        inside = distance_sq < self.max_radius ** 2
+
+        falloff = 1.0 + distance_sq ** (1 / (1 + self.strength))
+        val = (self.height - base_height) / falloff
+
+        distance = np.sqrt(distance_sq)
+        edge_distance = abs(self.max_radius) - distance
+
+        # tip (smoothing near the peak)
+        tip_crease = (np.clip(self.tip - distance, 0.0, None) * 2 / self.tip) ** (
+            1 + self.strength
+        )
+        val = np.where(distance < self.tip, val - tip_crease, val)
+
+        # lip (smoothing near the border)
+        lip_alpha = (self.lip - edge_distance) / self.lip
+        val = np.where(edge_distance < self.lip, val * (1.0 - lip_alpha), val)
+
+        return np.where(inside, val, 0.0)
+
 
 class PeakTerrainGenerator(TerrainGenerator):
     """A TerrainGenerator implementation that generates using 'peaks'.
@@ -89,17 +128,74 @@ class PeakTerrainGenerator(TerrainGenerator):
 
     See Peak for more info.
 
+    Peaks are bucketed into a grid of square cells, cell_size
+    points wide, by their bounding boxes, so that each point or
+    chunk only evaluates the peaks that can actually reach it.
+    Add peaks with add_peak, so the grid is kept up to date;
+    the peaks attribute is a read-only snapshot.
+
     This implementation is not recommended once a better one
     is available.
     """
 
-    def __init__(self, seed: int, height: float, roughness: float, *peaks: Peak):
+    def __init__(
+        self,
+        seed: int,
+        height: float,
+        roughness: float,
+        *peaks: Peak,
+        cell_size: float = 64.0,
+    ):
         """Initializes the PeakTerrainGenerator's terrain generation parameters."""
         super().__init__(seed)
 
         self.height: float = height
         self.roughness: float = roughness
-        self.peaks: typing.List[Peak] = list(peaks)
+        self._peaks: typing.List[Peak] = []
+
+        self.cell_size: float = cell_size
+        self.peak_cells: typing.Dict[typing.Tuple[int, int], typing.List[int]] = {}
+
+        for peak in peaks:
+            self.add_peak(peak)
+
+    @property
+    def peaks(self) -> typing.Tuple[Peak, ...]:
+        """Every peak of this generator, in the order they were added."""
+        return tuple(self._peaks)
+
+    def _cell_range(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> typing.Iterator[typing.Tuple[int, int]]:
+        """Every grid cell a rectangle overlaps."""
+        size = self.cell_size
+
+        for cell_y in range(math.floor(min_y / size), math.floor(max_y / size) + 1):
+            for cell_x in range(math.floor(min_x / size), math.floor(max_x / size) + 1):
+                yield cell_x, cell_y
+
+    def add_peak(self, peak: Peak):
+        """Adds a peak to this generator, and to every grid cell it overlaps."""
+        index = len(self._peaks)
+        self._peaks.append(peak)
+
+        for cell in self._cell_range(*peak.bounds()):
+            self.peak_cells.setdefault(cell, []).append(index)
+
+    def peaks_in(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> typing.List[Peak]:
+        """The peaks whose grid cells overlap a rectangle, in the order they were added.
+
+        Might include a few peaks that do not quite reach the
+        rectangle, but never misses one that does.
+        """
+        indices: typing.Set[int] = set()
+
+        for cell in self._cell_range(min_x, min_y, max_x, max_y):
+            indices.update(self.peak_cells.get(cell, ()))
+
+        return [self._peaks[index] for index in sorted(indices)]
 
     def height_at(self, x_pos: int, y_pos: int) -> float:
         """Gets the height this generator shall assign to a terrain heightmap point.
@@ -110,9 +206,48 @@ class PeakTerrainGenerator(TerrainGenerator):
         random coarseness.
         """
 
-        height = self.height + self.rng.uniform(-self.roughness, self.roughness)
+        height = self.height + self.roughness * (
+            2.0 * self.noise_at(x_pos, y_pos) - 1.0
+        )
+
+        cell = (math.floor(x_pos / self.cell_size), math.floor(y_pos / self.cell_size))
 
-        for peak in self.peaks:
+        for index in self.peak_cells.get(cell, ()):
+            peak = self._peaks[index]
             height += peak.height_offset_at(self.height, x_pos, y_pos)
 
         return height
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int) -> HeightGrid:
+        """Gets the heights of a whole square grid at once.
+
+        Only the peaks near the grid are looked at, and each
+        one is evaluated in one vectorized pass, over just the
+        part of the grid its bounding box overlaps. The
+        coarseness is the same noise height_at uses.
+        """
+        if not NUMPY_SUPPORTED:
+            return super().height_grid(x_offset, y_offset, width)
+
+        xs, ys = self.grid_coordinates(x_offset, y_offset, width)
+
+        heights = self.height + self.roughness * (2.0 * self.noise_grid(xs, ys) - 1.0)
+
+        last = width - 1
+
+        for peak in self.peaks_in(x_offset, y_offset, x_offset + last, y_offset + last):
+            min_x, min_y, max_x, max_y = peak.bounds()
+
+            left = max(0, math.ceil(min_x) - x_offset)
+            top = max(0, math.ceil(min_y) - y_offset)
+            right = min(last, math.floor(max_x) - x_offset) + 1
+            bottom = min(last, math.floor(max_y) - y_offset) + 1
+
+            if left >= right or top >= bottom:
+                continue
+
+            heights[top:bottom, left:right] += peak.height_offset_grid(
+                self.height, xs[top:bottom, left:right], ys[top:bottom, left:right]
+            )
+
+        return heights
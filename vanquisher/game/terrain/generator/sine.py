@@ -2,7 +2,7 @@
 
 import math
 
-from . import TerrainGenerator
+from . import NUMPY_SUPPORTED, HeightGrid, TerrainGenerator, np
 
 
 class SineTerrainGenerator(TerrainGenerator):
@@ -48,3 +48,39 @@ class SineTerrainGenerator(TerrainGenerator):
             )
             / 2
         )
+
+    def height_grid(self, x_offset: int, y_offset: int, width: int) -> HeightGrid:
+        """Finds the heights of a whole square grid at once.
+
+        Both sine waves are separable, so each is only
+        computed once per column or row, then broadcast.
+        """
+        if not NUMPY_SUPPORTED:
+            return super().height_grid(x_offset, y_offset, width)
+
+        x_wave = np.sin(
+            np.arange(x_offset, x_offset + width, dtype=np.float64)
+            * (self.frequency * self.x_scale)
+        )
+        y_wave = np.sin(
+            np.arange(y_offset, y_offset + width, dtype=np.float64)
+            * (self.frequency * self.y_scale)
+        )
+
+        return self.base_height + self.amplitude * (
+            x_wave[np.newaxis, :] + y_wave[:, np.newaxis]
+        ) / 2
+
+    def height_points(self, xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        """Finds the heights at arbitrary points at once."""
+        if not NUMPY_SUPPORTED:
+            return super().height_points(xs, ys)
+
+        x_wave = np.sin(
+            np.asarray(xs, dtype=np.float64) * (self.frequency * self.x_scale)
+        )
+        y_wave = np.sin(
+            np.asarray(ys, dtype=np.float64) * (self.frequency * self.y_scale)
+        )
+
+        return self.base_height + self.amplitude * (x_wave + y_wave) / 2
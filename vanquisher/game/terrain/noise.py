@@ -0,0 +1,90 @@
+"""Stateless, counter-based noise for terrain generation.
+
+Instead of drawing from a random number generator, whose state
+advances with every draw (and thus depends on the order things
+are generated in), noise is computed by hashing a seed together
+with integer coordinates. The same (seed, x, y) always yields the
+same value, so any chunk can be generated on its own, by any
+worker, in any order.
+
+Both a scalar and a NumPy version are provided; they give the
+exact same results.
+"""
+
+import typing
+
+from ...numpy import numpy as np
+from ...numpy import require_numpy
+
+MASK = 0xFFFFFFFF
+
+# lowbias32 multipliers, by Chris Wellons
+_MIX_1 = 0x7FEB352D
+_MIX_2 = 0x846CA68B
+
+
+def _mix(value: int) -> int:
+    """Scrambles the bits of a 32-bit unsigned integer."""
+    value ^= value >> 16
+    value = (value * _MIX_1) & MASK
+    value ^= value >> 15
+    value = (value * _MIX_2) & MASK
+    value ^= value >> 16
+
+    return value
+
+
+def _mix_array(values: "np.ndarray") -> "np.ndarray":
+    """Scrambles the bits of an array of 32-bit unsigned integers, like _mix."""
+    values = values ^ (values >> np.uint32(16))
+    values = values * np.uint32(_MIX_1)
+    values = values ^ (values >> np.uint32(15))
+    values = values * np.uint32(_MIX_2)
+    values = values ^ (values >> np.uint32(16))
+
+    return values
+
+
+def derive_seed(seed: int, salt: int = 0) -> int:
+    """Derives a 32-bit noise seed from any integer seed and a salt.
+
+    Different salts give unrelated noise, which is useful when a
+    generator needs more than one independent noise channel.
+    """
+    return _mix((int(seed) & MASK) ^ _mix(salt & MASK))
+
+
+def hash_coords(seed: int, x_pos: int, y_pos: int) -> int:
+    """Hashes integer coordinates with a seed into a 32-bit unsigned integer."""
+    value = _mix((seed & MASK) ^ (int(x_pos) & MASK))
+
+    return _mix(value ^ (int(y_pos) & MASK))
+
+
+def noise_at(seed: int, x_pos: int, y_pos: int) -> float:
+    """Uniform noise in [0, 1) at integer coordinates."""
+    return hash_coords(seed, x_pos, y_pos) / 4294967296.0
+
+
+def noise_array(
+    seed: int,
+    xs: typing.Union[typing.Sequence[float], "np.ndarray"],
+    ys: typing.Union[typing.Sequence[float], "np.ndarray"],
+) -> "np.ndarray":
+    """Uniform noise in [0, 1), for arrays of integer coordinates.
+
+    Coordinates are truncated to integers, the same way noise_at
+    truncates them. Returns a float64 array of the broadcast
+    shape of xs and ys.
+
+    Requires NumPy.
+    """
+    numpy = require_numpy("noise_array")
+
+    x_hash = numpy.asarray(xs).astype(numpy.int64).astype(numpy.uint32)
+    y_hash = numpy.asarray(ys).astype(numpy.int64).astype(numpy.uint32)
+
+    values = _mix_array(numpy.uint32(seed & MASK) ^ x_hash)
+    values = _mix_array(values ^ y_hash)
+
+    return values / 4294967296.0
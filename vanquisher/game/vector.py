@@ -93,6 +93,8 @@ class Vec2Pool:
         self.pool_free = self.pool_free[: self.size - self.chunk_size]
 
         self.size -= self.chunk_size
+        self.free -= self.chunk_size
+        self.next_free = min(self.next_free, self.size)
 
     def contract(self) -> bool:
         """
@@ -152,7 +154,7 @@ class Vec2Pool:
             if self.pool_free[index]:
                 res = self._get(index)
 
-                while not self.pool_free[self.next_free]:
+                while self.next_free < self.size and not self.pool_free[self.next_free]:
                     self.next_free += 1
 
                 return res
@@ -182,7 +184,14 @@ class Vec2Pool:
         self.pool_free[index] = True
         self.free += 1
 
-        if self.size > self.chunk_size and self.size - index <= self.chunk_size:
+        # only contract with a whole chunk to spare, so that a pool
+        # hovering around a chunk boundary doesn't expand and
+        # contract on every other vector
+        if (
+            self.size > self.chunk_size
+            and self.size - index <= self.chunk_size
+            and self.free >= 2 * self.chunk_size
+        ):
             if self.contract():
                 return
 
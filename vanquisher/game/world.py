@@ -4,15 +4,48 @@ its basic structure, and how it contains and integrates
 the objects that live and the terrain that lay in it.
 """
 
+import asyncio
+import collections
+import concurrent.futures
 import math
 import typing
 import uuid
+import warnings
 
-from . import terrain, vector
+from ..numpy import SUPPORTED as NUMPY_SUPPORTED
+from ..numpy import numpy as np
+from . import object_store, spatial, terrain, vector
 
 if typing.TYPE_CHECKING:
     from . import Game, objects
-    from .terrain.generator import TerrainGenerator
+    from .region import RegionStorage
+    from .terrain.generator import HeightGrid, TerrainGenerator
+
+
+ChunkRegion = typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]
+
+# A coarse chunk's chunk position and level of detail.
+CoarseKey = typing.Tuple[typing.Tuple[int, int], int]
+
+# Called with a chunk once it is ready; see World.on_chunk_ready.
+ChunkCallback = typing.Callable[["Chunk"], typing.Any]
+
+# What non-blocking worlds stand missing chunks in with.
+PLACEHOLDER_KINDS = ("flat", "lod")
+
+# How many coarse versions of not yet generated chunks a World keeps.
+MAX_COARSE_CHUNKS = 4096
+
+
+def _generate_heightmap(
+    generator: "TerrainGenerator", offset: typing.Tuple[int, int], stride: int
+) -> "HeightGrid":
+    """Generates the heightmap grid of a chunk, halo included.
+
+    Runs in chunk generation worker processes, so it must stay
+    a picklable, module-level function.
+    """
+    return generator.height_grid(offset[0], offset[1], stride)
 
 
 class Chunk:
@@ -21,11 +54,19 @@ class Chunk:
     is loaded in memory.
     """
 
-    def __init__(self, world: "World", chunk_pos: typing.Tuple[int, int]):
+    def __init__(
+        self,
+        world: "World",
+        chunk_pos: typing.Tuple[int, int],
+        buffer: typing.Optional[typing.Any] = None,
+    ):
         """
         Initializes this chunk, with an initial, ungenerated TerrainChunk.
         This does not generate the terrain; World does that automatically
         if it has a generator set when this chunk is generated.
+
+        If a buffer is passed, the TerrainChunk uses it as its
+        heightmap; see TerrainChunk.
         """
         self.world = world
         self.chunk_pos = chunk_pos
@@ -34,7 +75,15 @@ class Chunk:
             self.chunk_pos[0] * self.width,
             self.chunk_pos[1] * self.width,
         )
-        self.terrain = terrain.TerrainChunk(self.width)
+        self.terrain = self.world.terrain_class(self.width, buffer)
+
+        # Whether the terrain was changed since it was generated
+        # or loaded, through the World terrain editing methods.
+        self.edited = False
+
+        # Whether this chunk only stands in for one still being
+        # generated in the background; see World.get_chunk.
+        self.placeholder = False
 
         self.objects_in_chunk: typing.Set[uuid.UUID] = set()
 
@@ -55,6 +104,58 @@ class Chunk:
 
         return self.terrain[terra_pos]
 
+    def _to_terrain_space(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> typing.Tuple["terrain.Coordinates", "terrain.Coordinates"]:
+        """Converts many world-space coordinates to coordinates within this chunk."""
+        off_x, off_y = self.world_pos
+
+        if NUMPY_SUPPORTED:
+            return (
+                np.asarray(xs, dtype=np.float64) - off_x,
+                np.asarray(ys, dtype=np.float64) - off_y,
+            )
+
+        return (
+            [coord_x - off_x for coord_x in xs],
+            [coord_y - off_y for coord_y in ys],
+        )
+
+    def sample_many(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Coordinates":
+        """Gets terrain at many world-space points at once.
+
+        The batch counterpart of indexing a Chunk; see
+        TerrainChunk.sample_many for the details.
+        """
+        return self.terrain.sample_many(*self._to_terrain_space(xs, ys))
+
+    def gradient_many(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Gradients":
+        """Gets terrain heights and gradients at many world-space points at once.
+
+        See TerrainChunk.gradient_many for the details.
+        """
+        return self.terrain.gradient_many(*self._to_terrain_space(xs, ys))
+
+    def normal_many(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Normals":
+        """Gets terrain normals at many world-space points at once.
+
+        See TerrainChunk.normal_many for the details.
+        """
+        return self.terrain.normal_many(*self._to_terrain_space(xs, ys))
+
+    def contains(self, pos_x: float, pos_y: float) -> bool:
+        """Whether a world-space point lies within this chunk."""
+        return (
+            self.world_pos[0] <= pos_x < self.world_pos[0] + self.width
+            and self.world_pos[1] <= pos_y < self.world_pos[1] + self.width
+        )
+
     def game(self):
         """
         Fetches the game whose world this chunk belongs to.
@@ -94,12 +195,55 @@ class World:
         chunk_width: int = 32,
         base_height: float = 32.0,
         gravity: float = -4.0,
+        chunk_workers: typing.Optional[int] = None,
+        storage: typing.Optional["RegionStorage"] = None,
+        memory_budget: typing.Optional[int] = None,
+        quantized: bool = False,
+        lod_distances: typing.Sequence[float] = (64.0, 128.0, 256.0),
+        nonblocking: bool = False,
+        placeholder: str = "flat",
+        object_cell_size: float = 16.0,
+        batch_physics: bool = False,
     ):
         """World initialization.
 
         Creates an empty world, with a few parameters and
         an empty list of chunks, and optionally sets its
         generator too.
+
+        chunk_workers is the number of worker processes used to
+        generate chunks in the background (see prefetch_chunks);
+        it defaults to the number of processors.
+
+        If a storage is passed, chunks are kept in it, and only
+        generated if they are not stored yet; it must have the
+        same chunk width as the world.
+
+        If a memory budget (in bytes) is passed, the least recently
+        used chunks are unloaded whenever the loaded chunks' terrain
+        outgrows it; see evict_chunks.
+
+        If quantized is set, chunk heights are stored as 16-bit
+        integers, in half the memory; see QuantizedTerrainChunk.
+        A storage must have been created with the same setting.
+
+        lod_distances are the distances past which terrain queries
+        made through lod_height_at and friends use each coarser
+        level of detail; see lod_level.
+
+        If nonblocking is set, get_chunk never generates chunks
+        inline; missing chunks are generated in the background,
+        and a placeholder stands in for them meanwhile, either
+        flat at base_height ("flat") or the coarsest level of
+        detail of the chunk ("lod").
+
+        object_cell_size is the size of the cells of the object
+        index, which proximity queries go through; see
+        objects_in_radius. It need not match the chunk width.
+
+        If batch_physics is set, the physics state of objects is
+        kept in an ObjectStore, and their physics ticked in batches;
+        that requires NumPy.
         """
         self.game = my_game
         self.chunk_width = chunk_width
@@ -107,19 +251,380 @@ class World:
         self.gravity = gravity
 
         self.terrain_generator = terrain_generator
-        self.chunks: typing.Dict[typing.Tuple[int, int], Chunk] = {}
+        # Kept in least to most recently used order.
+        self.chunks: "collections.OrderedDict[typing.Tuple[int, int], Chunk]" = (
+            collections.OrderedDict()
+        )
+
+        self.memory_budget = memory_budget
+        self.memory_usage = 0
+
+        if storage is not None and storage.chunk_width != chunk_width:
+            raise ValueError("The storage's chunk width does not match the world's")
+
+        if storage is not None and storage.quantized != quantized:
+            raise ValueError("The storage's height format does not match the world's")
+
+        self.terrain_class: typing.Type[terrain.TerrainChunk] = (
+            terrain.QuantizedTerrainChunk if quantized else terrain.TerrainChunk
+        )
+
+        self.storage = storage
+
+        # The chunk that served the last height query; nearby queries
+        # are likely to fall in it too, and skip the chunk lookup.
+        self._last_chunk: typing.Optional[Chunk] = None
+
+        # Floor heights by exact world position, while objects are
+        # being ticked; see resolve_floor_heights.
+        self._floor_cache: typing.Optional[
+            typing.Dict[typing.Tuple[float, float], float]
+        ] = None
+
+        if placeholder not in PLACEHOLDER_KINDS:
+            raise ValueError("Unknown placeholder kind: {}".format(placeholder))
+
+        self.nonblocking = nonblocking
+        self.placeholder = placeholder
+
+        # Called once the chunk at their position is ready.
+        self._chunk_callbacks: typing.Dict[
+            typing.Tuple[int, int], typing.List[ChunkCallback]
+        ] = {}
+
+        self.lod_distances: typing.List[float] = sorted(lod_distances)
+
+        # The coarsest level of detail chunks of this width have.
+        self.max_lod_level = 0
+
+        while (
+            self.max_lod_level < terrain.LOD_LEVELS
+            and chunk_width % (2 << self.max_lod_level) == 0
+        ):
+            self.max_lod_level += 1
+
+        # Coarse versions of chunks that were not generated, by
+        # chunk position and level, least recently used first.
+        self.coarse_chunks: "collections.OrderedDict[CoarseKey, terrain.TerrainChunk]"
+        self.coarse_chunks = collections.OrderedDict()
+
+        self.object_index: "spatial.SpatialHash[uuid.UUID]" = spatial.SpatialHash(
+            object_cell_size
+        )
+        self.object_store: typing.Optional[object_store.ObjectStore] = (
+            object_store.ObjectStore() if batch_physics else None
+        )
+
+        self.chunk_workers = chunk_workers
+        self._chunk_executor: typing.Optional[concurrent.futures.Executor] = None
+        self._pending_chunks: typing.Dict[
+            typing.Tuple[int, int], "concurrent.futures.Future[HeightGrid]"
+        ] = {}
 
     def set_terrain_generator(self, generator: "TerrainGenerator"):
         """Sets the terrain generator this world should use to generate new chunks."""
         self.terrain_generator = generator
 
-    def get_chunk(self, chunk_pos: typing.Tuple[int, int]) -> Chunk:
-        """Gets a chunk at a chunk-space position."""
-        if chunk_pos in self.chunks:
-            return self.chunks[chunk_pos]
+    def get_chunk(
+        self, chunk_pos: typing.Tuple[int, int], wait: typing.Optional[bool] = None
+    ) -> Chunk:
+        """Gets a chunk at a chunk-space position.
+
+        If the chunk is already being generated in the background,
+        waits for it rather than generating it again, unless that
+        fails; see _collect_chunk.
+
+        If wait is False (the default for non-blocking worlds), a
+        missing chunk that must be generated is requested from the
+        background workers instead, and a placeholder chunk is
+        returned at once; the real chunk replaces it once it is
+        collected (see collect_chunks and on_chunk_ready). Stored
+        chunks are always loaded at once, as that is cheap.
+        """
+        if wait is None:
+            wait = not self.nonblocking
+
+        chunk = self.chunks.get(chunk_pos)
+
+        if chunk is not None and not (chunk.placeholder and wait):
+            self.chunks.move_to_end(chunk_pos)
+            return chunk
+
+        if chunk_pos in self._pending_chunks:
+            if not wait:
+                return self._add_placeholder(chunk_pos)
+
+            chunk = self._collect_chunk(chunk_pos, self._pending_chunks[chunk_pos])
+
+            # if its generation failed, it is generated here instead
+            if chunk is not None:
+                return chunk
+
+        if not wait and self.terrain_generator is not None:
+            if not self.is_stored(chunk_pos):
+                self._request_chunk(chunk_pos)
+                return self._add_placeholder(chunk_pos)
 
         return self.make_chunk(*chunk_pos)
 
+    def on_chunk_ready(
+        self, chunk_pos: typing.Tuple[int, int], callback: ChunkCallback
+    ):
+        """Registers a function to call with a chunk once it is ready.
+
+        That is, once it is loaded, and not a placeholder; the
+        function is called at once if it already is. Otherwise, it
+        is called from whatever installs the chunk, which, for
+        chunks generated in the background, is collect_chunks, on
+        the same thread as the rest of the game.
+        """
+        chunk = self.chunks.get(chunk_pos)
+
+        if chunk is not None and not chunk.placeholder:
+            callback(chunk)
+            return
+
+        self._chunk_callbacks.setdefault(chunk_pos, []).append(callback)
+
+    def _add_placeholder(self, chunk_pos: typing.Tuple[int, int]) -> Chunk:
+        """Makes a placeholder for a chunk being generated, and adds it to this world.
+
+        Placeholders never live in the storage, and their halos are
+        left alone by sync_halos, as they are not the real terrain.
+        """
+        placeholder = Chunk(self, chunk_pos)
+        placeholder.placeholder = True
+
+        if self.placeholder == "lod" and self.terrain_generator is not None:
+            level = self.max_lod_level
+            factor = 1 << level
+            coarse = self.lod_terrain(chunk_pos, level)
+
+            # the whole grid is upsampled with a single batch query
+            stride = self.chunk_width + 1
+            coords = [index / factor for index in range(stride)]
+            heights = coarse.sample_many(
+                coords * stride, [y_pos for y_pos in coords for _ in range(stride)]
+            )
+
+            placeholder.terrain.load_grid(
+                [
+                    list(heights[row * stride : (row + 1) * stride])
+                    for row in range(stride)
+                ]
+            )
+
+        else:
+            placeholder.terrain.load_grid(
+                [[self.base_height] * (self.chunk_width + 1)] * (self.chunk_width + 1)
+            )
+
+        self.chunks[chunk_pos] = placeholder
+        self.memory_usage += placeholder.terrain.memory_usage()
+        self.evict_chunks()
+
+        return placeholder
+
+    async def get_chunk_async(self, chunk_pos: typing.Tuple[int, int]) -> Chunk:
+        """Gets a chunk at a chunk-space position, without blocking.
+
+        If the chunk is missing, it is generated in a worker
+        process, while the event loop is free to do other things.
+        """
+        chunk = self.chunks.get(chunk_pos)
+
+        if chunk is not None and not chunk.placeholder:
+            return chunk
+
+        if self.terrain_generator is None or self.is_stored(chunk_pos):
+            return self.make_chunk(*chunk_pos)
+
+        grid = await asyncio.wrap_future(self._request_chunk(chunk_pos))
+
+        return self._install_chunk(chunk_pos, grid)
+
+    def prefetch_chunks(self, region: ChunkRegion) -> int:
+        """Schedules the background generation of every missing chunk in a region.
+
+        The region is a pair of opposite chunk-space corners,
+        both inclusive. Generation happens in a pool of worker
+        processes; finished chunks are installed by collect_chunks,
+        which update_objects calls every tick, or as soon as
+        something needs them.
+
+        Returns how many chunks were scheduled.
+
+        Generators are pickled along with every request, so generators
+        that draw from their shared random number generator will see
+        the same draws in every worker.
+        """
+        if self.terrain_generator is None:
+            return 0
+
+        (x_1, y_1), (x_2, y_2) = region
+        scheduled = 0
+
+        for chunk_y in range(min(y_1, y_2), max(y_1, y_2) + 1):
+            for chunk_x in range(min(x_1, x_2), max(x_1, x_2) + 1):
+                chunk_pos = (chunk_x, chunk_y)
+
+                chunk = self.chunks.get(chunk_pos)
+
+                # placeholders left by failed generations are retried
+                if (
+                    (chunk is not None and not chunk.placeholder)
+                    or chunk_pos in self._pending_chunks
+                    or self.is_stored(chunk_pos)
+                ):
+                    continue
+
+                self._request_chunk(chunk_pos)
+                scheduled += 1
+
+        return scheduled
+
+    def collect_chunks(self) -> typing.List[Chunk]:
+        """Installs the chunks that finished generating in the background.
+
+        Returns the newly installed chunks; see _collect_chunk for
+        what happens to those whose generation failed.
+        """
+        installed = []
+
+        for chunk_pos, future in list(self._pending_chunks.items()):
+            if not future.done():
+                continue
+
+            chunk = self._collect_chunk(chunk_pos, future)
+
+            if chunk is not None:
+                installed.append(chunk)
+
+        return installed
+
+    def _collect_chunk(
+        self,
+        chunk_pos: typing.Tuple[int, int],
+        future: "concurrent.futures.Future[HeightGrid]",
+    ) -> typing.Optional[Chunk]:
+        """Installs a chunk generated in the background, waiting for it if needed.
+
+        The request is forgotten before its result is looked at,
+        so a failed generation is only reported once, as a warning,
+        and None is returned. The chunk's placeholder, if any, then
+        stays, until the chunk is asked for with wait=True, which
+        generates it in this process, or prefetched again.
+        """
+        self._pending_chunks.pop(chunk_pos, None)
+
+        try:
+            grid = future.result()
+
+        except (Exception, concurrent.futures.CancelledError) as err:
+            warnings.warn(
+                "Could not generate chunk {} in the background: {!r}".format(
+                    chunk_pos, err
+                ),
+                RuntimeWarning,
+            )
+            return None
+
+        return self._install_chunk(chunk_pos, grid)
+
+    def shutdown_chunk_workers(self, wait: bool = True):
+        """Stops the chunk generation worker processes, if any were started.
+
+        Chunks still being generated are dropped, unless wait
+        is True, in which case they are installed first.
+        """
+        if self._chunk_executor is None:
+            return
+
+        if wait:
+            for chunk_pos, future in list(self._pending_chunks.items()):
+                self._collect_chunk(chunk_pos, future)
+
+        else:
+            # nothing will replace their placeholders anymore
+            for chunk_pos in self._pending_chunks:
+                chunk = self.chunks.get(chunk_pos)
+
+                if chunk is not None and chunk.placeholder:
+                    self.unload_chunk(chunk_pos)
+
+        self._chunk_executor.shutdown(wait=wait)
+        self._chunk_executor = None
+        self._pending_chunks.clear()
+
+    def _request_chunk(
+        self, chunk_pos: typing.Tuple[int, int]
+    ) -> "concurrent.futures.Future[HeightGrid]":
+        """Submits a chunk to the generation workers, unless it already was."""
+        if chunk_pos in self._pending_chunks:
+            return self._pending_chunks[chunk_pos]
+
+        if self.terrain_generator is None:
+            raise ValueError("Chunks can only be generated with a terrain generator")
+
+        if self._chunk_executor is None:
+            self._chunk_executor = concurrent.futures.ProcessPoolExecutor(
+                self.chunk_workers
+            )
+
+        future = self._chunk_executor.submit(
+            _generate_heightmap,
+            self.terrain_generator,
+            (chunk_pos[0] * self.chunk_width, chunk_pos[1] * self.chunk_width),
+            self.chunk_width + 1,
+        )
+
+        self._pending_chunks[chunk_pos] = future
+
+        return future
+
+    def _install_chunk(
+        self, chunk_pos: typing.Tuple[int, int], grid: "HeightGrid"
+    ) -> Chunk:
+        """Installs a chunk from a heightmap grid generated elsewhere.
+
+        Replaces its placeholder, if it has one; see _add_chunk.
+        """
+        self._pending_chunks.pop(chunk_pos, None)
+
+        existing = self.chunks.get(chunk_pos)
+
+        if existing is not None and not existing.placeholder:
+            return existing
+
+        new_chunk = self._new_chunk(chunk_pos)
+        new_chunk.terrain.load_grid(grid)
+
+        return self._add_chunk(new_chunk)
+
+    def _adopt_objects(self, placeholder: Chunk, new_chunk: Chunk):
+        """Moves the objects registered to a placeholder to its real chunk."""
+        new_chunk.objects_in_chunk = placeholder.objects_in_chunk
+        placeholder.objects_in_chunk = set()
+
+        if self.game is None:
+            return
+
+        for obj in new_chunk.objects_inside():
+            obj.chunk = new_chunk
+
+    def is_stored(self, chunk_pos: typing.Tuple[int, int]) -> bool:
+        """Whether a chunk can be loaded from this world's storage."""
+        return self.storage is not None and self.storage.has_chunk(chunk_pos)
+
+    def save(self):
+        """Makes sure every change to the stored chunks is written to the disk.
+
+        Chunks live in their storage slot, so there is nothing
+        else to write. Does nothing if this world has no storage.
+        """
+        if self.storage is not None:
+            self.storage.flush()
+
     def chunk_at_pos(
         self, pos: typing.Union[vector.Vec2, typing.Tuple[float, float]]
     ) -> Chunk:
@@ -134,8 +639,456 @@ class World:
             (math.floor(pos_x / self.chunk_width), math.floor(pos_y / self.chunk_width))
         )
 
+    def _point_chunk(self, pos_x: float, pos_y: float) -> Chunk:
+        """The chunk a world-space point lies in.
+
+        Reuses the chunk resolved by the last call if the point
+        still lies within it.
+        """
+        chunk = self._last_chunk
+
+        if chunk is None or not chunk.contains(pos_x, pos_y):
+            chunk = self.chunk_at_pos((pos_x, pos_y))
+            self._last_chunk = chunk
+
+        return chunk
+
+    def height_at(self, pos_x: float, pos_y: float) -> float:
+        """Gets the terrain height at a world-space point.
+
+        Seamless across chunk borders, thanks to chunk halos.
+
+        While objects are being ticked, heights are served from,
+        and kept in, the floor height cache; see
+        resolve_floor_heights.
+        """
+        cache = self._floor_cache
+
+        if cache is None:
+            return self._point_chunk(pos_x, pos_y)[pos_x, pos_y]
+
+        height = cache.get((pos_x, pos_y))
+
+        if height is None:
+            height = cache[pos_x, pos_y] = self._point_chunk(pos_x, pos_y)[pos_x, pos_y]
+
+        return height
+
+    def resolve_floor_heights(self, time_delta: float):
+        """Resolves the floor heights objects will query this tick, in one batch.
+
+        Every object looks the floor up where it stands, and where
+        its speed takes it, several times per tick. Those points
+        are gathered for every object, and sampled with heights_at,
+        so one batched interpolation runs per chunk rather than
+        one per query; height_at then serves them from a cache
+        until the tick ends (see update_objects).
+
+        The cache is keyed by exact position, so an object that
+        moves no longer hits its old entry; heights at its new
+        position are sampled once, then cached too. Changing the
+        terrain through stamp_brush clears the cache.
+        """
+        xs: typing.List[float] = []
+        ys: typing.List[float] = []
+
+        for obj in self.game.objects.values():
+            pos_x, pos_y = obj.pos.as_tuple()
+
+            xs.append(pos_x)
+            ys.append(pos_y)
+
+            # where GameObject.push looks ahead to
+            xs.append(pos_x + obj.horz_speed.x * time_delta)
+            ys.append(pos_y + obj.horz_speed.y * time_delta)
+
+        heights = self.heights_at(xs, ys)
+
+        if NUMPY_SUPPORTED:
+            heights = np.asarray(heights).tolist()
+
+        self._floor_cache = dict(zip(zip(xs, ys), heights))
+
+    def gradient_at(
+        self, pos_x: float, pos_y: float
+    ) -> typing.Tuple[float, float, float]:
+        """Gets the terrain height at a world-space point, and its gradient.
+
+        Returns the height and its partial derivatives along X
+        and Y; see TerrainChunk.gradient_at.
+        """
+        chunk = self._point_chunk(pos_x, pos_y)
+
+        return chunk.terrain.gradient_at(
+            pos_x - chunk.world_pos[0], pos_y - chunk.world_pos[1]
+        )
+
+    def normal_at(
+        self, pos_x: float, pos_y: float
+    ) -> typing.Tuple[float, float, float]:
+        """Gets the unit terrain surface normal at a world-space point.
+
+        See TerrainChunk.normal_at.
+        """
+        chunk = self._point_chunk(pos_x, pos_y)
+
+        return chunk.terrain.normal_at(
+            pos_x - chunk.world_pos[0], pos_y - chunk.world_pos[1]
+        )
+
+    def lod_level(self, distance: float) -> int:
+        """The level of detail terrain should be queried at, from some distance.
+
+        That is the number of lod_distances the distance is past,
+        up to the coarsest level this world's chunks have.
+        """
+        level = 0
+
+        for threshold in self.lod_distances:
+            if distance < threshold:
+                break
+
+            level += 1
+
+        return min(level, self.max_lod_level)
+
+    def lod_terrain(
+        self, chunk_pos: typing.Tuple[int, int], level: int
+    ) -> terrain.TerrainChunk:
+        """The terrain of a chunk, at a level of detail; see TerrainChunk.lod.
+
+        Chunks that are loaded, or stored, serve the coarse version
+        of their heightmap. Other chunks are not generated: only
+        their coarse version is, straight from the terrain
+        generator, for a fraction of the cost, and kept until the
+        chunk itself is.
+        """
+        level = min(level, self.max_lod_level)
+        chunk = self.chunks.get(chunk_pos)
+
+        if chunk is not None and not chunk.placeholder:
+            return chunk.terrain.lod(level)
+
+        if level == 0 or self.terrain_generator is None or self.is_stored(chunk_pos):
+            return self.get_chunk(chunk_pos).terrain.lod(level)
+
+        key = (chunk_pos, level)
+        coarse = self.coarse_chunks.get(key)
+
+        if coarse is not None:
+            self.coarse_chunks.move_to_end(key)
+            return coarse
+
+        factor = 1 << level
+        coarse = terrain.TerrainChunk(self.chunk_width // factor)
+        coarse.load_grid(
+            self.terrain_generator.coarse_height_grid(
+                chunk_pos[0] * self.chunk_width,
+                chunk_pos[1] * self.chunk_width,
+                coarse.stride,
+                factor,
+            )
+        )
+
+        self.coarse_chunks[key] = coarse
+
+        if len(self.coarse_chunks) > MAX_COARSE_CHUNKS:
+            self.coarse_chunks.popitem(last=False)
+
+        return coarse
+
+    def _lod_point(
+        self, pos_x: float, pos_y: float, level: int
+    ) -> typing.Tuple[terrain.TerrainChunk, float, float, int]:
+        """The level of detail terrain a world-space point lies in.
+
+        Returns it along with the point in its coordinates, and its
+        scale factor.
+        """
+        level = min(level, self.max_lod_level)
+        factor = 1 << level
+
+        chunk_x = math.floor(pos_x / self.chunk_width)
+        chunk_y = math.floor(pos_y / self.chunk_width)
+
+        coarse = self.lod_terrain((chunk_x, chunk_y), level)
+
+        return (
+            coarse,
+            (pos_x - chunk_x * self.chunk_width) / factor,
+            (pos_y - chunk_y * self.chunk_width) / factor,
+            factor,
+        )
+
+    def lod_height_at(self, pos_x: float, pos_y: float, level: int) -> float:
+        """Gets the terrain height at a world-space point, at a level of detail.
+
+        Level 0 is the same as height_at. Coarser levels never
+        need far chunks to be generated; see lod_terrain.
+        """
+        if level == 0:
+            return self.height_at(pos_x, pos_y)
+
+        coarse, local_x, local_y, _ = self._lod_point(pos_x, pos_y, level)
+
+        return coarse[local_x, local_y]
+
+    def lod_normal_at(
+        self, pos_x: float, pos_y: float, level: int
+    ) -> typing.Tuple[float, float, float]:
+        """Gets the unit terrain normal at a world-space point, at a level of detail.
+
+        Level 0 is the same as normal_at.
+        """
+        if level == 0:
+            return self.normal_at(pos_x, pos_y)
+
+        coarse, local_x, local_y, factor = self._lod_point(pos_x, pos_y, level)
+        norm_x, norm_y, norm_z = coarse.normal_at(local_x, local_y)
+
+        # the coarse slopes are per coarse point, factor points apart
+        slope_x = -norm_x / norm_z / factor
+        slope_y = -norm_y / norm_z / factor
+        length = math.sqrt(slope_x * slope_x + slope_y * slope_y + 1.0)
+
+        return (-slope_x / length, -slope_y / length, 1.0 / length)
+
+    def height_at_distance(self, pos_x: float, pos_y: float, distance: float) -> float:
+        """Gets the terrain height at a world-space point, seen from some distance.
+
+        Far points are sampled at a coarser level of detail; see
+        lod_level.
+        """
+        return self.lod_height_at(pos_x, pos_y, self.lod_level(distance))
+
+    def _chunk_groups(
+        self, x_arr: "np.ndarray", y_arr: "np.ndarray"
+    ) -> typing.Iterator[typing.Tuple[Chunk, "np.ndarray"]]:
+        """Groups world-space points by the chunk they lie in.
+
+        Yields each chunk along with a boolean mask of the
+        points that lie in it.
+        """
+        chunk_coords = np.stack(
+            (
+                np.floor(x_arr / self.chunk_width).astype(np.int64),
+                np.floor(y_arr / self.chunk_width).astype(np.int64),
+            ),
+            axis=-1,
+        ).reshape(-1, 2)
+
+        chunk_positions, groups = np.unique(chunk_coords, axis=0, return_inverse=True)
+        groups = groups.reshape(x_arr.shape)
+
+        for group, (chunk_x, chunk_y) in enumerate(chunk_positions.tolist()):
+            yield self.get_chunk((chunk_x, chunk_y)), groups == group
+
+    def heights_at(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Coordinates":
+        """Gets the terrain heights at many world-space points at once.
+
+        The points are grouped by the chunk they lie in, and
+        each group is sampled with a single Chunk.sample_many
+        call. Returns a NumPy array if NumPy is available, or
+        a list otherwise.
+        """
+        if not NUMPY_SUPPORTED:
+            return [self.height_at(pos_x, pos_y) for pos_x, pos_y in zip(xs, ys)]
+
+        x_arr = np.asarray(xs, dtype=np.float64)
+        y_arr = np.asarray(ys, dtype=np.float64)
+        heights = np.empty(x_arr.shape, dtype=np.float64)
+
+        for chunk, in_group in self._chunk_groups(x_arr, y_arr):
+            heights[in_group] = chunk.sample_many(x_arr[in_group], y_arr[in_group])
+
+        return heights
+
+    def gradients_at(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Gradients":
+        """Gets terrain heights and gradients at many world-space points at once.
+
+        The batch counterpart of gradient_at, grouped by chunk
+        like heights_at. Returns the heights, and the partial
+        derivatives along X and Y, as three NumPy arrays if NumPy
+        is available, or three lists otherwise.
+        """
+        if not NUMPY_SUPPORTED:
+            return terrain.unzip_triples(
+                [self.gradient_at(pos_x, pos_y) for pos_x, pos_y in zip(xs, ys)]
+            )
+
+        return self._gather_triples(Chunk.gradient_many, xs, ys)
+
+    def normals_at(
+        self, xs: "terrain.Coordinates", ys: "terrain.Coordinates"
+    ) -> "terrain.Normals":
+        """Gets unit terrain surface normals at many world-space points at once.
+
+        The batch counterpart of normal_at, grouped by chunk like
+        heights_at. Returns the X, Y and Z components of the
+        normals, as three NumPy arrays if NumPy is available, or
+        three lists otherwise.
+        """
+        if not NUMPY_SUPPORTED:
+            return terrain.unzip_triples(
+                [self.normal_at(pos_x, pos_y) for pos_x, pos_y in zip(xs, ys)]
+            )
+
+        return self._gather_triples(Chunk.normal_many, xs, ys)
+
+    def _gather_triples(
+        self,
+        query: typing.Callable[
+            [Chunk, "terrain.Coordinates", "terrain.Coordinates"],
+            "terrain.Gradients",
+        ],
+        xs: "terrain.Coordinates",
+        ys: "terrain.Coordinates",
+    ) -> typing.Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Runs a batch Chunk query returning three arrays, one chunk at a time.
+
+        The points are grouped by chunk like in heights_at, and
+        the results put back together in the order of the points.
+        Requires NumPy.
+        """
+        x_arr = np.asarray(xs, dtype=np.float64)
+        y_arr = np.asarray(ys, dtype=np.float64)
+        out = np.empty((3,) + x_arr.shape, dtype=np.float64)
+
+        for chunk, in_group in self._chunk_groups(x_arr, y_arr):
+            results = query(chunk, x_arr[in_group], y_arr[in_group])
+
+            for values, group_values in zip(out, results):
+                values[in_group] = group_values
+
+        return out[0], out[1], out[2]
+
+    def stamp_brush(
+        self, pos_x: int, pos_y: int, brush: "HeightGrid", mode: str = "add"
+    ) -> typing.Dict[typing.Tuple[int, int], "terrain.Rect"]:
+        """Applies a brush, a [y][x] grid of heights, onto the world's terrain.
+
+        The brush's first point lands on the world heightmap point
+        (pos_x, pos_y); see TerrainChunk.apply_brush for the modes.
+
+        Every chunk the brush overlaps is written to, including the
+        ones it only overlaps the halo of, so halos stay in sync
+        without copying; those chunks are loaded (or generated) if
+        they are not yet.
+
+        Returns the changed rectangle of each chunk, in chunk-space
+        heightmap points, keyed by chunk position. Each chunk also
+        keeps a log of them; see TerrainChunk.dirty_since.
+        """
+        width = self.chunk_width
+        brush_height = len(brush)
+        brush_width = len(brush[0]) if brush_height else 0
+
+        changes = {}
+
+        if self._floor_cache is not None:
+            self._floor_cache.clear()
+
+        # a chunk's heightmap spans its width, plus one halo point
+        for chunk_y in range(
+            (pos_y - 1) // width, (pos_y + brush_height - 1) // width + 1
+        ):
+            for chunk_x in range(
+                (pos_x - 1) // width, (pos_x + brush_width - 1) // width + 1
+            ):
+                chunk = self.get_chunk((chunk_x, chunk_y), wait=True)
+                rect = chunk.terrain.apply_brush(
+                    pos_x - chunk.world_pos[0], pos_y - chunk.world_pos[1], brush, mode
+                )
+
+                if rect is not None:
+                    chunk.edited = True
+                    changes[chunk.chunk_pos] = rect
+
+        return changes
+
+    @staticmethod
+    def _constant_brush(width: int, height: int, value: float) -> "HeightGrid":
+        """A brush of the same value everywhere."""
+        if NUMPY_SUPPORTED:
+            return np.full((height, width), value, dtype=np.float64)
+
+        return [[value] * width for _ in range(height)]
+
+    def raise_terrain(
+        self, pos_x: int, pos_y: int, width: int, height: int, amount: float
+    ) -> typing.Dict[typing.Tuple[int, int], "terrain.Rect"]:
+        """Raises a rectangle of world heightmap points by an amount.
+
+        The rectangle starts at (pos_x, pos_y) and is width by
+        height points large. See stamp_brush.
+        """
+        return self.stamp_brush(
+            pos_x, pos_y, self._constant_brush(width, height, amount), "add"
+        )
+
+    def lower_terrain(
+        self, pos_x: int, pos_y: int, width: int, height: int, amount: float
+    ) -> typing.Dict[typing.Tuple[int, int], "terrain.Rect"]:
+        """Lowers a rectangle of world heightmap points by an amount.
+
+        See raise_terrain.
+        """
+        return self.raise_terrain(pos_x, pos_y, width, height, -amount)
+
+    def flatten_terrain(
+        self, pos_x: int, pos_y: int, width: int, height: int, level: float
+    ) -> typing.Dict[typing.Tuple[int, int], "terrain.Rect"]:
+        """Sets a rectangle of world heightmap points to the same height.
+
+        See raise_terrain.
+        """
+        return self.stamp_brush(
+            pos_x, pos_y, self._constant_brush(width, height, level), "set"
+        )
+
+    def sync_halos(self, chunk: Chunk):
+        """Refreshes the halos that depend on a chunk.
+
+        Those are the halo of the chunk itself, copied from its
+        loaded +X, +Y and diagonal neighbours, and the halos of its
+        -X, -Y and diagonal neighbours, which copy from it.
+
+        Done automatically for new chunks; call it again after
+        changing the first or last column or row of a chunk's
+        heightmap.
+        """
+        chunk_x, chunk_y = chunk.chunk_pos
+
+        for off_x, off_y in ((0, 0), (-1, 0), (0, -1), (-1, -1)):
+            pos_x, pos_y = chunk_x + off_x, chunk_y + off_y
+            target = self.chunks.get((pos_x, pos_y))
+
+            if target is None or target.placeholder:
+                continue
+
+            target.terrain.fill_halo(
+                right=self._loaded_terrain(pos_x + 1, pos_y),
+                below=self._loaded_terrain(pos_x, pos_y + 1),
+                diagonal=self._loaded_terrain(pos_x + 1, pos_y + 1),
+            )
+
+    def _loaded_terrain(
+        self, chunk_x: int, chunk_y: int
+    ) -> typing.Optional["terrain.TerrainChunk"]:
+        """The terrain of a loaded, real chunk, without generating it."""
+        chunk = self.chunks.get((chunk_x, chunk_y))
+
+        if chunk is None or chunk.placeholder:
+            return None
+
+        return chunk.terrain
+
     def object_register(self, obj: "objects.GameObject"):
-        """Registers a game object to the chunk it is in.
+        """Registers a game object to the chunk it is in, and to the object index.
 
         Use `Game.oobject_register` instead. That affects the
         whole playsim.
@@ -143,8 +1096,13 @@ class World:
         chunk = self.chunk_at_pos(obj.pos.as_tuple())
         chunk.object_register(obj)
 
+        self.object_index.insert(obj.identifier, *obj.pos.as_tuple())
+
+        if self.object_store is not None:
+            self.object_store.add(obj)
+
     def object_unregister(self, obj: "objects.GameObject"):
-        """Unregisters a game object from the chunk it was in.
+        """Unregisters a game object from the chunk it was in, and the object index.
 
         Use `Game.oobject_unregister` instead. That affects the
         whole playsim.
@@ -152,20 +1110,274 @@ class World:
         chunk = self.chunk_at_pos(obj.pos.as_tuple())
         chunk.object_unregister(obj)
 
+        self.object_index.remove(obj.identifier)
+
+        if self.object_store is not None and obj.store is self.object_store:
+            self.object_store.remove(obj)
+
+    def set_object_cell_size(self, cell_size: float):
+        """Changes the cell size of the object index, and rebuilds it.
+
+        Smaller cells mean fewer objects tested per query, but
+        more cells visited for large radii; about the radius of
+        the most common queries is a good size.
+        """
+        self.object_index.rebuild(cell_size)
+
+    def objects_in_radius(
+        self,
+        pos: typing.Tuple[float, float],
+        radius: typing.Optional[float],
+        type_filter: typing.Optional[str] = None,
+    ) -> typing.Iterator["objects.GameObject"]:
+        """Every game object within a radius of a position.
+
+        Goes through the object index, so only the objects in
+        cells overlapping the radius are tested. If radius is
+        None, every object is found. If a type filter is passed,
+        only objects of that type are.
+        """
+        if type_filter is not None:
+            type_filter = type_filter.lower()
+
+        if radius is None:
+            found: typing.Iterable[uuid.UUID] = list(self.game.objects)
+
+        else:
+            found = self.object_index.query_radius(pos[0], pos[1], radius)
+
+        for identifier in found:
+            obj = self.game.objects.get(identifier)
+
+            if obj is None:
+                continue
+
+            if type_filter is not None and obj.type.name != type_filter:
+                continue
+
+            yield obj
+
+    def objects_in_box(
+        self,
+        min_pos: typing.Tuple[float, float],
+        max_pos: typing.Tuple[float, float],
+        type_filter: typing.Optional[str] = None,
+    ) -> typing.Iterator["objects.GameObject"]:
+        """Every game object within an axis-aligned box, bounds included.
+
+        Goes through the object index, like objects_in_radius.
+        """
+        if type_filter is not None:
+            type_filter = type_filter.lower()
+
+        for identifier in self.object_index.query_box(*min_pos, *max_pos):
+            obj = self.game.objects.get(identifier)
+
+            if obj is None:
+                continue
+
+            if type_filter is not None and obj.type.name != type_filter:
+                continue
+
+            yield obj
+
+    def nearest(
+        self,
+        pos: typing.Tuple[float, float],
+        count: int,
+        type_filter: typing.Optional[str] = None,
+        exclude: typing.Optional[uuid.UUID] = None,
+    ) -> typing.List["objects.GameObject"]:
+        """The count game objects nearest to a position, nearest first.
+
+        If a type filter is passed, only objects of that type are
+        considered; the object whose identifier is exclude, if any,
+        never is. The object index is searched outwards from the
+        position, and the search stops as soon as nothing further
+        out can be nearer.
+        """
+        if type_filter is not None:
+            type_filter = type_filter.lower()
+
+        def eligible(identifier: uuid.UUID) -> bool:
+            """Whether an object may be found."""
+            if identifier == exclude:
+                return False
+
+            obj = self.game.objects.get(identifier)
+
+            return obj is not None and (
+                type_filter is None or obj.type.name == type_filter
+            )
+
+        return [
+            self.game.objects[identifier]
+            for identifier in self.object_index.nearest(pos[0], pos[1], count, eligible)
+        ]
+
     def make_chunk(self, chunk_x: int, chunk_y: int) -> Chunk:
-        """Initializes and generates a chunk at a specified chunk-space position."""
-        new_chunk = Chunk(self, (chunk_x, chunk_y))
+        """Initializes and generates a chunk at a specified chunk-space position.
+
+        If the chunk is in this world's storage, it is loaded
+        from there instead.
+        """
+        if self.is_stored((chunk_x, chunk_y)):
+            return self._add_chunk(self._new_chunk((chunk_x, chunk_y)))
+
+        new_chunk = self._new_chunk((chunk_x, chunk_y))
         off_x = chunk_x * self.chunk_width
         off_y = chunk_y * self.chunk_width
 
         if self.terrain_generator:
             new_chunk.terrain.generate(self.terrain_generator, (off_x, off_y))
 
-        self.chunks[chunk_x, chunk_y] = new_chunk
+        return self._add_chunk(new_chunk)
+
+    def _new_chunk(self, chunk_pos: typing.Tuple[int, int]) -> Chunk:
+        """Makes a chunk object, backed by its storage slot if there is a storage."""
+        if self.storage is not None:
+            return Chunk(self, chunk_pos, self.storage.chunk_buffer(chunk_pos))
+
+        return Chunk(self, chunk_pos)
+
+    def _add_chunk(self, new_chunk: Chunk) -> Chunk:
+        """Adds a freshly made chunk to this world.
+
+        Replaces the placeholder at its position, if there is one,
+        in one go: objects registered to the placeholder move to
+        the new chunk.
+        """
+        placeholder = self.chunks.get(new_chunk.chunk_pos)
+
+        if placeholder is not None:
+            self.unload_chunk(new_chunk.chunk_pos)
+            self._adopt_objects(placeholder, new_chunk)
+
+        self.chunks[new_chunk.chunk_pos] = new_chunk
+
+        for level in range(1, self.max_lod_level + 1):
+            self.coarse_chunks.pop((new_chunk.chunk_pos, level), None)
+
+        self.memory_usage += new_chunk.terrain.memory_usage()
+        self.sync_halos(new_chunk)
+
+        if self.storage is not None:
+            self.storage.commit_chunk(new_chunk.chunk_pos)
+
+        self.evict_chunks()
+
+        for callback in self._chunk_callbacks.pop(new_chunk.chunk_pos, ()):
+            callback(new_chunk)
 
         return new_chunk
 
+    def is_pinned(self, chunk: Chunk) -> bool:
+        """Whether a chunk must stay loaded.
+
+        Chunks with objects in them are pinned, and so is the
+        chunk that served the last height query. Without a storage,
+        edited chunks are pinned too, as unloading them would lose
+        their changes.
+        """
+        return (
+            bool(chunk.objects_in_chunk)
+            or chunk is self._last_chunk
+            or (chunk.edited and self.storage is None)
+        )
+
+    def unload_chunk(self, chunk_pos: typing.Tuple[int, int]):
+        """Unloads a chunk from memory.
+
+        With a storage, the chunk already lives in its region file
+        and is loaded back from there when needed; otherwise, it
+        is generated again, and any change made to it is lost.
+        """
+        chunk = self.chunks.pop(chunk_pos)
+        self.memory_usage -= chunk.terrain.memory_usage()
+
+        if chunk is self._last_chunk:
+            self._last_chunk = None
+
+    def evict_chunks(self) -> int:
+        """Unloads the least recently used chunks while over the memory budget.
+
+        Pinned chunks (see is_pinned) are skipped. Does nothing
+        if this world has no memory budget.
+
+        Returns how many chunks were unloaded.
+        """
+        if self.memory_budget is None or self.memory_usage <= self.memory_budget:
+            return 0
+
+        evicted = []
+        excess = self.memory_usage - self.memory_budget
+
+        for chunk_pos, chunk in self.chunks.items():
+            if excess <= 0:
+                break
+
+            if self.is_pinned(chunk):
+                continue
+
+            evicted.append(chunk_pos)
+            excess -= chunk.terrain.memory_usage()
+
+        for chunk_pos in evicted:
+            self.unload_chunk(chunk_pos)
+
+        return len(evicted)
+
     def update_objects(self, time_delta: float):
-        """Updates all objects in this world."""
-        for obj in self.game.objects.values():
-            obj.tick(time_delta)
+        """Updates all objects in this world.
+
+        Also installs chunks that finished generating in the background,
+        and unloads chunks beyond the memory budget.
+
+        That is, runs update_chunks, run_object_scripts and
+        update_physics, in that order; a GameLoop runs (and times)
+        them as separate phases instead.
+        """
+        self.update_chunks()
+        self.run_object_scripts()
+        self.update_physics(time_delta)
+
+    def update_chunks(self):
+        """Installs chunks generated in the background, and evicts chunks.
+
+        See collect_chunks and evict_chunks.
+        """
+        self.collect_chunks()
+        self.evict_chunks()
+
+    def run_object_scripts(self):
+        """Calls the tick callback of every object in this world.
+
+        Callbacks may create or destroy objects; objects created
+        meanwhile wait for the next tick, and objects destroyed
+        meanwhile are skipped.
+        """
+        game_objects = self.game.objects
+
+        for obj in list(game_objects.values()):
+            if obj.identifier in game_objects:
+                obj.tick_callback()
+
+    def update_physics(self, time_delta: float):
+        """Ticks the physics of every object in this world.
+
+        With an object store, objects are ticked by it, in batches.
+        Otherwise, the floor heights objects query are resolved in
+        a batch first; see resolve_floor_heights.
+        """
+        if self.object_store is not None:
+            self.object_store.tick_physics(self, time_delta)
+            return
+
+        self.resolve_floor_heights(time_delta)
+
+        try:
+            for obj in self.game.objects.values():
+                obj.tick_physics(time_delta)
+
+        finally:
+            self._floor_cache = None
@@ -0,0 +1,308 @@
+"""A registry of Vanquisher's hot kernels, and of their implementations.
+
+Many hot loops (batch terrain sampling, noise generation, colour
+conversion...) have several implementations, each built on an
+optional accelerator: Numba, the CFFI extension, NumPy, or none
+at all. Which one is fastest depends on the machine, and on what
+is installed, so rather than each module guessing at import time,
+they register every implementation they have here, under a kernel.
+
+Until autoselect is called, each kernel uses the first available
+implementation registered, which is meant to be the one expected
+to be the fastest. autoselect micro-benchmarks every available
+implementation of every kernel on a small, representative workload,
+switches each kernel to the fastest one, and persists the choice,
+so that the benchmark only runs on first start (or whenever the
+installed accelerators change).
+
+Callers use kernel.function, which always points to the active
+implementation, and so costs a single attribute lookup per call.
+"""
+
+import json
+import os
+import platform
+import time
+import typing
+import warnings
+
+# Builds a workload, and returns a function running it with
+# a given implementation of a kernel.
+Workload = typing.Callable[[], typing.Callable[[typing.Callable], typing.Any]]
+
+# The environment variable overriding where kernel choices are persisted.
+CACHE_PATH_VARIABLE = "VANQUISHER_KERNEL_CACHE"
+
+
+class Kernel:
+    """A hot kernel, and its available implementations, by backend name."""
+
+    def __init__(self, name: str, workload: typing.Optional[Workload] = None):
+        """Initializes this kernel, with no implementations yet.
+
+        workload is used by autoselect to measure implementations;
+        kernels without one keep the first implementation registered.
+        """
+        self.name: str = name
+        self.workload: typing.Optional[Workload] = workload
+
+        # In the order they were registered, most promising first.
+        self.implementations: typing.Dict[str, typing.Callable] = {}
+
+        self.backend: typing.Optional[str] = None
+        self.function: typing.Callable = self._missing
+
+        # How the active backend was picked: "default", "benchmark",
+        # "cache" or "manual".
+        self.selected_by: str = "default"
+
+        # The best time of every backend, in seconds, if measured.
+        self.timings: typing.Dict[str, float] = {}
+
+    def _missing(self, *args, **kwargs):
+        """Stands in for the implementation, until one is registered."""
+        raise RuntimeError("No implementation of kernel {}".format(self.name))
+
+    def register(self, backend: str, function: typing.Callable):
+        """Registers an available implementation of this kernel.
+
+        The first one registered becomes the active one, until
+        another is selected.
+        """
+        self.implementations[backend] = function
+
+        if self.backend is None:
+            self.backend = backend
+            self.function = function
+
+    def select(self, backend: str, selected_by: str = "manual"):
+        """Makes one of the registered implementations the active one.
+
+        Raises KeyError if no such implementation is registered.
+        """
+        if backend not in self.implementations:
+            raise KeyError(
+                "No {} implementation of kernel {}".format(backend, self.name)
+            )
+
+        self.backend = backend
+        self.function = self.implementations[backend]
+        self.selected_by = selected_by
+
+    def measure(self, repeat: int = 3) -> typing.Dict[str, float]:
+        """Times every implementation of this kernel on its workload.
+
+        Each is run once to warm up (and get JIT compiled), then
+        repeat more times, keeping the best time. Implementations
+        that fail are dropped, with a warning. Returns the best
+        times, in seconds, by backend.
+        """
+        if self.workload is None:
+            return {}
+
+        run = self.workload()
+        timings: typing.Dict[str, float] = {}
+
+        for backend, function in list(self.implementations.items()):
+            try:
+                run(function)
+
+            except Exception as err:
+                warnings.warn(
+                    "Dropping the {} implementation of kernel {}: {!r}".format(
+                        backend, self.name, err
+                    ),
+                    RuntimeWarning,
+                )
+                del self.implementations[backend]
+                continue
+
+            best = float("inf")
+
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(function)
+                best = min(best, time.perf_counter() - start)
+
+            timings[backend] = best
+
+        self.timings = timings
+
+        return timings
+
+
+class KernelRegistry:
+    """Every kernel, by name, and the choice of their implementations."""
+
+    def __init__(self):
+        """Initializes an empty registry."""
+        self.kernels: typing.Dict[str, Kernel] = {}
+
+    def kernel(self, name: str, workload: typing.Optional[Workload] = None) -> Kernel:
+        """Gets a kernel by name, creating it if it does not exist yet."""
+        found = self.kernels.get(name)
+
+        if found is None:
+            found = self.kernels[name] = Kernel(name, workload)
+
+        elif workload is not None:
+            found.workload = workload
+
+        return found
+
+    def fingerprint(self) -> typing.Dict[str, typing.Any]:
+        """What persisted choices are only valid for: this interpreter and machine."""
+        return {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        }
+
+    def autoselect(
+        self, path: typing.Optional[str] = None, force: bool = False
+    ) -> typing.Dict[str, typing.Optional[str]]:
+        """Picks the fastest implementation of every kernel, and persists the choice.
+
+        Choices persisted at path (see default_cache_path) for this
+        interpreter and machine, with the same implementations
+        available, are reused; other kernels are measured, and the
+        whole choice is written back. If force is set, every kernel
+        is measured again.
+
+        Returns the active backend of every kernel.
+        """
+        if path is None:
+            path = default_cache_path()
+
+        stored = {} if force else self._load(path)
+        choices: typing.Dict[str, typing.Any] = {}
+
+        for name, kernel in self.kernels.items():
+            entry = stored.get(name)
+
+            if (
+                entry is not None
+                and entry.get("backends") == sorted(kernel.implementations)
+                and entry.get("backend") in kernel.implementations
+            ):
+                kernel.select(entry["backend"], "cache")
+                kernel.timings = entry.get("timings", {})
+
+            elif kernel.workload is not None and len(kernel.implementations) > 1:
+                timings = kernel.measure()
+
+                if timings:
+                    kernel.select(min(timings, key=timings.__getitem__), "benchmark")
+
+            choices[name] = {
+                "backend": kernel.backend,
+                "backends": sorted(kernel.implementations),
+                "timings": kernel.timings,
+            }
+
+        self._save(path, choices)
+
+        return {name: kernel.backend for name, kernel in self.kernels.items()}
+
+    def _load(self, path: str) -> typing.Dict[str, typing.Any]:
+        """The persisted choices, if any were made on this interpreter and machine."""
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(cached, dict):
+            return {}
+
+        if cached.get("fingerprint") != self.fingerprint():
+            return {}
+
+        return cached.get("kernels", {})
+
+    def _save(self, path: str, choices: typing.Dict[str, typing.Any]):
+        """Persists choices; warns, rather than fails, if it cannot."""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+            with open(path, "w", encoding="utf-8") as cache_file:
+                json.dump(
+                    {"fingerprint": self.fingerprint(), "kernels": choices},
+                    cache_file,
+                    indent=2,
+                )
+
+        except OSError as err:
+            warnings.warn(
+                "Could not persist kernel choices to {}: {}".format(path, err),
+                RuntimeWarning,
+            )
+
+    def report(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """Which backend every kernel uses, which ones are available, and why."""
+        return {
+            name: {
+                "backend": kernel.backend,
+                "available": list(kernel.implementations),
+                "selected_by": kernel.selected_by,
+                "timings": dict(kernel.timings),
+            }
+            for name, kernel in self.kernels.items()
+        }
+
+    def format_report(self) -> str:
+        """A human-readable version of report, one kernel per line."""
+        lines = []
+
+        for name, kernel in sorted(self.kernels.items()):
+            lines.append(
+                "{}: {} ({}; available: {})".format(
+                    name,
+                    kernel.backend,
+                    kernel.selected_by,
+                    ", ".join(kernel.implementations),
+                )
+            )
+
+        return "\n".join(lines)
+
+
+def default_cache_path() -> str:
+    """Where kernel choices are persisted by default.
+
+    That is the path in the VANQUISHER_KERNEL_CACHE environment
+    variable, if set; otherwise, kernels.json in the vanquisher
+    directory of the user's cache directory.
+    """
+    override = os.environ.get(CACHE_PATH_VARIABLE)
+
+    if override:
+        return override
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+
+    return os.path.join(cache_home, "vanquisher", "kernels.json")
+
+
+# The registry every Vanquisher module registers its kernels in.
+REGISTRY = KernelRegistry()
+
+
+def kernel(name: str, workload: typing.Optional[Workload] = None) -> Kernel:
+    """Gets a kernel of the global registry by name, creating it if needed."""
+    return REGISTRY.kernel(name, workload)
+
+
+def autoselect(
+    path: typing.Optional[str] = None, force: bool = False
+) -> typing.Dict[str, typing.Optional[str]]:
+    """Picks the fastest implementation of every kernel; see KernelRegistry."""
+    return REGISTRY.autoselect(path, force)
+
+
+def report() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Which backend every kernel uses; see KernelRegistry.report."""
+    return REGISTRY.report()
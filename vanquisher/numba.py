@@ -20,7 +20,12 @@ def maybe_numba_jit(
     If Numba is available, wraps a function
     with @numba.jit(*args, **kwargs). Otherwise,
     just returns the unadulterated function instead.
+
+    Compiled code is cached on disk (next to the module's
+    bytecode) unless cache=False is passed, so that it is
+    only compiled once rather than on every start.
     """
+    kwargs.setdefault("cache", True)
 
     def _decorator(func: typing.Callable) -> typing.Callable:
         if SUPPORTED:
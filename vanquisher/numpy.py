@@ -0,0 +1,29 @@
+"""Allows using NumPy if it is available"""
+
+import typing
+
+try:
+    import numpy  # type: ignore
+
+except ImportError:
+    SUPPORTED = False
+    numpy = None  # type: ignore
+
+else:
+    SUPPORTED = True
+
+
+def require_numpy(feature: str) -> typing.Any:
+    """NumPy availability guard.
+
+    Returns the numpy module if it is available; otherwise,
+    raises an ImportError explaining that the given feature
+    needs the optimizer-numpy extra.
+    """
+
+    if not SUPPORTED:
+        raise ImportError(
+            "{} requires NumPy; install the optimizer-numpy extra".format(feature)
+        )
+
+    return numpy
@@ -256,6 +256,16 @@ class Raymarcher(abc.ABC):
         Only called if the ray hits anything.
         """
 
+    def skip_distance(self, ray: Ray) -> float:
+        """How far the ray can safely advance without hitting anything.
+
+        Used by march to jump over empty space during the first
+        pass. This default implementation never skips; override
+        it if an acceleration structure is available, e.g. the
+        terrain's max pyramid.
+        """
+        return 0.0
+
     def setup_ray(self, size: typing.Tuple[int, int], x: int, y: int, **kwargs):
         """
         Sets up this raymarcher's Ray toward the given pixel.
@@ -271,9 +281,22 @@ class Raymarcher(abc.ABC):
 
         Returns True if it hit anything, or False
         if it went beyond the maximum distance instead.
+
+        During the first pass, empty space is jumped over
+        whenever skip_distance allows it.
         """
 
         while self.ray.distance < self.ray.max_distance:
+            if self.ray.first_pass:
+                skip = min(
+                    self.skip_distance(self.ray),
+                    self.ray.max_distance - self.ray.distance,
+                )
+
+                if skip > 0.0:
+                    self.ray.advance(skip)
+                    continue
+
             self.ray.step()
 
             if not self.ray_hit(self.ray):
@@ -54,11 +54,37 @@ class TerrainRaymarcher(Raymarcher):
         position; in this case, terrain.
         """
 
-        chunk = self.world().chunk_at_pos(ray.pos)
-        terrain_height = chunk[ray.pos.as_tuple()]
+        pos_x, pos_y = ray.pos.as_tuple()
+        terrain_height = self.world().height_at_distance(pos_x, pos_y, ray.distance)
 
         return ray.height < terrain_height
 
+    def skip_distance(self, ray: Ray) -> float:
+        """Jumps over open air using the max pyramid of the chunk the ray is in.
+
+        Far from the camera, that is the max pyramid of a coarser
+        level of detail, the same one ray_hit samples, so far
+        chunks never need to be generated at full resolution.
+        """
+
+        pos_x, pos_y = ray.pos.as_tuple()
+        my_world = self.world()
+        level = my_world.lod_level(ray.distance)
+        factor = 1 << level
+
+        chunk_x = math.floor(pos_x / my_world.chunk_width)
+        chunk_y = math.floor(pos_y / my_world.chunk_width)
+        coarse = my_world.lod_terrain((chunk_x, chunk_y), level)
+
+        # in coarse chunk-space, horizontal distances shrink
+        # by the factor, but heights do not
+        return coarse.ray_skip(
+            (pos_x - chunk_x * my_world.chunk_width) / factor,
+            (pos_y - chunk_y * my_world.chunk_width) / factor,
+            ray.height,
+            (ray.offset_x / factor, ray.offset_y / factor, ray.offset_z),
+        )
+
     def get_color(
         self, true_distance: float, height_offset: float, ray: Ray
     ) -> typing.Tuple[float, float, float]:
@@ -79,21 +105,13 @@ class TerrainRaymarcher(Raymarcher):
 
         max_distance = ray.max_distance
         hit_x, hit_y = ray.pos.as_tuple()
-        chunk = self.world().chunk_at_pos(ray.pos).terrain
         distance = (distance / self.scale) ** 2
         darkness_denomin = 1.0 + math.sqrt(distance + 1.0)
 
-        # Sample rough surface normals of hit position
-        norm_samp_size = 0.2
-        norm_samp_leng = norm_samp_size * 2
-
-        val_a = chunk[hit_x + norm_samp_size, hit_y]
-        val_b = chunk[hit_x - norm_samp_size, hit_y]
-        val_c = chunk[hit_x, hit_y + norm_samp_size]
-        val_d = chunk[hit_x, hit_y - norm_samp_size]
-
-        norm_x = (val_a - val_b) / norm_samp_leng
-        norm_y = (val_c - val_d) / norm_samp_leng
+        # Surface normal at hit position
+        norm_x, norm_y, norm_z = self.world().lod_normal_at(
+            hit_x, hit_y, self.world().lod_level(true_distance)
+        )
 
         # Get bluishness from distance
         # (air refracting light type thing?)
@@ -126,7 +144,7 @@ class TerrainRaymarcher(Raymarcher):
         # brighter using norm_x and norm_y
         distance_3d = math.sqrt(distance ** 2 + height_offset ** 2)
 
-        northeastness = norm_x + norm_y
+        northeastness = -(norm_x + norm_y) / norm_z
 
         north_bright_alpha = (
             1.0 / (1.0 + math.exp(-northeastness)) + 1
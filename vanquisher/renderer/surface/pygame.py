@@ -4,9 +4,10 @@ Defines a pygame surface that implements the
 FramebufferSurface interface.
 """
 
-import math
 import typing
 
+from ...util import COLOR_TO_RGB8_KERNEL
+
 try:
     import pygame  # type: ignore
 
@@ -45,12 +46,7 @@ else:
             self, rgb: typing.Tuple[float, float, float]
         ) -> typing.Tuple[int, int, int]:
             """Converts a color from floating point (0.0-1.0) to 8-bit (0-255)."""
-            col_r, col_g, col_b = rgb
-            return (
-                min(255, max(0, math.floor(col_r * 255.0))),
-                min(255, max(0, math.floor(col_g * 255.0))),
-                min(255, max(0, math.floor(col_b * 255.0))),
-            )
+            return COLOR_TO_RGB8_KERNEL.function(*rgb)
 
         def plot_pixel(self, x: int, y: int, rgb: typing.Tuple[float, float, float]):
             """Plots a pixel to the Pygame window.
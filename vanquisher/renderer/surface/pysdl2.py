@@ -6,9 +6,10 @@ deprecated.
 """
 
 import ctypes
-import math
 import typing
 
+from ...util import COLOR_TO_RGB8_KERNEL
+
 try:
     import sdl2  # type: ignore
 
@@ -81,12 +82,7 @@ else:
             self, rgb: typing.Tuple[float, float, float]
         ) -> ctypes.c_uint32:
             """Converts a colour tuple to a SDL-friendly 32-bit colour value."""
-            col_r, col_g, col_b = rgb
-            rgb_int = (
-                min(255, max(0, math.floor(col_r * 255.0))),
-                min(255, max(0, math.floor(col_g * 255.0))),
-                min(255, max(0, math.floor(col_b * 255.0))),
-            )
+            rgb_int = COLOR_TO_RGB8_KERNEL.function(*rgb)
 
             # Convert to uint32
             # (RGBA, where A is always 255)
@@ -8,8 +8,9 @@ import pygame
 import sdl2  # type: ignore
 import sdl2.ext  # type: ignore
 
+from .. import kernels
 from ..game import Game
-from ..game.terrain.generator.sine import SineTerrainGenerator
+from ..game.terrain.generator.fractal import FractalTerrainGenerator
 from ..renderer import Renderer
 from ..renderer.sub.sky import SkySubrenderer
 from ..renderer.sub.terrain import TerrainSubrenderer
@@ -19,12 +20,14 @@ from ..renderer.surface.pygame import PygameSurface
 def demo():
     """Runs the demo."""
 
+    # Pick the fastest kernels (only measured on the first run)
+    kernels.autoselect()
+    print(kernels.REGISTRY.format_report())
+
     # Initialize game and terrain
     game = Game()
 
-    game.world.set_terrain_generator(
-        SineTerrainGenerator(time.time(), period=50, amplitude=12)
-    )
+    game.world.set_terrain_generator(FractalTerrainGenerator(time.time(), amplitude=12))
 
     # Initialize renderer
     renderer = Renderer.create(
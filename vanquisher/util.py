@@ -2,8 +2,13 @@
 Common utility functions to be used throughout Vanquisher.
 """
 
+import math
 import typing
 
+from . import kernels
+from .numba import SUPPORTED as NUMBA_SUPPORTED
+from .numba import maybe_numba_jit
+
 RGB = typing.Tuple[float, float, float]
 
 
@@ -25,3 +30,42 @@ def interpolate_color(low: RGB, high: RGB, alpha: float) -> RGB:
         interpolate(low[1], high[1], alpha),
         interpolate(low[2], high[2], alpha),
     )
+
+
+def color_to_rgb8(
+    col_r: float, col_g: float, col_b: float
+) -> typing.Tuple[int, int, int]:
+    """
+    Converts a floating point (0.0-1.0) colour to 8-bit (0-255)
+    channels, clamped.
+
+    Use COLOR_TO_RGB8_KERNEL.function, which may be a compiled
+    version of this.
+    """
+
+    return (
+        min(255, max(0, math.floor(col_r * 255.0))),
+        min(255, max(0, math.floor(col_g * 255.0))),
+        min(255, max(0, math.floor(col_b * 255.0))),
+    )
+
+
+def _color_workload() -> typing.Callable[[typing.Callable], typing.Any]:
+    """A colour conversion workload, to pick the fastest backend with."""
+    colors = [(index / 1024.0, 0.5, 1.0 - index / 1024.0) for index in range(1024)]
+
+    def run(implementation: typing.Callable):
+        for color in colors:
+            implementation(*color)
+
+    return run
+
+
+# Colour conversion, per pixel; kernels.autoselect may pick another backend.
+COLOR_TO_RGB8_KERNEL = kernels.kernel("color.to_rgb8", _color_workload)
+COLOR_TO_RGB8_KERNEL.register("python", color_to_rgb8)
+
+if NUMBA_SUPPORTED:
+    COLOR_TO_RGB8_KERNEL.register(
+        "numba", maybe_numba_jit(nopython=True)(color_to_rgb8)
+    )